@@ -2,15 +2,44 @@
 """
 GPT-4 Command Application - Main Entry Point
 """
+import time
+
+# Origin of the --startup-trace timeline, taken before anything else is loaded
+PROCESS_START = time.perf_counter()
+
 import os
 import sys
-import tkinter as tk
 import subprocess
 import importlib.util
 
 # Constants
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+CORE_DIR = os.path.join(SRC_DIR, "core")
+
+# Backend modules, loaded in dependency order
+CORE_MODULES = [
+    "token_counter",
+    "metrics",
+    "event_loop",
+    "prompt_registry",
+    "command_parser",
+    "request_policy",
+    "model_router",
+    "client_manager",
+    "response_cache",
+    "conversation",
+    "history_store",
+    "tool_index",
+    "output_buffer",
+    "spill_file",
+    "job_manager",
+    "query_scheduler",
+    "prefetcher",
+    "translator",
+    "batch_runner",
+    "startup",
+]
 
 
 def load_module(module_path, module_name):
@@ -35,6 +64,25 @@ def get_python_path(venv_dir):
     return os.path.join(venv_dir, 'bin', 'python')
 
 
+def exec_in_venv(venv_dir):
+    """Replaces the current process with the application running in the virtual environment"""
+    python_path = get_python_path(venv_dir)
+    script_path = os.path.abspath(__file__)
+    args = [python_path, script_path] + [arg for arg in sys.argv[1:] if arg != '--setup']
+    
+    # Windows has no real exec - run a child process and pass its result on
+    if sys.platform == 'win32':
+        return subprocess.run(args).returncode == 0
+    
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execv(python_path, args)
+    except OSError as e:
+        print(f"Nie udało się uruchomić interpretera {python_path}: {str(e)}")
+        return False
+
+
 def setup_environment(app_setup):
     """Sets up the virtual environment and dependencies"""
     print("Konfigurowanie aplikacji...")
@@ -43,23 +91,43 @@ def setup_environment(app_setup):
     if not result:
         print("Konfiguracja nie powiodła się.")
         return False
-        
+    
     config, venv_dir = result
     print("Konfiguracja zakończona pomyślnie.")
     
     # Launch application in the virtual environment
-    python_path = get_python_path(venv_dir)
-    script_path = os.path.abspath(__file__)
-    subprocess.run([python_path, script_path])
-    return True
+    return exec_in_venv(venv_dir)
+
+
+def launch_in_venv(app_setup):
+    """Fast startup path - verified environments go straight to the venv interpreter"""
+    venv_dir = app_setup.AppSetup.fast_setup()
+    if not venv_dir:
+        print("Konfiguracja nie powiodła się. Uruchom aplikację z opcją --setup")
+        return False
+    return exec_in_venv(venv_dir)
+
+
+def load_core_modules():
+    """Loads backend modules shared by the GUI and other entry points"""
+    return {
+        module_name: load_module(os.path.join(CORE_DIR, f"{module_name}.py"), module_name)
+        for module_name in CORE_MODULES
+    }
 
 
 def load_gui_components():
     """Loads and combines GUI components"""
+    load_core_modules()
+    
     gui_part1_path = os.path.join(SRC_DIR, "gui", "gui_part1.py")
     gui_part2_path = os.path.join(SRC_DIR, "gui", "gui_part2.py")
+    output_viewer_path = os.path.join(SRC_DIR, "gui", "output_viewer.py")
+    results_window_path = os.path.join(SRC_DIR, "gui", "results_window.py")
     
     # Import GUI modules
+    load_module(output_viewer_path, "output_viewer")
+    load_module(results_window_path, "results_window")
     gui_part1 = load_module(gui_part1_path, "gui_part1")
     gui_part2 = load_module(gui_part2_path, "gui_part2")
     
@@ -71,9 +139,24 @@ def load_gui_components():
     return gui_part1.GptAppGUI
 
 
+def print_prompt_stats(config):
+    """Validates ChatPrompt.json and prints the token size of each system prompt"""
+    core_modules = load_core_modules()
+    translator = core_modules["translator"]
+    registry = core_modules["prompt_registry"].PromptRegistry(
+        translator.PROMPT_PATH, config.get("model", translator.DEFAULT_MODEL)
+    )
+    if registry.last_error:
+        print(f"Błąd w pliku {translator.PROMPT_PATH}: {registry.last_error}")
+        return False
+    print(registry.format_token_report())
+    return True
+
+
 def main():
     """Main application function"""
-    # Load app setup module
+    # Load app setup module and the configuration service it uses
+    load_module(os.path.join(SRC_DIR, "config", "config_service.py"), "config_service")
     app_setup_path = os.path.join(SRC_DIR, "config", "app_setup.py")
     app_setup = load_module(app_setup_path, "app_setup")
     
@@ -83,22 +166,39 @@ def main():
     
     # Check if running in virtual environment
     if not is_running_in_venv():
-        return setup_environment(app_setup)
-        
+        return launch_in_venv(app_setup)
     
-    # Load configuration
-    config = app_setup.AppSetup.load_config()
-    if not config:
+    
+    # Load configuration - parsed once, the GUI follows later changes of the file
+    settings = app_setup.AppSetup.load_config()
+    if settings is None:
         print("Błąd podczas ładowania konfiguracji.")
         return False
+    config = settings.snapshot
+    
+    # Headless batch translation - no Tk needed
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        core_modules = load_core_modules()
+        return core_modules["batch_runner"].main(sys.argv[1:], config)
+    
+    # Print the size of the compiled system prompts
+    if len(sys.argv) > 1 and sys.argv[1] == '--prompt-stats':
+        return print_prompt_stats(config)
     
-    # Initialize and run GUI
+    # Initialize and run GUI - --startup-trace prints how long every startup phase took
+    modules_started = time.perf_counter()
+    import tkinter as tk
     GptAppGUI = load_gui_components()
-    root = tk.Tk()
-    app = GptAppGUI(root, config)
+    startup = sys.modules["startup"]
+    trace = startup.StartupTrace(PROCESS_START, print_report="--startup-trace" in sys.argv[1:])
+    trace.record("config", PROCESS_START, modules_started)
+    trace.record("modules", modules_started, time.perf_counter())
+    with trace.phase("tk_root"):
+        root = tk.Tk()
+    app = GptAppGUI(root, config, trace, settings)
     root.mainloop()
     return True
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API
+Configurable latency, token rate and error injection for offline benchmarks
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Threading server that ignores clients hanging up mid-connection"""
+    
+    daemon_threads = True
+    request_queue_size = 128
+    
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FakeOpenAIServer:
+    """OpenAI-compatible /v1/chat/completions endpoint running in a background thread"""
+    
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, tokens_per_second=200.0,
+                 response_tokens=40, error_rate=0.0, error_status=500, seed=None, model_latency=None):
+        """
+        Configure the server
+        
+        Args:
+            host (str): Interface to listen on
+            port (int): Port, 0 picks a free one
+            latency (float): Seconds before the first token (or the whole answer)
+            tokens_per_second (float): Generation speed, 0 sends everything at once
+            response_tokens (int): Number of tokens in the description part of an answer
+            error_rate (float): Fraction of requests answered with error_status
+            error_status (int): HTTP status of injected errors (429 adds Retry-After)
+            seed (int, optional): Seed for reproducible error injection
+            model_latency (dict, optional): Latency of particular models, overriding latency
+        """
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.model_latency = model_latency or {}
+        self.requests = 0
+        self.errors = 0
+        self.models = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _QuietHTTPServer((host, port), self._make_handler())
+        self._thread = None
+    
+    @property
+    def base_url(self):
+        """Base URL to put in the client configuration"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self):
+        """Serve in a daemon thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving and close the socket"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+    
+    def answer_for(self, query):
+        """Build a deterministic answer in the application's command ### description format"""
+        words = " ".join(f"słowo{i}" for i in range(self.response_tokens))
+        return f"echo {query}\n###\nWykonano: {query}. {words}"
+    
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return fail
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            
+            def do_GET(self):
+                self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if server._should_fail():
+                    headers = {"Retry-After": "0"} if server.error_status == 429 else None
+                    self._send_json(server.error_status, {
+                        "error": {"message": "Injected failure", "type": "server_error", "code": None}
+                    }, headers)
+                    return
+                
+                query = request.get("messages", [{}])[-1].get("content", "")
+                schema = request.get("response_format", {}).get("json_schema", {}).get("name")
+                if schema == "command_batch":
+                    # Packed request - one answer per query of the JSON payload
+                    answer = json.dumps({"results": [
+                        {"id": item["id"], "response": server.answer_for(item["query"])}
+                        for item in json.loads(query)["queries"]
+                    ]}, ensure_ascii=False)
+                elif schema == "command_answer":
+                    command, _, explanation = server.answer_for(query).partition("\n###\n")
+                    answer = json.dumps({"commands": [command, f"{command} # 2"], "explanation": explanation},
+                                        ensure_ascii=False)
+                else:
+                    answer = server.answer_for(query)
+                model = request.get("model", "fake-model")
+                with server._lock:
+                    server.models[model] = server.models.get(model, 0) + 1
+                time.sleep(server.model_latency.get(model, server.latency))
+                if request.get("stream"):
+                    self._stream(answer, model)
+                else:
+                    if server.tokens_per_second:
+                        time.sleep(len(answer.split()) / server.tokens_per_second)
+                    self._send_json(200, {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": answer}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(answer.split()), "total_tokens": 0}
+                    })
+            
+            def _write_chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            
+            def _stream(self, answer, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                delay = 1.0 / server.tokens_per_second if server.tokens_per_second else 0.0
+                tokens = answer.split(" ")
+                for index, token in enumerate(tokens):
+                    text = token if index == len(tokens) - 1 else token + " "
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    if delay:
+                        time.sleep(delay)
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+        
+        return Handler
+
+
+def main():
+    """Run the server in the foreground"""
+    parser = argparse.ArgumentParser(description="Lokalny serwer zgodny z OpenAI chat completions")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="sekundy do pierwszego tokenu")
+    parser.add_argument("--tps", type=float, default=200.0, help="tokeny na sekundę")
+    parser.add_argument("--tokens", type=int, default=40, help="długość opisu w tokenach")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="odsetek odpowiedzi z błędem")
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args()
+    
+    server = FakeOpenAIServer(port=args.port, latency=args.latency, tokens_per_second=args.tps,
+                              response_tokens=args.tokens, error_rate=args.error_rate,
+                              error_status=args.error_status)
+    print(f"Serwer testowy: {server.base_url}", file=sys.stderr)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
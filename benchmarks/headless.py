@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Headless stand-ins for the Tk pieces used by GptAppGUI
+Lets the benchmarks drive the real query and command code paths without a display
+"""
+import os
+import re
+import sys
+import time
+import heapq
+import itertools
+import threading
+import types
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import app
+
+
+class HeadlessRoot:
+    """Replacement for tk.Tk - after() callbacks run when the main thread pumps them"""
+    
+    def __init__(self):
+        self._queue = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+        self._condition = threading.Condition()
+        self.clipboard = []
+    
+    def after(self, ms, func=None, *args):
+        """Schedule func after ms milliseconds - safe to call from any thread"""
+        if func is None:
+            time.sleep(ms / 1000)
+            return None
+        call_id = next(self._counter)
+        with self._condition:
+            heapq.heappush(self._queue, (time.perf_counter() + ms / 1000, call_id, func, args))
+            self._condition.notify()
+        return call_id
+    
+    def after_idle(self, func, *args):
+        """Idle callbacks run like after(0) ones"""
+        return self.after(0, func, *args)
+    
+    def after_cancel(self, call_id):
+        with self._condition:
+            self._cancelled.add(call_id)
+    
+    def pump(self, until, timeout=60.0):
+        """
+        Run due callbacks in the calling thread until until() is true
+        
+        Returns:
+            bool: False if the timeout expired first
+        """
+        deadline = time.perf_counter() + timeout
+        while not until():
+            now = time.perf_counter()
+            if now > deadline:
+                return False
+            with self._condition:
+                if not self._queue or self._queue[0][0] > now:
+                    wait = self._queue[0][0] - now if self._queue else 0.01
+                    self._condition.wait(min(wait, 0.01, deadline - now))
+                    continue
+                _, call_id, func, args = heapq.heappop(self._queue)
+                if call_id in self._cancelled:
+                    self._cancelled.discard(call_id)
+                    continue
+            func(*args)
+        return True
+    
+    def clipboard_clear(self):
+        self.clipboard = []
+    
+    def clipboard_append(self, text):
+        self.clipboard.append(text)
+    
+    def update(self):
+        pass
+    
+    def destroy(self):
+        pass
+    
+    def update_idletasks(self):
+        pass
+    
+    def title(self, text=None):
+        pass
+
+
+class HeadlessVar:
+    """Replacement for tk.StringVar"""
+    
+    def __init__(self, master=None, value=""):
+        self.value = value
+        self.history = []
+    
+    def get(self):
+        return self.value
+    
+    def set(self, value):
+        self.value = value
+        self.history.append(value)
+
+
+class HeadlessWidget:
+    """Widget accepting any geometry or configuration call"""
+    
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = options
+        self.destroyed = False
+    
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+    
+    def config(self, **options):
+        self.options.update(options)
+    
+    configure = config
+    
+    def destroy(self):
+        self.destroyed = True
+    
+    def winfo_exists(self):
+        return not self.destroyed
+
+
+class HeadlessText(HeadlessWidget):
+    """Replacement for tk.Text / ScrolledText covering the index forms the app uses"""
+    
+    _RELATIVE = re.compile(r"^(.+?)\s*([+-])\s*(\d+)\s*c(?:hars?)?$")
+    
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.text = ""
+        self.tags = {}
+    
+    def index_offset(self, index):
+        """Translate a Tk text index into an offset in self.text"""
+        if isinstance(index, int):
+            return min(index, len(self.text))
+        if isinstance(index, float):
+            index = f"{index:.1f}"
+        index = str(index).strip()
+        match = self._RELATIVE.match(index)
+        if match:
+            base = self.index_offset(match.group(1))
+            delta = int(match.group(3))
+            offset = base + delta if match.group(2) == "+" else base - delta
+            return max(0, min(offset, len(self.text)))
+        if index in ("end", "insert"):
+            return len(self.text)
+        if "." in index and index.split(".", 1)[1] in ("first", "last"):
+            tag, which = index.rsplit(".", 1)
+            start, end = self.tags[tag]
+            return start if which == "first" else end
+        line, column = index.split(".")
+        offset = 0
+        for _ in range(int(line) - 1):
+            newline = self.text.find("\n", offset)
+            if newline < 0:
+                return len(self.text)
+            offset = newline + 1
+        if column == "end":
+            newline = self.text.find("\n", offset)
+            return len(self.text) if newline < 0 else newline
+        return min(offset + int(column), len(self.text))
+    
+    def insert(self, index, text, tag=None):
+        offset = self.index_offset(index)
+        self.text = self.text[:offset] + text + self.text[offset:]
+        for name, (start, end) in self.tags.items():
+            self.tags[name] = [start + len(text) if start >= offset else start,
+                               end + len(text) if end > offset else end]
+        if tag:
+            self.tags[tag] = [offset, offset + len(text)]
+    
+    def delete(self, start, end=None):
+        first = self.index_offset(start)
+        last = self.index_offset(end) if end is not None else first + 1
+        if last <= first:
+            return
+        self.text = self.text[:first] + self.text[last:]
+        for name in list(self.tags):
+            tag_start, tag_end = (self._shift_deleted(position, first, last) for position in self.tags[name])
+            if tag_end <= tag_start:
+                del self.tags[name]
+            else:
+                self.tags[name] = [tag_start, tag_end]
+    
+    @staticmethod
+    def _shift_deleted(position, first, last):
+        """Move an offset to account for deleting text[first:last]"""
+        if position <= first:
+            return position
+        if position >= last:
+            return position - (last - first)
+        return first
+    
+    def get(self, start="1.0", end=None):
+        first = self.index_offset(start)
+        last = self.index_offset(end) if end is not None else first + 1
+        return self.text[first:last]
+    
+    def tag_ranges(self, tag):
+        return tuple(self.tags.get(tag, ()))
+
+
+class HeadlessEntry(HeadlessText):
+    """Replacement for tk.Entry - get() without arguments returns the whole content"""
+    
+    def get(self, start=0, end="end"):
+        return super().get(start, end)
+
+
+class HeadlessWindow(HeadlessWidget):
+    """Replacement for tk.Toplevel"""
+    
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.window_title = None
+    
+    def title(self, text=None):
+        if text is not None:
+            self.window_title = text
+        return self.window_title
+
+
+class HeadlessMessageBox:
+    """Replacement for tkinter.messagebox recording what would be shown"""
+    
+    def __init__(self):
+        self.shown = []
+    
+    def _record(self, kind):
+        def show(title, message, **options):
+            self.shown.append((kind, title, message))
+            # Questions are answered "yes" so the benchmarked action goes ahead
+            return True
+        return show
+    
+    def __getattr__(self, name):
+        if name.startswith("show") or name.startswith("ask"):
+            return self._record(name)
+        raise AttributeError(name)
+
+
+def _headless_tk():
+    """Namespace standing in for the tkinter module inside the GUI modules"""
+    import tkinter as tk
+    namespace = types.SimpleNamespace(
+        Tk=HeadlessRoot,
+        Toplevel=HeadlessWindow,
+        Frame=HeadlessWidget,
+        Label=HeadlessWidget,
+        Button=HeadlessWidget,
+        Entry=HeadlessEntry,
+        Text=HeadlessText,
+        Scrollbar=HeadlessWidget,
+        Listbox=HeadlessWidget,
+        StringVar=HeadlessVar,
+    )
+    # Constants (END, NORMAL, RIGHT, ...) keep their real values
+    for name in dir(tk):
+        if name.isupper() and not hasattr(namespace, name):
+            setattr(namespace, name, getattr(tk, name))
+    return namespace
+
+
+def load_headless_gui():
+    """
+    Load GptAppGUI with its Tk references replaced by headless stand-ins
+    
+    Returns:
+        tuple: (GptAppGUI class, HeadlessMessageBox)
+    """
+    gui_class = app.load_gui_components()
+    headless_tk = _headless_tk()
+    messagebox = HeadlessMessageBox()
+    for name in ("gui_part1", "gui_part2", "results_window"):
+        module = sys.modules[name]
+        module.tk = headless_tk
+        module.ttk = types.SimpleNamespace(Notebook=HeadlessWidget)
+        module.scrolledtext = types.SimpleNamespace(ScrolledText=HeadlessText)
+        module.messagebox = messagebox
+    return gui_class, messagebox
+
+
+def make_headless_app(config):
+    """
+    Build a GptAppGUI instance with the real backend and headless widgets
+    
+    Args:
+        config (dict): Application configuration
+    
+    Returns:
+        GptAppGUI: Instance whose root must be pumped with root.pump()
+    """
+    gui_class, messagebox = load_headless_gui()
+    instance = gui_class.__new__(gui_class)
+    instance.root = HeadlessRoot()
+    instance.config = config
+    instance.selected_system = HeadlessVar(value=config.get("default_system", "Linux"))
+    instance.startup = sys.modules["startup"].StartupSequencer(instance.root)
+    instance._init_backend()
+    
+    instance.input_text = HeadlessEntry()
+    instance.response_text = HeadlessText()
+    instance.terminal_text = HeadlessText()
+    instance.status_var = HeadlessVar()
+    instance.metrics_var = HeadlessVar()
+    instance.metrics_frame = HeadlessWidget()
+    instance.messagebox = messagebox
+    
+    # No widgets are deferred - the background phases start at the first pump
+    instance._start_background_work()
+    instance.startup.start()
+    return instance
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite
+Drives the real query and command paths headlessly against the local fake server,
+reports throughput, tail latency and peak RSS and compares them with a stored baseline
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+for path in (BENCHMARKS_DIR, PROJECT_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fake_openai_server import FakeOpenAIServer
+
+# Relative change allowed before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.25
+RSS_TOLERANCE = 0.20
+
+# Metric name -> True if higher is better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_config(base_url, **overrides):
+    """Configuration of the benchmarked application - no cache, so every query hits the server, and no history"""
+    config = {
+        "api_key": "benchmark",
+        "base_url": base_url,
+        "model": "gpt-4o-mini",
+        "default_system": "Linux",
+        "cache_enabled": False,
+        "history_enabled": False,
+        "metrics_enabled": True,
+        "stream": True,
+    }
+    config.update(overrides)
+    return config
+
+
+def summarize(histogram, units, elapsed, unit_name):
+    """Turn a latency histogram and a wall time into a result record"""
+    summary = histogram.summary()
+    return {
+        "count": summary["count"],
+        "throughput": units / elapsed if elapsed else 0.0,
+        "throughput_unit": unit_name,
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "p99_ms": summary["p99_ms"],
+        "max_ms": summary["max_ms"],
+    }
+
+
+def scenario_gui_query(base_url, count, stream=True):
+    """process_query -> update_response / update_terminal through the scheduler, one query at a time"""
+    import headless
+    import metrics
+    
+    app = headless.make_headless_app(bench_config(base_url, stream=stream))
+    app.backend_loop.run(app.client_manager.awarm_up())
+    histogram = metrics.LatencyHistogram()
+    
+    started = time.perf_counter()
+    for index in range(count):
+        query = f"lista plików {index}"
+        app.input_text.delete(0, "end")
+        app.input_text.insert(0, query)
+        statuses = len(app.status_var.history)
+        sent = time.perf_counter()
+        app.on_send()
+        finished = app.root.pump(
+            lambda: any("Otrzymano" in status or "Błąd" in status
+                        for status in app.status_var.history[statuses:]),
+            timeout=30
+        )
+        # Drain the final flush scheduled together with the status update
+        app.root.pump(lambda: app.terminal_text.text.strip(), timeout=5)
+        histogram.add(time.perf_counter() - sent)
+        if not finished or not app.terminal_text.text.startswith(f"echo {query}"):
+            raise RuntimeError(f"Zapytanie {index} nie zakończyło się poprawnie: {app.status_var.value!r}")
+    elapsed = time.perf_counter() - started
+    
+    app.shutdown()
+    result = summarize(histogram, count, elapsed, "zapytań/s")
+    result["stages"] = app.metrics.snapshot()
+    return result
+
+
+def scenario_batch(base_url, count, parallel=8):
+    """Batch mode - concurrent translations written as JSONL"""
+    import batch_runner
+    import metrics
+    import translator
+    
+    pipeline = translator.Translator.from_config(bench_config(base_url), max_connections=parallel)
+    # Importing openai and connecting is a one-off cost, not part of the steady state
+    pipeline.client_manager.warm_up()
+    items = ((index, f"pokaż proces {index}", "Linux") for index in range(count))
+    output = io.StringIO()
+    
+    summary = batch_runner.run_batch(pipeline, items, output, parallel)
+    pipeline.client_manager.close()
+    if pipeline.response_cache is not None:
+        pipeline.response_cache.flush()
+    if summary["errors"]:
+        raise RuntimeError(f"Tryb wsadowy: {summary['errors']} błędów")
+    
+    histogram = metrics.LatencyHistogram()
+    for line in output.getvalue().splitlines():
+        histogram.add(json.loads(line)["elapsed"])
+    return summarize(histogram, count, summary["elapsed"], "zapytań/s")
+
+
+def scenario_command_output(base_url, count, megabytes=8):
+    """execute_command / monitor_command streaming megabytes of output into the result window"""
+    import headless
+    import metrics
+    
+    app = headless.make_headless_app(bench_config(base_url))
+    # Startup work (importing openai) would otherwise compete with the first runs
+    app.backend_loop.run(app.client_manager.awarm_up())
+    line = "x" * 99
+    lines = megabytes * 1024 * 1024 // (len(line) + 1)
+    command = f'"{sys.executable}" -c "import sys; sys.stdout.write((\'{line}\\n\') * {lines})"'
+    success = app.prompt_registry.label("status_success", "Polecenie wykonane pomyślnie")
+    histogram = metrics.LatencyHistogram()
+    
+    started = time.perf_counter()
+    for _ in range(count):
+        app.terminal_text.delete(1.0, "end")
+        app.terminal_text.insert("end", command)
+        statuses = len(app.status_var.history)
+        run_started = time.perf_counter()
+        app.execute_command()
+        finished = app.root.pump(
+            lambda: any(status == success for status in app.status_var.history[statuses:]),
+            timeout=120
+        )
+        histogram.add(time.perf_counter() - run_started)
+        if not finished:
+            raise RuntimeError(f"Polecenie nie zakończyło się poprawnie: {app.status_var.value!r}")
+    elapsed = time.perf_counter() - started
+    
+    app.shutdown()
+    return summarize(histogram, count * megabytes, elapsed, "MB/s")
+
+
+SCENARIOS = {
+    "gui_stream": (lambda base_url, count: scenario_gui_query(base_url, count, stream=True), 40),
+    "gui_non_stream": (lambda base_url, count: scenario_gui_query(base_url, count, stream=False), 40),
+    "batch_concurrent": (scenario_batch, 200),
+    "command_output": (scenario_command_output, 3),
+}
+
+
+def run_scenario_in_subprocess(name, base_url, count):
+    """Run one scenario in a fresh interpreter so its peak RSS is measured in isolation"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", name, "--base-url", base_url, "--count", str(count)],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=PROJECT_ROOT
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenariusz {name} zakończył się kodem {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_child(name, base_url, count):
+    """Entry point of a scenario subprocess - prints its result as one JSON line"""
+    import app
+    app.load_core_modules()
+    
+    scenario, _ = SCENARIOS[name]
+    result = scenario(base_url, count)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with the baseline
+    
+    Returns:
+        list: Descriptions of all regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            current, expected = result.get(metric), reference.get(metric)
+            if current is None or not expected:
+                continue
+            allowed = RSS_TOLERANCE if metric == "peak_rss_mb" else tolerance
+            change = (current - expected) / expected
+            if (higher_is_better and change < -allowed) or (not higher_is_better and change > allowed):
+                regressions.append(f"{name}.{metric}: {current:.2f} (bazowo {expected:.2f}, {change:+.0%})")
+    return regressions
+
+
+def print_results(results):
+    """Print the results as a table"""
+    print(f"{'scenariusz':<18}{'przepustowość':>22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>10}")
+    for name, result in results.items():
+        throughput = f"{result['throughput']:.1f} {result['throughput_unit']}"
+        rss = f"{result['peak_rss_mb']:.1f}" if result.get("peak_rss_mb") is not None else "-"
+        print(f"{name:<18}{throughput:>22}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{rss:>10}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmarki offline z lokalnym serwerem zgodnym z OpenAI")
+    parser.add_argument("scenarios", nargs="*", help=f"scenariusze do uruchomienia: {', '.join(SCENARIOS)}")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="plik z wynikami bazowymi")
+    parser.add_argument("--update-baseline", action="store_true", help="zapisz wyniki jako nowe wyniki bazowe")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="dopuszczalna względna zmiana przepustowości i opóźnień")
+    parser.add_argument("--scale", type=float, default=1.0, help="mnożnik liczby iteracji")
+    parser.add_argument("--latency", type=float, default=0.05, help="opóźnienie pierwszego tokenu serwera (s)")
+    parser.add_argument("--tps", type=float, default=400.0, help="tokeny na sekundę serwera")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="odsetek błędnych odpowiedzi serwera")
+    parser.add_argument("--output", help="zapisz wyniki w formacie JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--count", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.child:
+        run_child(args.child, args.base_url, args.count)
+        return 0
+    
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Nieznane scenariusze: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    
+    server_options = {"latency": args.latency, "tokens_per_second": args.tps, "error_rate": args.error_rate}
+    results = {}
+    with FakeOpenAIServer(seed=0, **server_options) as server:
+        for name in names:
+            count = max(1, int(SCENARIOS[name][1] * args.scale))
+            print(f"Uruchamianie {name} ({count} iteracji)...", file=sys.stderr)
+            results[name] = run_scenario_in_subprocess(name, server.base_url, count)
+    
+    print_results(results)
+    report = {"server": server_options, "scale": args.scale, "python": sys.version.split()[0],
+              "scenarios": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Zapisano wyniki bazowe do {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print(f"Brak wyników bazowych ({args.baseline}) - uruchom z --update-baseline")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("server") != server_options or baseline.get("scale") != args.scale:
+        print("[WARNING] Parametry serwera lub skala różnią się od wyników bazowych - porównanie może być mylące")
+    
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nREGRESJA WYDAJNOŚCI:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nBrak regresji względem wyników bazowych")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
 import os
-import json
 import subprocess
+import importlib.util
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, "config", "config.json")
+CONFIG_SERVICE_PATH = os.path.join(PROJECT_ROOT, "src", "config", "config_service.py")
+
+_config_service = None
 
 def install_dependencies():
     """
@@ -26,35 +32,40 @@ def install_dependencies():
             print("2. source venv/bin/activate")
             print("3. pip install openai")
 
+def _load_config_service():
+    """
+    Zwraca usługę konfiguracji - plik config.json jest wczytywany raz na proces.
+    """
+    global _config_service
+    if _config_service is None:
+        spec = importlib.util.spec_from_file_location("config_service", CONFIG_SERVICE_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _config_service = module.ConfigService(CONFIG_PATH)
+    return _config_service
+
 def load_config():
     """
-    Wczytuje konfigurację z pliku config.json.
+    Wczytuje konfigurację z pliku config.json (z nadpisaniami ze zmiennych środowiskowych).
     """
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "config.json")
-    try:
-        with open(config_path, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Błąd: Nie znaleziono pliku konfiguracyjnego pod ścieżką {config_path}")
-        return None
-    except json.JSONDecodeError:
-        print(f"Błąd: Nieprawidłowy format pliku JSON w {config_path}")
+    service = _load_config_service()
+    if not service.loaded:
+        if not os.path.exists(CONFIG_PATH):
+            print(f"Błąd: Nie znaleziono pliku konfiguracyjnego pod ścieżką {CONFIG_PATH}")
+        else:
+            print(f"Błąd: Nieprawidłowy format pliku JSON w {CONFIG_PATH}")
         return None
+    return service.snapshot
 
 def get_api_key():
     """
-    Pobiera klucz API z pliku konfiguracyjnego lub ze zmiennych środowiskowych.
+    Pobiera klucz API ze zmiennych środowiskowych lub z pliku konfiguracyjnego.
     """
-    # Najpierw sprawdź zmienne środowiskowe
-    api_key = os.environ.get("OPENAI_API_KEY")
+    # Zmienna OPENAI_API_KEY ma pierwszeństwo - usługa konfiguracji uwzględnia ją także bez pliku
+    api_key = _load_config_service().snapshot.get("api_key")
     if api_key:
         return api_key
     
-    # Jeśli nie znaleziono w zmiennych środowiskowych, sprawdź plik konfiguracyjny
-    config = load_config()
-    if config and "api_key" in config:
-        return config["api_key"]
-    
     print("Błąd: Nie znaleziono klucza API. Ustaw zmienną środowiskową OPENAI_API_KEY lub dodaj klucz do pliku config.json.")
     return None
 
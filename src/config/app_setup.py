@@ -4,8 +4,13 @@ Application setup module for handling environment and configuration
 """
 import os
 import sys
+import glob
+import hashlib
 import subprocess
 import json
+import importlib.metadata
+
+import config_service
 
 # Constants
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,6 +18,9 @@ CONFIG_DIR = os.path.join(PROJECT_ROOT, "config")
 CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
 API_PATH = os.path.join(PROJECT_ROOT, "api.txt")
 VENV_DIR = os.path.join(PROJECT_ROOT, "venv")
+REQUIREMENTS_PATH = os.path.join(PROJECT_ROOT, "requirements.txt")
+STAMP_PATH = os.path.join(VENV_DIR, ".dependencies_stamp")
+WHEELHOUSE_DIR = os.environ.get("WIZI_WHEELHOUSE", os.path.join(PROJECT_ROOT, "wheelhouse"))
 
 
 class AppSetup:
@@ -27,7 +35,7 @@ class AppSetup:
         if not os.path.exists(VENV_DIR):
             print("Tworzenie środowiska wirtualnego...")
             try:
-                subprocess.run([sys.executable, "-m", "venv", "venv"], check=True)
+                subprocess.run([sys.executable, "-m", "venv", VENV_DIR], check=True)
                 print("Środowisko wirtualne zostało utworzone.")
             except subprocess.CalledProcessError:
                 print("Błąd: Nie udało się utworzyć środowiska wirtualnego.")
@@ -40,30 +48,93 @@ class AppSetup:
         pip_path = os.path.join(VENV_DIR, 'Scripts' if sys.platform == 'win32' else 'bin', 'pip')
         return VENV_DIR, pip_path
     
+    @staticmethod
+    def find_site_packages(venv_dir=VENV_DIR):
+        """Returns the site-packages directory of the virtual environment"""
+        if sys.platform == 'win32':
+            candidates = [os.path.join(venv_dir, 'Lib', 'site-packages')]
+        else:
+            candidates = sorted(glob.glob(os.path.join(venv_dir, 'lib', 'python*', 'site-packages')))
+        existing = [path for path in candidates if os.path.isdir(path)]
+        return existing[-1] if existing else None
+    
+    @staticmethod
+    def _canonical_name(name):
+        """Normalizes a package name for comparison (PEP 503)"""
+        return name.lower().replace('_', '-').replace('.', '-')
+    
+    @staticmethod
+    def missing_packages(venv_dir=VENV_DIR):
+        """Checks installed packages through their metadata, without starting pip"""
+        site_packages = AppSetup.find_site_packages(venv_dir)
+        if site_packages is None:
+            return list(AppSetup.REQUIRED_PACKAGES)
+        
+        installed = {
+            AppSetup._canonical_name(dist.metadata["Name"])
+            for dist in importlib.metadata.distributions(path=[site_packages])
+            if dist.metadata["Name"]
+        }
+        return [package for package in AppSetup.REQUIRED_PACKAGES
+                if AppSetup._canonical_name(package) not in installed]
+    
     @staticmethod
     def install_dependencies(pip_path):
-        """Installs required dependencies"""
-        for package in AppSetup.REQUIRED_PACKAGES:
-            try:
-                print(f"Sprawdzanie pakietu {package}...")
-                # Check if package is installed
-                result = subprocess.run(
-                    [pip_path, "show", package], 
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode != 0:
-                    print(f"Instalowanie pakietu {package}...")
-                    subprocess.run([pip_path, "install", package], check=True)
-                    print(f"Pakiet {package} został zainstalowany.")
-                else:
-                    print(f"Pakiet {package} jest już zainstalowany.")
-            except subprocess.CalledProcessError:
-                print(f"Błąd: Nie udało się zainstalować pakietu {package}.")
-                return False
+        """Installs missing dependencies with a single pip call"""
+        missing = AppSetup.missing_packages()
+        if not missing:
+            print("Wszystkie wymagane pakiety są już zainstalowane.")
+            return True
         
-        return True
+        command = [pip_path, "install"]
+        # Offline installs from a local wheelhouse when one is available
+        if os.path.isdir(WHEELHOUSE_DIR):
+            command += ["--no-index", "--find-links", WHEELHOUSE_DIR]
+        command += missing
+        
+        try:
+            print(f"Instalowanie pakietów: {', '.join(missing)}...")
+            subprocess.run(command, check=True)
+            print("Pakiety zostały zainstalowane.")
+            return True
+        except (subprocess.CalledProcessError, OSError):
+            print(f"Błąd: Nie udało się zainstalować pakietów: {', '.join(missing)}.")
+            return False
+    
+    @staticmethod
+    def environment_fingerprint(venv_dir=VENV_DIR):
+        """Hashes requirements.txt and the state of the virtual environment"""
+        digest = hashlib.sha256()
+        try:
+            with open(REQUIREMENTS_PATH, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+        digest.update(",".join(AppSetup.REQUIRED_PACKAGES).encode())
+        
+        # pyvenv.cfg changes when the venv is recreated, site-packages when packages change
+        for path in (os.path.join(venv_dir, "pyvenv.cfg"), AppSetup.find_site_packages(venv_dir)):
+            if path and os.path.exists(path):
+                digest.update(f"{path}:{os.stat(path).st_mtime_ns}".encode())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def is_environment_verified(venv_dir=VENV_DIR):
+        """Checks whether the stamp file matches the current environment"""
+        try:
+            with open(STAMP_PATH, 'r') as f:
+                return f.read().strip() == AppSetup.environment_fingerprint(venv_dir)
+        except OSError:
+            return False
+    
+    @staticmethod
+    def write_stamp(venv_dir=VENV_DIR):
+        """Records that the environment has been verified"""
+        try:
+            with open(STAMP_PATH, 'w') as f:
+                f.write(AppSetup.environment_fingerprint(venv_dir))
+        except OSError as e:
+            print(f"Ostrzeżenie: Nie udało się zapisać pliku {STAMP_PATH}: {str(e)}")
     
     @staticmethod
     def read_api_key():
@@ -102,19 +173,22 @@ class AppSetup:
     
     @staticmethod
     def load_config():
-        """Loads configuration or creates default if it doesn't exist"""
+        """
+        Loads configuration or creates default if it doesn't exist
+        
+        Returns:
+            ConfigService: Parsed configuration watched for changes, None if the file cannot be read
+        """
         # Create default configuration if it doesn't exist
         if not os.path.exists(CONFIG_PATH):
-            return AppSetup.create_default_config()
+            AppSetup.create_default_config()
         
         # Load configuration
-        try:
-            with open(CONFIG_PATH, 'r') as f:
-                config = json.load(f)
-                return config
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Błąd podczas ładowania konfiguracji: {str(e)}")
+        service = config_service.ConfigService(CONFIG_PATH)
+        if not service.loaded:
+            print(f"Błąd podczas ładowania konfiguracji: {service.last_error}")
             return None
+        return service
 
     @staticmethod
     def setup():
@@ -123,9 +197,22 @@ class AppSetup:
         
         if not AppSetup.install_dependencies(pip_path):
             return False
+        AppSetup.write_stamp(venv_dir)
         
         config = AppSetup.load_config()
         if not config:
             return False
         
-        return config, venv_dir
\ No newline at end of file
+        return config, venv_dir
+    
+    @staticmethod
+    def fast_setup():
+        """Prepares the virtual environment, skipping all checks if the stamp is valid"""
+        if os.path.exists(VENV_DIR) and AppSetup.is_environment_verified():
+            return VENV_DIR
+        
+        venv_dir, pip_path = AppSetup.ensure_venv()
+        if not AppSetup.install_dependencies(pip_path):
+            return None
+        AppSetup.write_stamp(venv_dir)
+        return venv_dir
\ No newline at end of file
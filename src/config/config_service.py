@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Configuration service for the GPT-4 Command Application
+Parses and validates config.json once, applies environment overrides and hands
+out an immutable snapshot; the file's mtime is watched and subscribers are told
+about every change, so nothing re-reads the file to get a current value
+"""
+import os
+import json
+import time
+import types
+import threading
+
+SYSTEMS = ("Linux", "Windows", "MacOS")
+
+# Environment variables taking precedence over config.json - the names the openai package reads itself
+ENV_OVERRIDES = {
+    "OPENAI_API_KEY": "api_key",
+    "OPENAI_BASE_URL": "base_url",
+}
+
+# Expected types of the known keys - unknown keys are passed through as they are
+BOOLEAN_KEYS = (
+    "store", "stream", "structured_output", "cache_enabled", "conversation_enabled", "history_enabled",
+    "tool_index_enabled", "metrics_enabled", "multi_system_enabled", "prefetch_enabled", "api_hedge_enabled",
+    "routing_enabled", "routing_escalate",
+)
+TEXT_KEYS = ("api_key", "model", "default_system", "routing_fast_model", "routing_strong_model")
+OPTIONAL_TEXT_KEYS = ("base_url", "history_path", "metrics_export_path")
+NUMBER_KEYS = (
+    "batch_size", "cache_max_entries", "cache_ttl", "conversation_budget_tokens", "conversation_summary_tokens",
+    "max_concurrent_queries", "job_max_concurrent", "output_limit_chars", "output_spill_limit_mb",
+    "large_output_threshold_chars",
+    "metrics_export_interval", "prefetch_budget_per_minute", "prefetch_debounce_ms", "results_max_tabs",
+    "results_tab_max_chars", "api_max_retries", "api_backoff_base", "api_backoff_max", "api_deadline",
+    "api_circuit_threshold", "api_circuit_reset", "routing_threshold", "routing_fast_budget",
+    "routing_strong_budget",
+)
+OPTIONAL_NUMBER_KEYS = ("job_timeout", "job_cpu_seconds", "job_memory_mb")
+
+
+def validate(data):
+    """
+    Check the types of the known keys
+    
+    Args:
+        data (dict): Parsed config.json
+    
+    Returns:
+        tuple: (dict without the invalid values, list of problems)
+    
+    Raises:
+        ValueError: If the file does not hold a JSON object
+    """
+    if not isinstance(data, dict):
+        raise ValueError("the file must hold a JSON object")
+    valid = {}
+    problems = []
+    for key, value in data.items():
+        if key in BOOLEAN_KEYS:
+            ok = isinstance(value, bool)
+        elif key in TEXT_KEYS or key in OPTIONAL_TEXT_KEYS:
+            ok = isinstance(value, str) or (value is None and key in OPTIONAL_TEXT_KEYS)
+        elif key in NUMBER_KEYS or key in OPTIONAL_NUMBER_KEYS:
+            ok = (isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0) \
+                or (value is None and key in OPTIONAL_NUMBER_KEYS)
+        else:
+            ok = True
+        if ok and key == "default_system":
+            ok = value in SYSTEMS
+        if ok:
+            valid[key] = value
+        else:
+            problems.append(f"{key}: {value!r}")
+    return valid, problems
+
+
+class ConfigService:
+    """Current configuration as a read-only mapping, reloaded when config.json changes"""
+    
+    CHECK_INTERVAL = 1.0
+    
+    def __init__(self, path, environ=None, check_interval=CHECK_INTERVAL):
+        """
+        Load the configuration
+        
+        Args:
+            path (str): Path to config.json
+            environ (dict, optional): Environment to read overrides from, os.environ if omitted
+            check_interval (float): Minimum seconds between mtime checks
+        """
+        self.path = path
+        self.environ = os.environ if environ is None else environ
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.last_error = None
+        self.last_changed = ()
+        self._loaded = False
+        self._last_check = 0.0
+        self._seen_mtime = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._snapshot = types.MappingProxyType(self._with_overrides({}))
+        self.reload()
+    
+    @property
+    def snapshot(self):
+        """Current configuration - an immutable mapping, replaced as a whole on every change"""
+        return self._snapshot
+    
+    @property
+    def loaded(self):
+        """True once the file has been read successfully"""
+        return self._loaded
+    
+    def _with_overrides(self, data):
+        for variable, key in ENV_OVERRIDES.items():
+            value = self.environ.get(variable)
+            if value:
+                data[key] = value
+        return data
+    
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def subscribe(self, callback):
+        """Call callback(snapshot) after every change - in the thread that called maybe_reload"""
+        self._subscribers.append(callback)
+    
+    def reload(self):
+        """
+        Read, validate and swap in the file, notifying subscribers if any value changed
+        
+        A file that cannot be read or parsed keeps the previous configuration active.
+        
+        Returns:
+            bool: True if a new configuration was activated
+        """
+        with self._lock:
+            mtime_ns = self._mtime()
+            # Remember the mtime even on failure so a broken file is not re-read on every check
+            self._seen_mtime = mtime_ns
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data, problems = validate(json.load(f))
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                if self._loaded:
+                    print(f"[WARNING] Failed to reload configuration {self.path}, keeping the previous one: "
+                          f"{str(e)}")
+                return False
+            for problem in problems:
+                print(f"[WARNING] Ignoring invalid configuration value {problem}")
+            
+            previous = self._snapshot
+            snapshot = types.MappingProxyType(self._with_overrides(data))
+            changed = tuple(sorted(key for key in set(previous) | set(snapshot)
+                                   if previous.get(key) != snapshot.get(key)))
+            first = not self._loaded
+            self._snapshot = snapshot
+            self._loaded = True
+            self.last_error = None
+            self.last_changed = changed
+            self.reloads += 1
+        
+        if changed and not first:
+            for callback in list(self._subscribers):
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"[WARNING] Configuration subscriber failed: {str(e)}")
+        return True
+    
+    def maybe_reload(self):
+        """Reload if the file's mtime changed - checked at most every check_interval seconds"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        mtime_ns = self._mtime()
+        if mtime_ns is None or mtime_ns == self._seen_mtime:
+            return False
+        return self.reload()
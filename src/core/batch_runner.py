@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Headless batch mode for the GPT-4 Command Application
+Translates many queries concurrently and writes JSONL results
+"""
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+import translator
+
+DEFAULT_PARALLELISM = 8
+
+
+def parse_batch_args(argv):
+    """
+    Parse command line arguments of the batch mode
+    
+    Args:
+        argv (list): Arguments after the program name, starting with --batch
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="app.py --batch",
+        description="Tłumaczy zapytania z pliku (jedno na linię lub JSONL) bez interfejsu graficznego"
+    )
+    parser.add_argument("--batch", metavar="FILE", required=True,
+                        help="plik z zapytaniami lub '-' dla standardowego wejścia")
+    parser.add_argument("--output", "-o", metavar="FILE", default="-",
+                        help="plik wynikowy JSONL, domyślnie standardowe wyjście")
+    parser.add_argument("--parallel", "-j", type=int, default=DEFAULT_PARALLELISM,
+                        help=f"maksymalna liczba równoczesnych zapytań (domyślnie {DEFAULT_PARALLELISM})")
+    parser.add_argument("--system", choices=translator.SYSTEMS, default=None,
+                        help="system docelowy, domyślnie default_system z konfiguracji")
+    parser.add_argument("--batch-size", "-n", type=int, default=None,
+                        help="liczba zapytań jednego systemu wysyłanych w jednym wywołaniu API "
+                             "(domyślnie batch_size z konfiguracji albo 1 - każde zapytanie osobno)")
+    return parser.parse_args(argv)
+
+
+def read_queries(stream, default_system):
+    """
+    Yield (id, query, system) tuples from an input stream
+    
+    Lines starting with '{' are read as JSON objects with "query" and optional
+    "id" and "system" keys, any other non-empty line is a query on its own.
+    A JSON line that cannot be used yields its error record (a dict) instead,
+    so one broken line does not stop the run.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if not line.startswith("{"):
+            yield line_number, line, default_system
+            continue
+        item = None
+        try:
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                raise TypeError("expected a JSON object")
+            query = item["query"]
+            system = item.get("system", default_system)
+            if not isinstance(query, str) or not query.strip():
+                raise TypeError('"query" must be a non-empty string')
+            if system not in translator.SYSTEMS:
+                raise ValueError(f'unsupported "system" {system!r}, expected one of {", ".join(translator.SYSTEMS)}')
+        except (ValueError, KeyError, TypeError) as e:
+            known = item if isinstance(item, dict) else {}
+            record = _error_record(known.get("query"), known.get("system", default_system), e)
+            record["id"] = known.get("id", line_number)
+            yield record
+            continue
+        yield item.get("id", line_number), query, system
+
+
+def _error_record(query, system, error):
+    """Record of an item that could not be translated"""
+    return {"query": query, "system": system, "command": None, "response": None,
+            "from_cache": False, "local": False, "ttft": None, "elapsed": None,
+            "error": f"{type(error).__name__}: {str(error)}"}
+
+
+def _translate_item(pipeline, item_id, query, system):
+    """Translate a single item, turning failures into an error record"""
+    try:
+        record = pipeline.translate(query, system).to_dict()
+        record["error"] = None
+    except Exception as e:
+        record = _error_record(query, system, e)
+    record["id"] = item_id
+    return record
+
+
+def _translate_group(pipeline, items, batch_size):
+    """Translate consecutive items, packing the queries of each system into shared requests
+    
+    Returns:
+        list: Records in the order of items
+    """
+    by_system = {}
+    records = [None] * len(items)
+    for position, item in enumerate(items):
+        if isinstance(item, dict):
+            records[position] = item
+            continue
+        _, query, system = item
+        by_system.setdefault(system, []).append((position, query))
+    
+    for system, entries in by_system.items():
+        results = pipeline.translate_many([query for _, query in entries], system, batch_size)
+        for (position, query), result in zip(entries, results):
+            if isinstance(result, Exception):
+                record = _error_record(query, system, result)
+            else:
+                record = result.to_dict()
+                record["error"] = None
+            record["id"] = items[position][0]
+            records[position] = record
+    return records
+
+
+def run_batch(pipeline, items, output, parallelism=DEFAULT_PARALLELISM, batch_size=1):
+    """
+    Translate items concurrently and write one JSON line per item, in input order
+    
+    At most 2 * parallelism items (groups when batch_size > 1) are held in
+    memory, so arbitrarily long inputs can be processed.
+    
+    Args:
+        pipeline (Translator): Translation pipeline
+        items (iterable): (id, query, system) tuples, or finished error records of unreadable lines
+        output (file): Text stream receiving JSONL
+        parallelism (int): Maximum number of concurrent API calls
+        batch_size (int): Consecutive items of one system sent in a single API call
+    
+    Returns:
+        dict: Summary with counts and throughput
+    """
+    parallelism = max(1, parallelism)
+    batch_size = max(1, batch_size)
+    window = deque()
+    summary = {"total": 0, "errors": 0, "cache_hits": 0}
+    started = time.perf_counter()
+    
+    def write(record):
+        summary["total"] += 1
+        if record["error"]:
+            summary["errors"] += 1
+        elif record["from_cache"]:
+            summary["cache_hits"] += 1
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="batch") as executor:
+        if batch_size == 1:
+            for item in items:
+                if isinstance(item, dict):
+                    # Already an error record - queued so it is written in input order
+                    future = Future()
+                    future.set_result(item)
+                    window.append(future)
+                else:
+                    window.append(executor.submit(_translate_item, pipeline, *item))
+                while len(window) >= 2 * parallelism:
+                    write(window.popleft().result())
+            while window:
+                write(window.popleft().result())
+        else:
+            group = []
+            for item in items:
+                group.append(item)
+                if len(group) < batch_size:
+                    continue
+                window.append(executor.submit(_translate_group, pipeline, group, batch_size))
+                group = []
+                while len(window) >= 2 * parallelism:
+                    for record in window.popleft().result():
+                        write(record)
+            if group:
+                window.append(executor.submit(_translate_group, pipeline, group, batch_size))
+            while window:
+                for record in window.popleft().result():
+                    write(record)
+    output.flush()
+    
+    elapsed = time.perf_counter() - started
+    summary["elapsed"] = elapsed
+    summary["per_second"] = summary["total"] / elapsed if elapsed else 0.0
+    return summary
+
+
+def main(argv, config):
+    """
+    Entry point of the batch mode
+    
+    Args:
+        argv (list): Command line arguments after the program name
+        config (dict): Application configuration
+    
+    Returns:
+        bool: True if every item was translated
+    """
+    args = parse_batch_args(argv)
+    system = args.system or config.get("default_system", "Linux")
+    pipeline = translator.Translator.from_config(config, max_connections=args.parallel)
+    
+    source = sys.stdin if args.batch == "-" else open(args.batch, 'r', encoding='utf-8')
+    target = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    try:
+        batch_size = args.batch_size or config.get("batch_size", 1)
+        summary = run_batch(pipeline, read_queries(source, system), target, args.parallel, batch_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        pipeline.client_manager.close()
+        if pipeline.response_cache is not None:
+            pipeline.response_cache.flush()
+    
+    print(f"Przetworzono {summary['total']} zapytań w {summary['elapsed']:.1f} s "
+          f"({summary['per_second']:.1f}/s), z pamięci podręcznej: {summary['cache_hits']}, "
+          f"błędy: {summary['errors']}", file=sys.stderr)
+    print(metrics.registry.format_table(), file=sys.stderr)
+    if config.get("metrics_export_path"):
+        metrics.registry.export_jsonl(config["metrics_export_path"])
+    return summary["errors"] == 0
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+OpenAI client manager for the GPT-4 Command Application
+Keeps one long-lived client (and its asyncio twin) with pooled keep-alive connections
+"""
+import asyncio
+import importlib
+import threading
+
+
+class ClientManager:
+    """Owns the OpenAI client and the HTTP connection pool behind it"""
+    
+    # Connection pool settings
+    MAX_CONNECTIONS = 10
+    MAX_KEEPALIVE_CONNECTIONS = 5
+    KEEPALIVE_EXPIRY = 300.0
+    REQUEST_TIMEOUT = 60.0
+    CONNECT_TIMEOUT = 10.0
+    
+    def __init__(self, config, max_connections=None):
+        """
+        Initialize the manager without building the client yet
+        
+        Args:
+            config (dict): Application configuration with api_key and model
+            max_connections (int, optional): Pool size, for callers running many requests at once
+        """
+        self.config = config
+        self.max_connections = max_connections or self.MAX_CONNECTIONS
+        self._lock = threading.Lock()
+        self._client = None
+        self._http_client = None
+        self._client_key = None
+        
+        # Async client - only ever touched from the background event loop thread
+        self._async_client = None
+        self._async_http_client = None
+        self._async_client_key = None
+    
+    @staticmethod
+    def _key_for(config):
+        """Return the config values that require a new client when changed"""
+        return config.get("api_key", ""), config.get("model", "gpt-4o-mini"), config.get("base_url")
+    
+    def update_config(self, config):
+        """Replace the configuration - the client is rebuilt lazily if needed"""
+        self.config = config
+    
+    def get_client(self, config=None):
+        """
+        Return the shared client, rebuilding it only if api_key, model or base_url changed
+        
+        Args:
+            config (dict, optional): Configuration to use instead of the stored one
+        
+        Returns:
+            OpenAI: Ready to use client
+        
+        Raises:
+            ImportError: If the openai package is not installed
+        """
+        if config is not None:
+            self.config = config
+        client_key = self._key_for(self.config)
+        
+        with self._lock:
+            if self._client is None or client_key != self._client_key:
+                self._close_locked()
+                self._client = self._build_client(client_key[0], client_key[2])
+                self._client_key = client_key
+            return self._client
+    
+    def _build_client(self, api_key, base_url=None):
+        """Create the OpenAI client on top of a pooled httpx client
+        
+        base_url points the client at any OpenAI-compatible endpoint, None uses the default.
+        The SDK does not retry - RequestPolicy owns retries.
+        """
+        from openai import OpenAI
+        
+        try:
+            import httpx
+        except ImportError:
+            # Newer openai releases ship their own HTTP stack - it still pools connections
+            self._http_client = None
+            return OpenAI(api_key=api_key, base_url=base_url, timeout=self.REQUEST_TIMEOUT, max_retries=0)
+        
+        self._http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=min(self.max_connections, max(self.MAX_KEEPALIVE_CONNECTIONS,
+                                                                        self.max_connections // 2)),
+                keepalive_expiry=self.KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(self.REQUEST_TIMEOUT, connect=self.CONNECT_TIMEOUT)
+        )
+        return OpenAI(api_key=api_key, base_url=base_url, http_client=self._http_client, max_retries=0)
+    
+    def get_async_client(self, config=None):
+        """
+        Return the shared AsyncOpenAI client - call only from the event loop thread
+        
+        Args:
+            config (dict, optional): Configuration to use instead of the stored one
+        
+        Returns:
+            AsyncOpenAI: Ready to use client
+        
+        Raises:
+            ImportError: If the openai package is not installed
+        """
+        if config is not None:
+            self.config = config
+        client_key = self._key_for(self.config)
+        
+        if self._async_client is None or client_key != self._async_client_key:
+            if self._async_client is not None:
+                # Close the replaced client's pool in the background
+                asyncio.get_running_loop().create_task(self._async_client.close())
+            self._async_client = self._build_async_client(client_key[0], client_key[2])
+            self._async_client_key = client_key
+        return self._async_client
+    
+    def _build_async_client(self, api_key, base_url=None):
+        """Create the AsyncOpenAI client on top of a pooled httpx.AsyncClient"""
+        from openai import AsyncOpenAI
+        
+        try:
+            import httpx
+        except ImportError:
+            self._async_http_client = None
+            return AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=self.REQUEST_TIMEOUT, max_retries=0)
+        
+        self._async_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=min(self.max_connections, max(self.MAX_KEEPALIVE_CONNECTIONS,
+                                                                        self.max_connections // 2)),
+                keepalive_expiry=self.KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(self.REQUEST_TIMEOUT, connect=self.CONNECT_TIMEOUT)
+        )
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._async_http_client, max_retries=0)
+    
+    @staticmethod
+    def import_api_stack():
+        """
+        Import openai so that building the first client does not stall - meant for a background thread
+        
+        Returns:
+            bool: True if the openai package is installed
+        """
+        try:
+            importlib.import_module("openai")
+            return True
+        except ImportError:
+            return False
+    
+    def warm_up(self):
+        """
+        Import the API stack, build the client and open a connection to the API host
+        
+        Returns:
+            bool: True if the client is ready, False otherwise
+        """
+        try:
+            client = self.get_client()
+            if not client.api_key:
+                return False
+            # Any response will do - the point is the TLS handshake landing in the pool
+            if self._http_client is not None:
+                self._http_client.head(str(client.base_url))
+            else:
+                client.with_options(timeout=self.CONNECT_TIMEOUT, max_retries=0).models.list()
+            return True
+        except ImportError:
+            return False
+        except Exception as e:
+            print(f"[WARNING] Client warm-up failed: {str(e)}")
+            return False
+    
+    def warm_up_async(self):
+        """Run warm_up in a background thread so the window opens immediately"""
+        thread = threading.Thread(target=self.warm_up, daemon=True)
+        thread.start()
+        return thread
+    
+    async def awarm_up(self):
+        """
+        Async counterpart of warm_up, run on the event loop
+        
+        Returns:
+            bool: True if the async client is ready, False otherwise
+        """
+        try:
+            # Importing openai takes long enough to stall every other task on the loop
+            await asyncio.to_thread(importlib.import_module, "openai")
+            client = self.get_async_client()
+            if not client.api_key:
+                return False
+            if self._async_http_client is not None:
+                await self._async_http_client.head(str(client.base_url))
+            else:
+                await client.with_options(timeout=self.CONNECT_TIMEOUT, max_retries=0).models.list()
+            return True
+        except ImportError:
+            return False
+        except Exception as e:
+            print(f"[WARNING] Client warm-up failed: {str(e)}")
+            return False
+    
+    async def aclose(self):
+        """Close the async client - run on the event loop"""
+        if self._async_client is not None:
+            try:
+                await self._async_client.close()
+            except Exception:
+                pass
+        self._async_client = None
+        self._async_http_client = None
+        self._async_client_key = None
+    
+    def _close_locked(self):
+        """Close the current client - caller must hold the lock"""
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+        self._client = None
+        self._http_client = None
+        self._client_key = None
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._lock:
+            self._close_locked()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Response parser for the GPT-4 Command Application
+Extracts a ranked list of candidate commands and the explanation from a model
+answer - structured JSON, the "command ### description" format, fenced code
+blocks or plain prose - and can follow an answer while it is being streamed
+"""
+import re
+import json
+
+SEPARATOR = "###"
+
+# Code block languages that are run in a terminal
+SHELL_LANGUAGES = ("bash", "sh", "shell", "zsh", "console", "terminal", "powershell", "pwsh", "ps1", "ps",
+                   "cmd", "bat", "batch")
+
+# Instruction and response schema of the structured output mode
+STRUCTURED_INSTRUCTION = (
+    "Odpowiedź zwróć jako obiekt JSON: \"commands\" - lista komend do wykonania, najlepsza pierwsza "
+    "(komenda może być skryptem z wieloma liniami, bez znaczników ```), \"explanation\" - tekst, "
+    "który w zwykłym formacie podajesz po znaku ###."
+)
+STRUCTURED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "command_answer",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "commands": {"type": "array", "items": {"type": "string"}},
+                "explanation": {"type": "string"}
+            },
+            "required": ["commands", "explanation"],
+            "additionalProperties": False
+        }
+    }
+}
+
+_FENCE = re.compile(r"^[ \t]*```[ \t]*([\w+-]*)[^\n]*\n(.*?)^[ \t]*```[ \t]*$", re.DOTALL | re.MULTILINE)
+_INLINE_CODE = re.compile(r"`([^`\n]+)`")
+_PROMPT = re.compile(r"^(?:\$|#|>|PS [^>]*>|PS>|C:\\[^>]*>)\s+")
+_COMMAND_START = re.compile(
+    r"^(?:sudo\s|\.{0,2}/|~/|[A-Za-z]:\\|%\w+%|\$\w|[a-z][\w.+-]*(?:\s|$)|[A-Z][a-z]+-[A-Z]\w*(?:\s|$))"
+)
+_SHELL_SYNTAX = re.compile(r"\s-{1,2}\w|[|;<>]|&&|\$\(|`")
+
+
+class ParsedResponse:
+    """Candidate commands of an answer, best first, and its explanation"""
+    
+    def __init__(self, commands, explanation="", source="first_line"):
+        self.commands = commands
+        self.explanation = explanation
+        self.source = source
+    
+    @property
+    def command(self):
+        """The best candidate, empty if there is none"""
+        return self.commands[0] if self.commands else ""
+    
+    def format(self):
+        """The answer in the application's "command ### explanation" format, other candidates
+        as code blocks after the explanation
+        """
+        text = f"{self.command}\n{SEPARATOR}\n{self.explanation}".strip()
+        if len(self.commands) > 1:
+            alternatives = "\n".join(f"```\n{command}\n```" for command in self.commands[1:])
+            text += f"\n\nAlternatywy:\n{alternatives}"
+        return text
+
+
+def looks_like_command(line):
+    """True if a line reads as a shell command rather than prose"""
+    line = _PROMPT.sub("", line.strip())
+    if not line or line.endswith(":") or line.startswith(SEPARATOR):
+        return False
+    if not _COMMAND_START.match(line):
+        return False
+    # A sentence: several words, no shell syntax, ending like prose
+    words = line.split()
+    if not _SHELL_SYNTAX.search(line) and (line.endswith((".", "?", "!")) or len(words) > 6):
+        return False
+    return True
+
+
+def _strip_prompts(block):
+    """Remove "$ " style prompts copied from a terminal session"""
+    return "\n".join(_PROMPT.sub("", line) for line in block.strip().splitlines()).strip()
+
+
+def _dedupe(commands):
+    seen = set()
+    result = []
+    for command in commands:
+        command = command.strip()
+        if command and command not in seen:
+            seen.add(command)
+            result.append(command)
+    return result
+
+
+def _parse_structured(text):
+    """ParsedResponse of a structured JSON answer, None if text is not one"""
+    stripped = text.strip()
+    if not stripped.startswith("{"):
+        return None
+    try:
+        data = json.loads(stripped)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    commands = data.get("commands")
+    if commands is None and isinstance(data.get("command"), str):
+        commands = [data["command"]]
+    if not isinstance(commands, list):
+        return None
+    explanation = data.get("explanation", "")
+    return ParsedResponse(_dedupe(_strip_prompts(command) for command in commands if isinstance(command, str)),
+                          explanation if isinstance(explanation, str) else "", "structured")
+
+
+def _fenced_blocks(text):
+    """Commands of the closed code blocks, shell blocks first, then untagged, then the rest"""
+    ranked = []
+    for match in _FENCE.finditer(text):
+        language = match.group(1).lower()
+        block = _strip_prompts(match.group(2))
+        if not block:
+            continue
+        if language in SHELL_LANGUAGES:
+            rank = 0
+        elif not language:
+            rank = 1
+        else:
+            rank = 2
+        ranked.append((rank, len(ranked), block))
+    return [block for _, _, block in sorted(ranked)]
+
+
+def _command_section(section):
+    """Commands of the part before ###: the whole script, then its separate lines"""
+    blocks = _fenced_blocks(section)
+    if blocks:
+        return blocks
+    lines = [_PROMPT.sub("", line.strip()) for line in section.strip().splitlines()]
+    lines = [line for line in lines if line and not line.startswith("```")]
+    commands = [line for line in lines if looks_like_command(line)]
+    if not commands:
+        # The model kept the format but wrote something unusual - trust the format
+        return ["\n".join(lines)] if lines else []
+    if len(commands) == 1:
+        return commands
+    return ["\n".join(commands)] + commands
+
+
+def parse_response(text):
+    """
+    Extract candidate commands and the explanation from an answer
+    
+    Args:
+        text (str): Complete answer of the model
+    
+    Returns:
+        ParsedResponse: Candidates ranked by how the answer marked them
+    """
+    structured = _parse_structured(text)
+    if structured is not None:
+        return structured
+    
+    head, separator, tail = text.partition(f"\n{SEPARATOR}")
+    if separator:
+        commands = _command_section(head)
+        if commands:
+            # Code blocks in the explanation are alternatives
+            return ParsedResponse(_dedupe(commands + _fenced_blocks(tail)), tail.lstrip("#").strip(), "separator")
+    
+    # No command section - fenced blocks, then inline code and command-like lines of the prose
+    blocks = _fenced_blocks(text)
+    prose = _FENCE.sub("", text)
+    inline = [code for code in _INLINE_CODE.findall(prose) if looks_like_command(code)]
+    lines = [_PROMPT.sub("", line.strip()) for line in prose.splitlines() if looks_like_command(line)]
+    if blocks:
+        return ParsedResponse(_dedupe(blocks + inline + lines), prose.strip(), "fenced")
+    if inline or lines:
+        return ParsedResponse(_dedupe(lines + inline), text.strip(), "prose")
+    
+    first_line = text.strip().split("\n")[0]
+    return ParsedResponse(_dedupe([first_line]), text.strip(), "first_line")
+
+
+def normalize_response(text):
+    """Turn a structured JSON answer into the "command ### explanation" format, other answers pass unchanged"""
+    structured = _parse_structured(text)
+    if structured is None:
+        return text
+    return structured.format()
+
+
+class StreamingParser:
+    """Follows a streamed answer and reports the best command as soon as it can be trusted
+    
+    Only complete lines are parsed. The result settles once the command section
+    (### separator) or the first code block is complete; until then a command-like
+    first line is offered early and may still be replaced by a longer script.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.result = None
+        self.settled = False
+        self._parsed_upto = 0
+    
+    def feed(self, delta):
+        """
+        Add a streamed delta
+        
+        Returns:
+            bool: True if the best command changed
+        """
+        self.text += delta
+        if self.settled:
+            return False
+        complete = self.text.rfind("\n")
+        if complete < 0 or complete == self._parsed_upto:
+            return False
+        self._parsed_upto = complete
+        partial = self.text[:complete]
+        
+        parsed = parse_response(partial)
+        if parsed.source in ("separator", "fenced"):
+            self.settled = True
+        elif parsed.source in ("first_line", "prose") and not looks_like_command(parsed.command):
+            return False
+        elif parsed.source == "structured":
+            # Partial JSON never parses - structured answers are handled by finish()
+            return False
+        return self._update(parsed)
+    
+    def finish(self):
+        """
+        Parse the complete answer
+        
+        Returns:
+            bool: True if the best command changed
+        """
+        self.settled = True
+        return self._update(parse_response(self.text))
+    
+    def _update(self, parsed):
+        changed = self.result is None or parsed.command != self.result.command
+        self.result = parsed
+        return changed
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Conversation memory for the GPT-4 Command Application
+Keeps previous turns and executed commands within a token budget, compacting
+the oldest turns into a short summary once the budget is exceeded
+"""
+import re
+import threading
+
+import token_counter
+
+# Words pointing back at an earlier turn - "teraz to samo dla /var/log", "a zamiast tego..."
+_FOLLOW_UP_MARKERS = re.compile(
+    r"\b(?:to\s+samo|tak\s+samo|tego|tej|ten|tam|teraz|jeszcze|zamiast|poprzedni\w*|powyższ\w*|wynik\w*|"
+    r"same|again|it|that|those|them|there|instead|previous|above|output|now)\b",
+    re.IGNORECASE
+)
+
+
+def is_follow_up(query):
+    """True if the query refers to an earlier turn rather than standing on its own"""
+    return bool(_FOLLOW_UP_MARKERS.search(query))
+
+
+def cache_context(history, query):
+    """
+    Return the part of the history an answer depends on, for the response cache key
+    
+    A standalone query is answered the same whatever came before, so it gets None and shares
+    its cache entry with the same query in any session. A follow-up depends on the newest turn
+    (with its executed command) it refers to, not on the whole transcript.
+    
+    Args:
+        history (list): Chat messages from Conversation.history_messages()
+        query (str): User request
+    
+    Returns:
+        list: Messages of the newest turn, None for standalone queries or an empty history
+    """
+    if not history or not is_follow_up(query):
+        return None
+    for position in range(len(history) - 1, 0, -1):
+        if history[position]["role"] == "assistant":
+            return history[position - 1:]
+    return history
+
+
+class Conversation:
+    """Turns of one session, sent to the API as chat history"""
+    
+    DEFAULT_BUDGET_TOKENS = 1500
+    DEFAULT_SUMMARY_TOKENS = 300
+    
+    # Characters of command output kept with an executed command
+    OUTPUT_TAIL_CHARS = 400
+    
+    # Role framing added by token_counter.count_message_tokens for every message
+    MESSAGE_OVERHEAD = 4
+    
+    def __init__(self, model="gpt-4o-mini", budget_tokens=DEFAULT_BUDGET_TOKENS,
+                 summary_tokens=DEFAULT_SUMMARY_TOKENS):
+        """
+        Initialize an empty session
+        
+        Args:
+            model (str): Model whose tokenizer measures the history
+            budget_tokens (int): Maximum tokens of history sent with a query,
+                the summary included
+            summary_tokens (int): Maximum tokens of the summary of compacted turns
+        """
+        self.model = model
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.compacted = 0
+        # Bumped on every change, so callers can tell whether a history they sent is still current
+        self.revision = 0
+        self._turns = []
+        self._summary_lines = []
+        self._summary_size = 0
+        self._turn_tokens = 0
+        self._lock = threading.Lock()
+    
+    def _count(self, text):
+        return token_counter.count_tokens(text, self.model) + self.MESSAGE_OVERHEAD
+    
+    def add_turn(self, query, system, response, command):
+        """
+        Remember an answered query
+        
+        Args:
+            query (str): User request
+            system (str): Target system of the request
+            response (str): Full answer of the model
+            command (str): Command extracted from the answer
+        """
+        turn = {
+            "query": query,
+            "system": system,
+            "response": response,
+            "command": command,
+            "execution": None,
+        }
+        turn["tokens"] = self._count(query) + self._count(response)
+        with self._lock:
+            self._turns.append(turn)
+            self._turn_tokens += turn["tokens"]
+            self.revision += 1
+            self._compact_locked()
+    
+    def record_execution(self, command, exit_code, output=""):
+        """
+        Attach an executed command and its exit status to the latest turn
+        
+        Args:
+            command (str): Command as executed (possibly edited by the user)
+            exit_code (int): Exit status of the command
+            output (str): Output of the command, only its tail is kept
+        """
+        tail = output[-self.OUTPUT_TAIL_CHARS:].strip()
+        note = f"[Wykonano: {command} | kod wyjścia: {exit_code}]"
+        if tail:
+            note += f"\n{tail}"
+        with self._lock:
+            if not self._turns:
+                return
+            turn = self._turns[-1]
+            if turn["execution"] is not None:
+                turn["tokens"] -= turn["execution"]["tokens"]
+                self._turn_tokens -= turn["execution"]["tokens"]
+            turn["execution"] = {"command": command, "exit_code": exit_code, "note": note,
+                                 "tokens": self._count(note)}
+            turn["tokens"] += turn["execution"]["tokens"]
+            self._turn_tokens += turn["execution"]["tokens"]
+            self.revision += 1
+            self._compact_locked()
+    
+    def _summary_line(self, turn):
+        """One summary line for a compacted turn"""
+        line = f"- ({turn['system']}) {turn['query']} -> {turn['command']}"
+        if turn["execution"] is not None:
+            execution = turn["execution"]
+            if execution["command"] != turn["command"]:
+                line += f" (wykonano: {execution['command']})"
+            line += f" [kod wyjścia: {execution['exit_code']}]"
+        return line
+    
+    def _compact_locked(self):
+        """Move the oldest turns into the summary until the history fits - caller must hold the lock"""
+        # The newest turn is always kept in full
+        while len(self._turns) > 1 and self._turn_tokens + self._summary_size > self.budget_tokens:
+            turn = self._turns.pop(0)
+            self._turn_tokens -= turn["tokens"]
+            line = self._summary_line(turn)
+            self._summary_lines.append((line, token_counter.count_tokens(line, self.model) + 1))
+            self.compacted += 1
+            self._summary_size = self.MESSAGE_OVERHEAD + sum(tokens for _, tokens in self._summary_lines)
+            
+            # The summary itself is bounded - the oldest lines go first
+            while len(self._summary_lines) > 1 and self._summary_size > self.summary_tokens:
+                _, tokens = self._summary_lines.pop(0)
+                self._summary_size -= tokens
+    
+    def history_messages(self):
+        """
+        Return the history as chat messages to put between the system message and a new query
+        
+        Returns:
+            list: Message dicts, empty for a new session
+        """
+        with self._lock:
+            messages = []
+            if self._summary_lines:
+                summary = "\n".join(line for line, _ in self._summary_lines)
+                messages.append({"role": "system", "content": f"Wcześniejsza część rozmowy:\n{summary}"})
+            for turn in self._turns:
+                messages.append({"role": "user", "content": turn["query"]})
+                messages.append({"role": "assistant", "content": turn["response"]})
+                if turn["execution"] is not None:
+                    messages.append({"role": "user", "content": turn["execution"]["note"]})
+            return messages
+    
+    def is_empty(self):
+        """True if nothing was remembered yet"""
+        with self._lock:
+            return not self._turns and not self._summary_lines
+    
+    def clear(self):
+        """Start a new session"""
+        with self._lock:
+            self._turns = []
+            self._summary_lines = []
+            self._summary_size = 0
+            self._turn_tokens = 0
+            self.revision += 1
+    
+    def stats(self):
+        """
+        Return the size of the session
+        
+        Returns:
+            dict: Turns kept in full, compacted turns and history tokens
+        """
+        with self._lock:
+            return {
+                "turns": len(self._turns),
+                "compacted": self.compacted,
+                "summary_lines": len(self._summary_lines),
+                "tokens": self._turn_tokens + self._summary_size,
+                "budget_tokens": self.budget_tokens
+            }
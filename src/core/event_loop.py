@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Background asyncio loop for the GPT-4 Command Application
+All API requests and command executions share one event loop thread; results
+reach the Tk main loop through a thread-safe queue drained by a single after() pump
+"""
+import os
+import sys
+import asyncio
+import queue
+import threading
+import warnings
+
+
+class BackgroundLoop:
+    """An asyncio event loop running in one daemon thread"""
+    
+    def __init__(self, name="asyncio-backend"):
+        """
+        Create the loop without starting its thread
+        
+        Args:
+            name (str): Name of the loop thread
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._ready = threading.Event()
+    
+    def _install_child_watcher(self):
+        """Wait for subprocesses through pidfds instead of one thread per process
+        
+        Python 3.12+ does this by default; older versions fall back to a thread per child.
+        """
+        if sys.version_info >= (3, 12) or sys.platform == "win32" or not hasattr(os, "pidfd_open"):
+            return
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+        except OSError:
+            # Kernel older than 5.3
+            return
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(self.loop)
+            asyncio.set_child_watcher(watcher)
+    
+    def _run(self):
+        """Thread body - runs the loop until stop() is called"""
+        asyncio.set_event_loop(self.loop)
+        self._install_child_watcher()
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+    
+    def start(self):
+        """Start the loop thread and wait until the loop is running"""
+        if not self._thread.is_alive():
+            self._thread.start()
+            self._ready.wait()
+        return self
+    
+    @property
+    def running(self):
+        """True while the loop thread is alive"""
+        return self._thread.is_alive()
+    
+    def in_loop_thread(self):
+        """True if called from the loop thread"""
+        return threading.current_thread() is self._thread
+    
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop from any thread
+        
+        Args:
+            coro (coroutine): Coroutine to run
+        
+        Returns:
+            concurrent.futures.Future: Result of the coroutine, cancel() cancels the task
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and wait for its result - never call from the loop thread"""
+        return self.submit(coro).result(timeout)
+    
+    def call_soon(self, fn, *args):
+        """Call fn(*args) in the loop thread"""
+        self.loop.call_soon_threadsafe(fn, *args)
+    
+    def call_later(self, delay, fn, *args):
+        """Call fn(*args) in the loop thread after delay seconds"""
+        if self.in_loop_thread():
+            self.loop.call_later(delay, fn, *args)
+        else:
+            self.loop.call_soon_threadsafe(self.loop.call_later, delay, fn, *args)
+    
+    def stop(self, timeout=2.0):
+        """Cancel pending tasks and stop the loop thread"""
+        if not self.running:
+            return
+        
+        async def cancel_tasks():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        try:
+            self.run(cancel_tasks(), timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+
+class UiQueue:
+    """Thread-safe queue of callbacks run in the Tk thread by one periodic after() pump
+    
+    Callbacks posted with post_latest() under the same key are merged: only the
+    newest one runs, at the position of the newest post, so a burst of status or
+    pane updates costs one redraw per frame.
+    """
+    
+    DEFAULT_INTERVAL_MS = 16
+    
+    def __init__(self, root, interval_ms=DEFAULT_INTERVAL_MS):
+        """
+        Initialize the queue
+        
+        Args:
+            root: Tk root (anything with after()) whose thread runs the callbacks
+            interval_ms (int): Pump period - also the longest a posted callback waits
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.processed = 0
+        self.coalesced = 0
+        self._queue = queue.SimpleQueue()
+        self._latest = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._running = False
+    
+    def post(self, fn, *args):
+        """Queue fn(*args) for the Tk thread - safe to call from any thread"""
+        self._queue.put((fn, args))
+    
+    def post_latest(self, key, fn, *args):
+        """Queue fn(*args) for the Tk thread, replacing a callback still waiting under the same key"""
+        with self._lock:
+            if key in self._latest:
+                self.coalesced += 1
+            self._sequence += 1
+            sequence = self._latest[key] = self._sequence
+        self._queue.put((self._run_latest, (key, sequence, fn, args)))
+    
+    def _run_latest(self, key, sequence, fn, args):
+        """Run a keyed callback unless a newer one replaced it"""
+        with self._lock:
+            if self._latest.get(key) != sequence:
+                return
+            del self._latest[key]
+        fn(*args)
+    
+    def start(self):
+        """Start the periodic pump - call from the Tk thread"""
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval_ms, self._pump)
+        return self
+    
+    def stop(self):
+        """Stop the pump after its current run"""
+        self._running = False
+    
+    def pending(self):
+        """Return the number of queued callbacks"""
+        return self._queue.qsize()
+    
+    def drain(self):
+        """Run the callbacks queued so far (runs in the Tk thread)"""
+        # Callbacks posted while draining wait for the next run, so the pump never starves Tk
+        for _ in range(self._queue.qsize()):
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[WARNING] UI callback {getattr(fn, '__name__', fn)} failed: {str(e)}")
+            self.processed += 1
+    
+    def _pump(self):
+        """Drain the queue and schedule the next run"""
+        if not self._running:
+            return
+        self.drain()
+        self.root.after(self.interval_ms, self._pump)
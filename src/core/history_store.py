@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+History store for the GPT-4 Command Application
+Append-only SQLite database (WAL mode) of answered queries and executed commands,
+written by a background thread and searchable as the user types
+"""
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    system TEXT,
+    query TEXT NOT NULL DEFAULT '',
+    command TEXT NOT NULL DEFAULT '',
+    response TEXT,
+    model TEXT,
+    exit_code INTEGER,
+    output TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_created ON entries (created);
+CREATE INDEX IF NOT EXISTS entries_system ON entries (system, created);
+CREATE INDEX IF NOT EXISTS entries_exit_code ON entries (exit_code, created);
+CREATE TRIGGER IF NOT EXISTS entries_no_update BEFORE UPDATE ON entries
+BEGIN
+    SELECT RAISE(ABORT, 'history is append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS entries_no_delete BEFORE DELETE ON entries
+BEGIN
+    SELECT RAISE(ABORT, 'history is append-only');
+END;
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    query, command, content='entries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries
+BEGIN
+    INSERT INTO entries_fts (rowid, query, command) VALUES (new.id, new.query, new.command);
+END;
+"""
+
+# Columns of a search result - the response and output are only read by get()
+_LIST_COLUMNS = "e.id, e.created, e.kind, e.system, e.query, e.command, e.model, e.exit_code"
+
+
+class HistoryEntry:
+    """One stored answer or executed command"""
+    
+    ANSWER = "answer"
+    EXECUTION = "execution"
+    
+    def __init__(self, entry_id, created, kind, system, query, command, model=None, exit_code=None,
+                 response=None, output=None):
+        self.id = entry_id
+        self.created = created
+        self.kind = kind
+        self.system = system
+        self.query = query
+        self.command = command
+        self.model = model
+        self.exit_code = exit_code
+        self.response = response
+        self.output = output
+
+
+class HistoryStore:
+    """Append-only history - adding an entry only queues it, a writer thread commits in batches"""
+    
+    DEFAULT_SEARCH_LIMIT = 200
+    
+    # Characters of command output kept with an executed command
+    OUTPUT_TAIL_CHARS = 4000
+    
+    # Entries committed in one transaction at most
+    WRITE_BATCH = 500
+    
+    def __init__(self, path):
+        """
+        Initialize the store - open() creates the database and starts the writer
+        
+        Args:
+            path (str): SQLite database file, created with its directory if missing
+        """
+        self.path = path
+        self.full_text = False
+        self.written = 0
+        self.write_errors = 0
+        self._queue = queue.Queue()
+        self._writer = None
+        self._reader = None
+        self._read_lock = threading.Lock()
+    
+    def open(self):
+        """
+        Create the schema and start the writer thread
+        
+        Returns:
+            HistoryStore: self, for chaining
+        
+        Raises:
+            sqlite3.Error: If the database cannot be opened
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            try:
+                connection.executescript(_FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5 - search falls back to LIKE
+                self.full_text = False
+        finally:
+            connection.close()
+        
+        self._reader = self._connect(check_same_thread=False)
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        return self
+    
+    def _connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def add_answer(self, query, system, response, command, model=None):
+        """Queue an answered query - safe to call from any thread"""
+        self._queue.put((time.time(), HistoryEntry.ANSWER, system, query, command, response, model, None, None))
+    
+    def add_execution(self, command, system, exit_code, output="", query=""):
+        """Queue an executed command with its exit code and the tail of its output"""
+        tail = output[-self.OUTPUT_TAIL_CHARS:] if output else output
+        self._queue.put((time.time(), HistoryEntry.EXECUTION, system, query, command, None, None, exit_code, tail))
+    
+    def _write_loop(self):
+        """Commit queued entries - everything waiting is written in one transaction"""
+        connection = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.WRITE_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                rows = [row for row in batch if row is not None]
+                if rows:
+                    try:
+                        with connection:
+                            connection.executemany(
+                                "INSERT INTO entries (created, kind, system, query, command, response, model, "
+                                "exit_code, output) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                rows
+                            )
+                        self.written += len(rows)
+                    except sqlite3.Error as e:
+                        self.write_errors += len(rows)
+                        print(f"[WARNING] Failed to write {len(rows)} history entries: {str(e)}")
+                for _ in batch:
+                    self._queue.task_done()
+                if len(rows) < len(batch):
+                    return
+        finally:
+            connection.close()
+    
+    def flush(self):
+        """Wait until every queued entry is committed"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+    
+    def close(self, timeout=2.0):
+        """Commit what is queued, stop the writer and close the database"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+        if self._reader is not None:
+            with self._read_lock:
+                self._reader.close()
+                self._reader = None
+    
+    @staticmethod
+    def _match_expression(text):
+        """FTS5 query matching every word of text as a prefix"""
+        words = text.split()
+        return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+    
+    def search(self, text="", system=None, failed_only=False, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Find entries, newest first
+        
+        Args:
+            text (str): Words that must start words of the query or command, empty for all entries
+            system (str, optional): Only entries of this system
+            failed_only (bool): Only executed commands that exited with a non-zero code
+            limit (int): Maximum number of entries
+        
+        Returns:
+            list: HistoryEntry objects without response and output
+        """
+        conditions = []
+        params = []
+        if system:
+            conditions.append("e.system = ?")
+            params.append(system)
+        if failed_only:
+            conditions.append("e.exit_code IS NOT NULL AND e.exit_code != 0")
+        
+        text = text.strip()
+        order = "e.id"
+        if text and self.full_text:
+            # Ordering by the FTS rowid lets SQLite stop after limit matches of a common prefix
+            source = "entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+            order = "entries_fts.rowid"
+            conditions.insert(0, "entries_fts MATCH ?")
+            params.insert(0, self._match_expression(text))
+        else:
+            source = "entries e"
+            for word in text.split():
+                conditions.append("(e.query LIKE ? OR e.command LIKE ?)")
+                params.extend([f"%{word}%"] * 2)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {_LIST_COLUMNS} FROM {source} {where} ORDER BY {order} DESC LIMIT ?"
+        with self._read_lock:
+            if self._reader is None:
+                return []
+            rows = self._reader.execute(sql, params + [limit]).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+    
+    def get(self, entry_id):
+        """
+        Return one entry with its response and output
+        
+        Returns:
+            HistoryEntry: The entry, or None if no entry has this ID
+        """
+        with self._read_lock:
+            if self._reader is None:
+                return None
+            row = self._reader.execute(
+                f"SELECT {_LIST_COLUMNS}, e.response, e.output FROM entries e WHERE e.id = ?", (entry_id,)
+            ).fetchone()
+        return HistoryEntry(*row) if row is not None else None
+    
+    def count(self):
+        """Return the number of stored entries"""
+        with self._read_lock:
+            if self._reader is None:
+                return 0
+            return self._reader.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def stats(self):
+        """
+        Return store counters
+        
+        Returns:
+            dict: entries, queued and written entries, write errors and full-text availability
+        """
+        return {
+            "entries": self.count(),
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "write_errors": self.write_errors,
+            "full_text": self.full_text
+        }
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Job manager for the GPT-4 Command Application
+Runs executed commands on the background event loop with a concurrency cap,
+per-job timeouts, optional resource limits and kill of the whole process group
+"""
+import os
+import sys
+import time
+import signal
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+try:
+    import resource
+except ImportError:
+    # Windows - no rlimits
+    resource = None
+
+
+class CommandJob:
+    """One executed command and its state"""
+    
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+    KILLED = "killed"
+    
+    def __init__(self, job_id, command, timeout=None):
+        self.id = job_id
+        self.command = command
+        self.timeout = timeout
+        self.state = self.QUEUED
+        self.pid = None
+        self.exit_code = None
+        self.error = None
+        self.created = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.process = None
+        self.stop_requested = False
+        # Future of the wait for a slot while queued - cancelled to take the job out of the queue
+        self.slot = None
+    
+    @property
+    def active(self):
+        """True while the job waits for a slot or runs"""
+        return self.state in (self.QUEUED, self.RUNNING)
+    
+    def elapsed(self):
+        """Seconds the command has been running (0 while queued)"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobManager:
+    """Executed commands - at most max_concurrent run at a time, the rest wait in order"""
+    
+    DEFAULT_MAX_CONCURRENT = 4
+    
+    # Seconds between SIGTERM and SIGKILL when a job is stopped or times out
+    KILL_GRACE_SECONDS = 3
+    
+    # Finished jobs kept for the jobs window
+    HISTORY_SIZE = 50
+    
+    def __init__(self, loop, max_concurrent=DEFAULT_MAX_CONCURRENT, timeout=None, cpu_seconds=None, memory_mb=None):
+        """
+        Initialize the manager
+        
+        Args:
+            loop (BackgroundLoop): Event loop running the commands
+            max_concurrent (int): Maximum number of commands running at the same time
+            timeout (float, optional): Default seconds after which a command is stopped
+            cpu_seconds (int, optional): RLIMIT_CPU applied to every command (POSIX only)
+            memory_mb (int, optional): RLIMIT_AS applied to every command, in megabytes (POSIX only)
+        """
+        self.loop = loop
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._semaphore = None
+        self._ids = itertools.count(1)
+        self._active = {}
+        self._finished = deque(maxlen=self.HISTORY_SIZE)
+        self._lock = threading.Lock()
+    
+    def create(self, command, timeout=None):
+        """
+        Register a command - it is started by run()
+        
+        Args:
+            command (str): Shell command
+            timeout (float, optional): Seconds after which the command is stopped,
+                the manager default if not given
+        
+        Returns:
+            CommandJob: The queued job
+        """
+        with self._lock:
+            job = CommandJob(next(self._ids), command, timeout if timeout is not None else self.timeout)
+            self._active[job.id] = job
+            return job
+    
+    def _limit_resources(self):
+        """Apply the configured rlimits - runs in the child between fork and exec"""
+        if self.cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds))
+        if self.memory_mb:
+            limit = self.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    
+    def _spawn_options(self):
+        """Keyword arguments that give the command its own process group and limits"""
+        if sys.platform == "win32":
+            return {"creationflags": 0x00000200}  # CREATE_NEW_PROCESS_GROUP
+        options = {"start_new_session": True}
+        if resource is not None and (self.cpu_seconds or self.memory_mb):
+            options["preexec_fn"] = self._limit_resources
+        return options
+    
+    async def run(self, job, consume):
+        """
+        Run a created job once a slot is free
+        
+        Args:
+            job (CommandJob): Job returned by create()
+            consume (callable): Coroutine function called with the process; it must read
+                stdout and stderr until they are closed
+        
+        Returns:
+            int: Exit code, None if the job was stopped before it started
+        
+        Raises:
+            OSError: If the command could not be started
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            if not await self._acquire_slot(job):
+                job.state = CommandJob.KILLED
+                return None
+            try:
+                if job.stop_requested:
+                    job.state = CommandJob.KILLED
+                    return None
+                
+                try:
+                    job.process = await asyncio.create_subprocess_shell(
+                        job.command,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                        **self._spawn_options()
+                    )
+                except Exception as e:
+                    job.state = CommandJob.FAILED
+                    job.error = str(e)
+                    raise
+                job.pid = job.process.pid
+                job.started = time.monotonic()
+                job.state = CommandJob.RUNNING
+                
+                timer = None
+                if job.timeout:
+                    timer = asyncio.get_running_loop().call_later(job.timeout, self._expire, job)
+                try:
+                    await consume(job.process)
+                    job.exit_code = await job.process.wait()
+                except asyncio.CancelledError:
+                    # Application shutdown - do not leave the command behind
+                    self._signal(job, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+                    raise
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+                
+                if job.state == CommandJob.RUNNING:
+                    job.state = CommandJob.DONE if job.exit_code == 0 else CommandJob.FAILED
+                return job.exit_code
+            finally:
+                self._semaphore.release()
+        finally:
+            job.finished = time.monotonic()
+            job.process = None
+            with self._lock:
+                self._active.pop(job.id, None)
+                self._finished.appendleft(job)
+    
+    async def _acquire_slot(self, job):
+        """
+        Wait for a free slot - stop() cancels the wait, so a stopped job leaves the queue at once
+        
+        Returns:
+            bool: True if the job holds a slot, False if it was stopped while queued
+        """
+        if job.stop_requested:
+            return False
+        job.slot = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            # wait() does not cancel the slot future when the caller is cancelled - done below
+            await asyncio.wait((job.slot,))
+        except asyncio.CancelledError:
+            if job.slot.done() and not job.slot.cancelled():
+                self._semaphore.release()
+            job.slot.cancel()
+            raise
+        return not job.slot.cancelled()
+    
+    def _signal(self, job, signum):
+        """Send signum to the whole process group of a running job (loop thread)"""
+        # The group outlives its leader while children hold the pipes, so only a finished job is skipped
+        if job.pid is None or job.finished is not None:
+            return
+        try:
+            if sys.platform == "win32":
+                job.process.kill()
+            else:
+                os.killpg(job.pid, signum)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def _terminate(self, job, state):
+        """Ask a running job to stop and kill it if it is still there after the grace period (loop thread)"""
+        if job.state != CommandJob.RUNNING:
+            return
+        job.state = state
+        self._signal(job, signal.SIGTERM)
+        if hasattr(signal, "SIGKILL"):
+            asyncio.get_running_loop().call_later(self.KILL_GRACE_SECONDS, self._signal, job, signal.SIGKILL)
+    
+    def _expire(self, job):
+        """Timeout callback"""
+        self._terminate(job, CommandJob.TIMEOUT)
+    
+    def _stop(self, job, force):
+        if job.state == CommandJob.QUEUED:
+            # Not started - leave the queue now instead of waiting for a slot
+            if job.slot is not None and not job.slot.done():
+                job.slot.cancel()
+            return
+        if force:
+            if job.state == CommandJob.RUNNING:
+                job.state = CommandJob.KILLED
+            self._signal(job, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+        else:
+            self._terminate(job, CommandJob.KILLED)
+    
+    def stop(self, job_id, force=False):
+        """
+        Stop a job from any thread - a queued job never starts, a running one gets
+        SIGTERM (SIGKILL if force) sent to its whole process group
+        
+        Returns:
+            bool: False if no active job has this ID
+        """
+        with self._lock:
+            job = self._active.get(job_id)
+        if job is None:
+            return False
+        job.stop_requested = True
+        self.loop.call_soon(self._stop, job, force)
+        return True
+    
+    def stop_all(self):
+        """Stop every active job"""
+        with self._lock:
+            job_ids = list(self._active)
+        for job_id in job_ids:
+            self.stop(job_id)
+    
+    def jobs(self):
+        """
+        Return active jobs first (oldest first), then finished ones (newest first)
+        
+        Returns:
+            list: CommandJob objects
+        """
+        with self._lock:
+            return sorted(self._active.values(), key=lambda job: job.id) + list(self._finished)
+    
+    def stats(self):
+        """
+        Return job counters
+        
+        Returns:
+            dict: queued, running and finished jobs
+        """
+        with self._lock:
+            states = [job.state for job in self._active.values()]
+            return {
+                "queued": states.count(CommandJob.QUEUED),
+                "running": states.count(CommandJob.RUNNING),
+                "finished": len(self._finished),
+                "max_concurrent": self.max_concurrent
+            }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Latency metrics for the GPT-4 Command Application
+Per-stage timing histograms kept in memory, exportable as JSONL
+"""
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+
+
+class LatencyHistogram:
+    """Latency samples of one stage - keeps the most recent samples for percentiles"""
+    
+    MAX_SAMPLES = 2048
+    
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=max_samples)
+    
+    def add(self, seconds):
+        """Record one duration"""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+    
+    def percentile(self, fraction, ordered=None):
+        """Return the given percentile (0-1) of the retained samples"""
+        ordered = ordered if ordered is not None else sorted(self._samples)
+        if not ordered:
+            return 0.0
+        # Nearest-rank method
+        index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+        return ordered[index]
+    
+    def summary(self):
+        """
+        Return count, mean and p50/p95/p99/max in milliseconds
+        
+        Returns:
+            dict: Summary of the histogram
+        """
+        ordered = sorted(self._samples)
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * self.percentile(0.50, ordered),
+            "p95_ms": 1000 * self.percentile(0.95, ordered),
+            "p99_ms": 1000 * self.percentile(0.99, ordered),
+            "max_ms": 1000 * self.max
+        }
+
+
+class _StageTimer:
+    """Context manager recording the time spent inside it"""
+    
+    __slots__ = ("_registry", "_stage", "_started")
+    
+    def __init__(self, registry, stage):
+        self._registry = registry
+        self._stage = stage
+    
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._registry.record(self._stage, time.perf_counter() - self._started)
+        return False
+
+
+class MetricsRegistry:
+    """Thread-safe collection of per-stage latency histograms"""
+    
+    # Stages in the order they happen during a query
+    STAGES = (
+        "prompt_build",
+        "cache_lookup",
+        "client_create",
+        "ttft",
+        "network",
+        "translate_total",
+        "ui_update",
+        "command_run",
+    )
+    
+    def __init__(self):
+        self.enabled = True
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage, seconds):
+        """Add a duration to a stage's histogram"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.add(seconds)
+    
+    def timer(self, stage):
+        """Return a context manager timing a block of code"""
+        return _StageTimer(self, stage)
+    
+    def snapshot(self):
+        """
+        Return summaries of all stages
+        
+        Returns:
+            dict: Stage name mapped to its summary, known stages first
+        """
+        with self._lock:
+            summaries = {stage: histogram.summary() for stage, histogram in self._histograms.items()}
+        ordered = {stage: summaries.pop(stage) for stage in self.STAGES if stage in summaries}
+        ordered.update(sorted(summaries.items()))
+        return ordered
+    
+    def reset(self):
+        """Drop all samples"""
+        with self._lock:
+            self._histograms.clear()
+    
+    def format_table(self):
+        """Return the snapshot as a fixed-width text table"""
+        lines = [f"{'etap':<16}{'liczba':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for stage, summary in self.snapshot().items():
+            lines.append(
+                f"{stage:<16}{summary['count']:>8}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}"
+                f"{summary['p99_ms']:>10.1f}{summary['max_ms']:>10.1f}"
+            )
+        return "\n".join(lines)
+    
+    def export_jsonl(self, path):
+        """
+        Append one JSON line per stage with the current summary
+        
+        Args:
+            path (str): JSONL file, created with its directory if missing
+            
+        Returns:
+            int: Number of lines written
+        """
+        timestamp = time.time()
+        snapshot = self.snapshot()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for stage, summary in snapshot.items():
+                f.write(json.dumps(dict(ts=timestamp, stage=stage, **summary)) + "\n")
+        return len(snapshot)
+
+
+# Registry shared by the whole application
+registry = MetricsRegistry()
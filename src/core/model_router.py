@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Model routing for the GPT-4 Command Application
+Sends simple queries to a fast model and complex ones to a strong model, based
+on cheap features of the query and the latency each tier has shown recently;
+fast answers without a recognizable command are escalated to the strong model
+"""
+import re
+import threading
+
+import command_parser
+import metrics
+
+FAST = "fast"
+STRONG = "strong"
+TIERS = (FAST, STRONG)
+
+DEFAULT_FAST_MODEL = "gpt-4o-mini"
+DEFAULT_STRONG_MODEL = "gpt-4o"
+
+# Words that join several steps or add conditions - each one makes a query harder
+_CLAUSE_MARKERS = re.compile(
+    r"\b(?:i|oraz|a\s+potem|potem|następnie|jeśli|jeżeli|gdy|kiedy|który|która|które|dlaczego|każd\w*|"
+    r"skrypt\w*|pętl\w*|zrestartuj|and|then|if|when|which|why|each|every|script|loop|restart)\b",
+    re.IGNORECASE
+)
+# Shell syntax in the query itself - the user is already describing a pipeline
+_PIPELINE = re.compile(r"[|;]|&&|\$\(")
+
+
+class ModelRouter:
+    """Chooses the model tier of every query and keeps per-tier latency and escalation counters"""
+    
+    DEFAULT_THRESHOLD = 2.0
+    DEFAULT_FAST_BUDGET = 3.0
+    DEFAULT_STRONG_BUDGET = 15.0
+    
+    # Words of a query worth one point of complexity
+    WORDS_PER_POINT = 8
+    
+    # A tier's budget is only checked once it has this many latency samples
+    BUDGET_MIN_SAMPLES = 10
+    
+    def __init__(self, config=None, on_event=None):
+        """
+        Initialize the router from configuration
+        
+        Args:
+            config (dict, optional): routing_enabled, routing_fast_model, routing_strong_model,
+                routing_threshold, routing_fast_budget, routing_strong_budget and routing_escalate
+            on_event (callable, optional): Receives a short Polish description of every escalation
+        """
+        self.on_event = on_event
+        self.routed = dict.fromkeys(TIERS, 0)
+        self.over_budget = dict.fromkeys(TIERS, 0)
+        self.escalations = 0
+        self._latency = {tier: metrics.LatencyHistogram(max_samples=200) for tier in TIERS}
+        self._lock = threading.Lock()
+        self.update_config(config)
+    
+    def update_config(self, config):
+        """Read the routing settings - latency samples and counters are kept"""
+        config = config or {}
+        with self._lock:
+            self.enabled = config.get("routing_enabled", False)
+            self.models = {
+                FAST: config.get("routing_fast_model", DEFAULT_FAST_MODEL),
+                STRONG: config.get("routing_strong_model", DEFAULT_STRONG_MODEL)
+            }
+            self.budgets = {
+                FAST: config.get("routing_fast_budget", self.DEFAULT_FAST_BUDGET),
+                STRONG: config.get("routing_strong_budget", self.DEFAULT_STRONG_BUDGET)
+            }
+            self.threshold = config.get("routing_threshold", self.DEFAULT_THRESHOLD)
+            self.escalate = config.get("routing_escalate", True)
+    
+    def complexity(self, query, history=None):
+        """
+        Score how hard a query is from its length, joined steps and shell syntax
+        
+        Args:
+            query (str): User request
+            history (list, optional): Previous turns - a follow-up depends on them and scores higher
+        
+        Returns:
+            float: 0 for a short single-step request, about 1 per extra step or 8 words
+        """
+        score = len(query.split()) / self.WORDS_PER_POINT
+        score += len(_CLAUSE_MARKERS.findall(query))
+        if _PIPELINE.search(query):
+            score += 1
+        if history:
+            score += 0.5
+        return score
+    
+    def _p95(self, tier):
+        """Recent p95 latency of a tier, None until it has enough samples - caller must hold the lock"""
+        histogram = self._latency[tier]
+        if histogram.count < self.BUDGET_MIN_SAMPLES:
+            return None
+        return histogram.percentile(0.95)
+    
+    def _within_budget(self, tier):
+        p95 = self._p95(tier)
+        return p95 is None or p95 <= self.budgets[tier]
+    
+    def route(self, query, history=None):
+        """
+        Choose the tier of a query
+        
+        A tier whose recent p95 latency is over its budget is avoided while the other
+        tier keeps within its own: complex queries fall back to the fast model when the
+        strong one is slow, and everything goes to the strong model when the fast one is.
+        
+        Returns:
+            str: FAST or STRONG, None while routing is disabled
+        """
+        if not self.enabled:
+            return None
+        tier = STRONG if self.complexity(query, history) >= self.threshold else FAST
+        other = FAST if tier == STRONG else STRONG
+        with self._lock:
+            if not self._within_budget(tier) and self._within_budget(other):
+                self.over_budget[tier] += 1
+                tier = other
+            self.routed[tier] += 1
+        return tier
+    
+    def model(self, tier):
+        """Model name of a tier"""
+        return self.models[tier]
+    
+    def record(self, tier, seconds):
+        """Add the latency of one request answered by a tier"""
+        if tier is None:
+            return
+        with self._lock:
+            self._latency[tier].add(seconds)
+    
+    def needs_escalation(self, tier, response):
+        """
+        True if a fast answer holds no recognizable command and the strong model should answer instead
+        
+        Args:
+            tier (str): Tier that produced the response
+            response (str): Complete answer
+        """
+        if tier != FAST or not self.escalate:
+            return False
+        parsed = command_parser.parse_response(response)
+        if parsed.command and (parsed.source != "first_line" or command_parser.looks_like_command(parsed.command)):
+            return False
+        with self._lock:
+            self.escalations += 1
+        if self.on_event is not None:
+            try:
+                self.on_event(f"Niejasna odpowiedź modelu {self.models[FAST]} - ponowienie z modelem "
+                              f"{self.models[STRONG]}")
+            except Exception:
+                pass
+        return True
+    
+    def stats(self):
+        """
+        Return routing counters
+        
+        Returns:
+            dict: Per tier the model, routed queries, answered requests (escalations included),
+                rerouted over-budget choices and latency percentiles in milliseconds, plus escalations and their rate among fast queries
+        """
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                summary = self._latency[tier].summary()
+                tiers[tier] = {
+                    "model": self.models[tier],
+                    "routed": self.routed[tier],
+                    "answered": summary["count"],
+                    "over_budget": self.over_budget[tier],
+                    "budget_ms": 1000 * self.budgets[tier],
+                    "p50_ms": summary["p50_ms"],
+                    "p95_ms": summary["p95_ms"]
+                }
+            return {
+                "enabled": self.enabled,
+                "tiers": tiers,
+                "escalations": self.escalations,
+                "escalation_rate": self.escalations / self.routed[FAST] if self.routed[FAST] else 0.0
+            }
+    
+    def format_summary(self):
+        """One line per tier for the metrics panel, empty while routing is disabled"""
+        if not self.enabled:
+            return ""
+        stats = self.stats()
+        lines = []
+        for tier, label in ((FAST, "szybki"), (STRONG, "mocny")):
+            tier_stats = stats["tiers"][tier]
+            lines.append(f"Model {label} ({tier_stats['model']}): przydzielone {tier_stats['routed']}, "
+                         f"odpowiedzi {tier_stats['answered']}, "
+                         f"p50 {tier_stats['p50_ms']:.0f} ms, p95 {tier_stats['p95_ms']:.0f} ms "
+                         f"(budżet {tier_stats['budget_ms']:.0f} ms, przekroczenia {tier_stats['over_budget']})")
+        lines.append(f"Eskalacje do modelu mocnego: {stats['escalations']} ({100 * stats['escalation_rate']:.0f}%)")
+        return "\n".join(lines)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Bounded output buffer for the GPT-4 Command Application
+Holds the tail of a command's output while it is being produced
+"""
+import threading
+from collections import deque
+
+
+class OutputRingBuffer:
+    """Thread-safe ring buffer of text chunks capped at a number of characters"""
+    
+    DEFAULT_LIMIT = 1_000_000
+    
+    def __init__(self, limit=DEFAULT_LIMIT):
+        """
+        Initialize an empty buffer
+        
+        Args:
+            limit (int): Maximum number of characters retained, older output is dropped
+        """
+        self.limit = max(1, limit)
+        self.dropped = 0
+        self._chunks = deque()
+        self._size = 0
+        self._written = 0
+        self._taken = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def truncated(self):
+        """True if any output has been dropped"""
+        return self.dropped > 0
+    
+    @property
+    def total_written(self):
+        """Total number of characters ever appended"""
+        return self._written
+    
+    def append(self, text):
+        """Append text, dropping the oldest output beyond the limit"""
+        if not text:
+            return
+        with self._lock:
+            if len(text) > self.limit:
+                self.dropped += len(text) - self.limit
+                self._written += len(text) - self.limit
+                text = text[-self.limit:]
+            self._chunks.append(text)
+            self._size += len(text)
+            self._written += len(text)
+            
+            while self._size > self.limit:
+                excess = self._size - self.limit
+                oldest = self._chunks[0]
+                if len(oldest) <= excess:
+                    self._chunks.popleft()
+                    self._size -= len(oldest)
+                    self.dropped += len(oldest)
+                else:
+                    self._chunks[0] = oldest[excess:]
+                    self._size -= excess
+                    self.dropped += excess
+    
+    def getvalue(self):
+        """Return all retained output"""
+        with self._lock:
+            return "".join(self._chunks)
+    
+    def take_update(self):
+        """
+        Return output appended since the previous call
+        
+        Returns:
+            tuple: (text, reset) - if reset is True more than the retained
+                   window arrived in between and text is the whole buffer,
+                   which should replace what the consumer already shows
+        """
+        with self._lock:
+            pending = self._written - self._taken
+            self._taken = self._written
+            if pending == 0:
+                return "", False
+            if pending > self._size:
+                return "".join(self._chunks), True
+            
+            # Collect the newest `pending` characters from the tail
+            parts = []
+            remaining = pending
+            for chunk in reversed(self._chunks):
+                if len(chunk) >= remaining:
+                    parts.append(chunk[len(chunk) - remaining:])
+                    break
+                parts.append(chunk)
+                remaining -= len(chunk)
+            return "".join(reversed(parts)), False
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Speculative prefetch for the GPT-4 Command Application
+Translates the query while it is still being typed, so Enter can reuse the answer
+"""
+import time
+import threading
+from collections import deque
+
+
+class Prefetch:
+    """One speculative translation - keeps its deltas until someone attaches to them"""
+    
+    def __init__(self, key, query, system, history=None):
+        self.key = key
+        self.query = query
+        self.system = system
+        self.history = history
+        self.future = None
+        self._parts = []
+        self._listener = None
+        self._lock = threading.Lock()
+    
+    def on_delta(self, delta):
+        """Collect a streamed delta and forward it to the attached listener"""
+        with self._lock:
+            self._parts.append(delta)
+            if self._listener is not None:
+                self._listener(delta)
+    
+    def attach(self, listener):
+        """Replay the deltas received so far to listener and forward the following ones"""
+        with self._lock:
+            received = "".join(self._parts)
+            if received:
+                listener(received)
+            self._listener = listener
+    
+    def usable(self):
+        """True unless the translation was cancelled or failed"""
+        if not self.future.done():
+            return True
+        return not self.future.cancelled() and self.future.exception() is None
+
+
+class Prefetcher:
+    """Keeps at most one speculative translation, limited to a number of requests per minute"""
+    
+    DEFAULT_BUDGET_PER_MINUTE = 10
+    DEFAULT_DEBOUNCE_MS = 600
+    MIN_QUERY_CHARS = 8
+    
+    def __init__(self, loop, translator, budget_per_minute=DEFAULT_BUDGET_PER_MINUTE):
+        """
+        Initialize the prefetcher
+        
+        Args:
+            loop (BackgroundLoop): Event loop running the translations
+            translator (Translator): Pipeline used for speculative requests
+            budget_per_minute (int): Maximum speculative requests started in any 60 seconds
+        """
+        self.loop = loop
+        self.translator = translator
+        self.budget_per_minute = budget_per_minute
+        self.started = 0
+        self.reused = 0
+        self.discarded = 0
+        self.over_budget = 0
+        self._current = None
+        self._recent = deque()
+        self._lock = threading.Lock()
+    
+    def _take_budget_locked(self):
+        """Spend one request of the per-minute budget - caller must hold the lock"""
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.budget_per_minute:
+            return False
+        self._recent.append(now)
+        return True
+    
+    def start(self, key, query, system, history=None):
+        """
+        Start translating a partial query, dropping the previous speculative one
+        
+        Args:
+            key (hashable): Identity of the query, as used by the scheduler
+            query (str): Text typed so far
+            system (str): Target system
+            history (list, optional): Conversation history sent with the query
+        
+        Returns:
+            Prefetch: The running prefetch, None if the budget is spent
+        """
+        with self._lock:
+            if self._current is not None and self._current.key == key and self._current.usable():
+                return self._current
+            self._discard_locked()
+            if not self._take_budget_locked():
+                self.over_budget += 1
+                return None
+            
+            # Speculative answers stay out of the response cache - partial queries would evict
+            # real answers; the one the user sends is stored by Translator.remember()
+            prefetch = Prefetch(key, query, system, history)
+            prefetch.future = self.loop.submit(self.translator.translate_async(
+                query, system, stream=True, on_delta=prefetch.on_delta, history=history, cache=False
+            ))
+            self._current = prefetch
+            self.started += 1
+            return prefetch
+    
+    def take(self, key):
+        """
+        Hand over the prefetch for key - any other one is discarded
+        
+        Returns:
+            Prefetch: Completed or in-flight translation of the same text, or None
+        """
+        with self._lock:
+            prefetch = self._current
+            if prefetch is None:
+                return None
+            if prefetch.key != key or not prefetch.usable():
+                self._discard_locked()
+                return None
+            self._current = None
+            self.reused += 1
+            return prefetch
+    
+    def _discard_locked(self):
+        """Cancel the current prefetch - caller must hold the lock"""
+        if self._current is not None:
+            if self._current.future.cancel():
+                self.discarded += 1
+            self._current = None
+    
+    def discard(self):
+        """Cancel the current prefetch, e.g. when the text no longer qualifies"""
+        with self._lock:
+            self._discard_locked()
+    
+    def stats(self):
+        """
+        Return prefetch counters
+        
+        Returns:
+            dict: started, reused, discarded and over-budget prefetches
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "over_budget": self.over_budget
+            }
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Prompt registry for the GPT-4 Command Application
+Compiles ChatPrompt.json once and reloads it when the file changes
+"""
+import os
+import json
+import time
+import string
+import threading
+
+import token_counter
+
+SYSTEMS = ("Linux", "Windows", "MacOS")
+
+
+class PromptTemplateError(ValueError):
+    """Raised when ChatPrompt.json contains an invalid template"""
+
+
+def fallback_system_message(selected_system):
+    """Create fallback system message if prompts are not available"""
+    base_message = f"Jesteś asystentem, który pomaga tłumaczyć polecenia użytkownika na komendy terminala systemu {selected_system}. "
+    
+    if selected_system == "Linux":
+        base_message += "Odpowiadaj komendami dla systemu Linux, używając bash."
+    elif selected_system == "Windows":
+        base_message += "Odpowiadaj komendami dla systemu Windows, używając CMD lub PowerShell."
+    elif selected_system == "MacOS":
+        base_message += "Odpowiadaj komendami dla systemu MacOS, używając terminala bash/zsh."
+    
+    base_message += " Odpowiadaj tylko komendą, bez żadnych dodatkowych wyjaśnień."
+    return base_message
+
+
+class CompiledPrompts:
+    """Immutable result of compiling one version of ChatPrompt.json"""
+    
+    def __init__(self, data, mtime_ns, model):
+        """
+        Validate and compile prompt data
+        
+        Args:
+            data (dict): Parsed ChatPrompt.json, None for built-in fallbacks
+            mtime_ns (int): Modification time of the source file
+            model (str): Model used to count tokens
+        
+        Raises:
+            PromptTemplateError: If a template is malformed
+        """
+        if data is not None and not isinstance(data, dict):
+            raise PromptTemplateError("ChatPrompt.json musi zawierać obiekt")
+        self.data = data or {}
+        self.mtime_ns = mtime_ns
+        self.labels = self._section("ui_labels")
+        self.error_messages = self._section("error_messages")
+        self.window_titles = self._section("window_titles")
+        self.system_messages = self._compile(data)
+        self.token_counts = {
+            system: token_counter.count_tokens(message, model)
+            for system, message in self.system_messages.items()
+        }
+    
+    def _section(self, name):
+        """Copy an optional key-to-text section of the prompt data"""
+        section = self.data.get(name, {})
+        if not isinstance(section, dict):
+            raise PromptTemplateError(f"{name} musi być obiektem")
+        return dict(section)
+    
+    @staticmethod
+    def _validate_template(name, template):
+        """Check that a template only uses the {system} placeholder"""
+        if not isinstance(template, str):
+            raise PromptTemplateError(f"system_messages.{name} musi być tekstem")
+        try:
+            fields = {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+        except ValueError as e:
+            raise PromptTemplateError(f"system_messages.{name}: {str(e)}")
+        unknown = fields - {"system"}
+        if unknown:
+            raise PromptTemplateError(
+                f"system_messages.{name}: nieznane pola {', '.join(sorted(unknown))}, dozwolone jest tylko {{system}}"
+            )
+    
+    @classmethod
+    def _compile(cls, data):
+        """Build the final system message for every supported system"""
+        if not data:
+            return {system: fallback_system_message(system) for system in SYSTEMS}
+        
+        system_messages = data.get("system_messages")
+        if not isinstance(system_messages, dict):
+            raise PromptTemplateError("Brak sekcji system_messages")
+        cls._validate_template("base", system_messages.get("base", ""))
+        
+        compiled = {}
+        for system in SYSTEMS:
+            for name in (system, "suffix"):
+                if not isinstance(system_messages.get(name, ""), str):
+                    raise PromptTemplateError(f"system_messages.{name} musi być tekstem")
+            base_message = system_messages.get("base", "").format(system=system)
+            system_specific = system_messages.get(system, "")
+            suffix = system_messages.get("suffix", "")
+            compiled[system] = f"{base_message} {system_specific} {suffix}"
+        return compiled
+
+
+class PromptRegistry:
+    """Hands out precompiled system messages and UI strings, hot-reloading the source file"""
+    
+    CHECK_INTERVAL = 1.0
+    
+    def __init__(self, prompt_path, model="gpt-4o-mini", check_interval=CHECK_INTERVAL):
+        """
+        Load and compile the prompts
+        
+        Args:
+            prompt_path (str): Path to ChatPrompt.json
+            model (str): Model whose tokenizer is used for the token report
+            check_interval (float): Minimum seconds between mtime checks
+        """
+        self.prompt_path = prompt_path
+        self.model = model
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.last_error = None
+        self._last_check = 0.0
+        self._seen_mtime = None
+        self._lock = threading.Lock()
+        self._compiled = CompiledPrompts(None, None, model)
+        self.reload()
+    
+    @property
+    def compiled(self):
+        """Current compiled prompts, checking the file for changes first"""
+        self.maybe_reload()
+        return self._compiled
+    
+    @property
+    def loaded(self):
+        """True if the prompts come from the file rather than built-in fallbacks"""
+        return self._compiled.mtime_ns is not None
+    
+    def _mtime(self):
+        try:
+            return os.stat(self.prompt_path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload(self):
+        """
+        Read, validate and compile the file, swapping the result in atomically
+        
+        A broken file keeps the previous version active.
+        
+        Returns:
+            bool: True if a new version was activated
+        """
+        with self._lock:
+            mtime_ns = self._mtime()
+            # Remember the mtime even on failure so a broken file is not re-read on every call
+            self._seen_mtime = mtime_ns
+            try:
+                with open(self.prompt_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                compiled = CompiledPrompts(data, mtime_ns, self.model)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                print(f"Error loading chat prompts: {e}")
+                return False
+            self._compiled = compiled
+            self.last_error = None
+            self.reloads += 1
+            return True
+    
+    def update_config(self, config):
+        """Follow a change of the configured model - the token report is recompiled for its tokenizer"""
+        model = config.get("model", self.model)
+        if model != self.model:
+            self.model = model
+            self.reload()
+    
+    def maybe_reload(self):
+        """Reload if the file's mtime changed - checked at most every check_interval seconds"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        mtime_ns = self._mtime()
+        if mtime_ns is None or mtime_ns == self._seen_mtime:
+            return False
+        return self.reload()
+    
+    def system_message(self, selected_system):
+        """Return the precompiled system message for a system"""
+        compiled = self.compiled
+        message = compiled.system_messages.get(selected_system)
+        if message is None:
+            return fallback_system_message(selected_system)
+        return message
+    
+    def label(self, key, default):
+        """Return a UI label"""
+        return self._compiled.labels.get(key, default)
+    
+    def error_message(self, key, default):
+        """Return an error message"""
+        return self._compiled.error_messages.get(key, default)
+    
+    def window_title(self, key, default):
+        """Return a window title"""
+        return self._compiled.window_titles.get(key, default)
+    
+    def token_report(self):
+        """
+        Return the token size of every compiled system message
+        
+        Returns:
+            dict: System name mapped to token count
+        """
+        return dict(self.compiled.token_counts)
+    
+    def format_token_report(self):
+        """Return the token report as printable text"""
+        method = "tiktoken" if token_counter.is_exact(self.model) else f"szacunek ~{token_counter.CHARS_PER_TOKEN} znaki/token"
+        lines = [f"Rozmiar wiadomości systemowych ({self.model}, {method}):"]
+        for system, tokens in self.token_report().items():
+            lines.append(f"  {system}: {tokens} tokenów")
+        return "\n".join(lines)
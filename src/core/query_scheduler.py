@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Query scheduler for the GPT-4 Command Application
+Runs API queries on a bounded worker pool (or event loop) and keeps only the newest one visible
+"""
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueryJob:
+    """A scheduled query - carries an ID, a generation and a cancellation flag"""
+    
+    def __init__(self, scheduler, job_id, key, generation):
+        self.id = job_id
+        self.key = key
+        self.generation = generation
+        self.future = None
+        self._scheduler = scheduler
+        self._cancel_event = threading.Event()
+    
+    @property
+    def cancelled(self):
+        """True once a newer query superseded this one"""
+        return self._cancel_event.is_set()
+    
+    def cancel(self):
+        """Mark the job as superseded and drop it if it has not started yet
+        
+        On an event loop a running job is cancelled as well - its pending await raises CancelledError.
+        """
+        self._cancel_event.set()
+        return self.future is not None and self.future.cancel()
+    
+    def is_current(self):
+        """True if the job's result may still be shown in the UI"""
+        return not self.cancelled and self.generation == self._scheduler.generation
+
+
+class QueryScheduler:
+    """Bounded pool of query workers with supersession and in-flight deduplication"""
+    
+    DEFAULT_MAX_WORKERS = 2
+    
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, loop=None):
+        """
+        Initialize the scheduler
+        
+        Args:
+            max_workers (int): Maximum number of queries running at the same time
+            loop (BackgroundLoop, optional): Run coroutine workers on this event loop
+                instead of a thread pool
+        """
+        self.generation = 0
+        self.shared = 0
+        self.dropped = 0
+        self.max_workers = max(1, max_workers)
+        self._loop = loop
+        self._semaphore = None
+        self._executor = None
+        if loop is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="query")
+        self._ids = itertools.count(1)
+        self._inflight = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, key, fn, *args):
+        """
+        Schedule a query, superseding every other one
+        
+        An identical query that is still in flight is not sent again - its
+        job is promoted to the newest generation and returned instead.
+        
+        Args:
+            key (hashable): Identity of the query (model, system, normalized text)
+            fn (callable): Worker, called as fn(*args, job=job) - a coroutine function
+                when the scheduler runs on an event loop
+            
+        Returns:
+            QueryJob: The job that will produce the result
+        """
+        with self._lock:
+            self.generation += 1
+            job = self._inflight.get(key)
+            if job is not None and not job.cancelled:
+                job.generation = self.generation
+                self.shared += 1
+                self._cancel_others_locked(keep=job)
+                return job
+            
+            self._cancel_others_locked(keep=None)
+            job = QueryJob(self, next(self._ids), key, self.generation)
+            self._inflight[key] = job
+            if self._loop is not None:
+                job.future = self._loop.submit(self._run_async(job, fn, args))
+            else:
+                job.future = self._executor.submit(self._run, job, fn, args)
+            return job
+    
+    def _cancel_others_locked(self, keep):
+        """Cancel all in-flight jobs except keep - caller must hold the lock"""
+        for key, job in list(self._inflight.items()):
+            if job is keep:
+                continue
+            if job.cancel():
+                self.dropped += 1
+            del self._inflight[key]
+    
+    def _run(self, job, fn, args):
+        """Worker wrapper that skips jobs superseded while waiting in the queue"""
+        try:
+            if job.cancelled:
+                return None
+            return fn(*args, job=job)
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+    
+    async def _run_async(self, job, fn, args):
+        """Coroutine wrapper - at most max_workers jobs run, superseded ones are cancelled with their task"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        try:
+            async with self._semaphore:
+                if job.cancelled:
+                    return None
+                return await fn(*args, job=job)
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+    
+    def cancel_all(self):
+        """Supersede every job, e.g. when the user clears the fields"""
+        with self._lock:
+            self.generation += 1
+            self._cancel_others_locked(keep=None)
+    
+    def stats(self):
+        """
+        Return scheduler counters
+        
+        Returns:
+            dict: generation, in-flight count, shared and dropped queries
+        """
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "inflight": len(self._inflight),
+                "shared": self.shared,
+                "dropped": self.dropped
+            }
+    
+    def shutdown(self):
+        """Cancel queued work and stop the worker pool"""
+        self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
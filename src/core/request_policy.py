@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Request policy for the GPT-4 Command Application
+Retries transient API failures with exponential backoff and jitter (honouring
+Retry-After), bounds every request by a deadline, optionally hedges slow requests
+and stops calling an endpoint that keeps failing (circuit breaker)
+"""
+import time
+import random
+import asyncio
+import threading
+import email.utils
+
+import metrics
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open"""
+    
+    def __init__(self, retry_in):
+        super().__init__(f"Serwer API jest niedostępny - kolejna próba za {retry_in:.0f} s")
+        self.retry_in = retry_in
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request and its retries do not finish within the deadline
+    
+    Deliberately not a TimeoutError - the policy's own deadline must never look like a
+    transport timeout worth retrying.
+    """
+
+
+class CircuitBreaker:
+    """Consecutive transient failures open the circuit; after reset_timeout one probe request may close it"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        Initialize a closed breaker
+        
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit, 0 disables the breaker
+            reset_timeout (float): Seconds the circuit stays open before a probe is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """
+        Check whether a request may be sent
+        
+        Returns:
+            bool: True if the request is the probe of a half-open circuit - the caller must
+                end it with end_probe() however the request ends
+        
+        Raises:
+            CircuitOpenError: While the circuit is open (or its probe is still running)
+        """
+        if not self.failure_threshold:
+            return False
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            raise CircuitOpenError(max(remaining, 0.0))
+    
+    def end_probe(self):
+        """The probe finished - cancelled or failed without an outcome leaves room for the next one"""
+        with self._lock:
+            self._probing = False
+    
+    def record_success(self):
+        """A request went through - close the circuit"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        """A request failed transiently - open the circuit after failure_threshold in a row"""
+        if not self.failure_threshold:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class RequestPolicy:
+    """Retries, deadline, hedging and circuit breaker around one API request"""
+    
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_BACKOFF_BASE = 0.5
+    DEFAULT_BACKOFF_MAX = 10.0
+    DEFAULT_DEADLINE = 60.0
+    DEFAULT_CIRCUIT_THRESHOLD = 5
+    DEFAULT_CIRCUIT_RESET = 30.0
+    
+    # HTTP statuses worth another attempt
+    RETRYABLE_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+    
+    # Hedging waits for this many latency samples before trusting their p95
+    HEDGE_MIN_SAMPLES = 20
+    
+    def __init__(self, config=None, on_event=None):
+        """
+        Initialize the policy from configuration
+        
+        Args:
+            config (dict, optional): api_max_retries, api_backoff_base, api_backoff_max, api_deadline,
+                api_hedge_enabled, api_circuit_threshold and api_circuit_reset
+            on_event (callable, optional): Receives a short Polish description of every retry,
+                hedge and breaker rejection - the GUI shows it in the status bar
+        """
+        self.breaker = CircuitBreaker(self.DEFAULT_CIRCUIT_THRESHOLD, self.DEFAULT_CIRCUIT_RESET)
+        self.on_event = on_event
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latency = metrics.LatencyHistogram(max_samples=200)
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self.update_config(config)
+    
+    def update_config(self, config):
+        """Read the retry, deadline, hedging and breaker settings - counters and the breaker state are kept"""
+        config = config or {}
+        self.max_retries = config.get("api_max_retries", self.DEFAULT_MAX_RETRIES)
+        self.backoff_base = config.get("api_backoff_base", self.DEFAULT_BACKOFF_BASE)
+        self.backoff_max = config.get("api_backoff_max", self.DEFAULT_BACKOFF_MAX)
+        self.deadline = config.get("api_deadline", self.DEFAULT_DEADLINE)
+        self.hedge_enabled = config.get("api_hedge_enabled", False)
+        self.breaker.failure_threshold = config.get("api_circuit_threshold", self.DEFAULT_CIRCUIT_THRESHOLD)
+        self.breaker.reset_timeout = config.get("api_circuit_reset", self.DEFAULT_CIRCUIT_RESET)
+    
+    def _notify(self, text):
+        if self.on_event is not None:
+            try:
+                self.on_event(text)
+            except Exception:
+                pass
+    
+    def _record_latency(self, seconds):
+        with self._lock:
+            self._latency.add(seconds)
+    
+    def hedge_delay(self):
+        """Seconds after which a second request is sent, None while hedging is off or not calibrated"""
+        if not self.hedge_enabled:
+            return None
+        with self._lock:
+            if self._latency.count < self.HEDGE_MIN_SAMPLES:
+                return None
+            return self._latency.percentile(0.95)
+    
+    @classmethod
+    def is_retryable(cls, error):
+        """True for rate limits, server errors, timeouts and dropped connections"""
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status in cls.RETRYABLE_STATUSES
+        if isinstance(error, DeadlineExceededError):
+            return False
+        # openai.APIConnectionError covers APITimeoutError - matched by name, openai is imported lazily
+        names = {cls_.__name__ for cls_ in type(error).__mro__}
+        return bool(names & {"APIConnectionError", "APITimeoutError", "ConnectionError", "TimeoutError"})
+    
+    @staticmethod
+    def retry_after(error):
+        """Seconds requested by the Retry-After (or retry-after-ms) header of a failed response, None if absent"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            value = headers.get("retry-after-ms")
+            if value is not None:
+                return float(value) / 1000
+            value = headers.get("retry-after")
+            if value is None:
+                return None
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def _backoff(self, attempt, error):
+        """Delay before the next attempt - Retry-After if the server sent one, full jitter otherwise"""
+        requested = self.retry_after(error)
+        if requested is not None:
+            return min(requested, self.backoff_max)
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _describe(self, error):
+        status = getattr(error, "status_code", None)
+        return f"HTTP {status}" if status is not None else type(error).__name__
+    
+    def _after_failure(self, attempt, error, started):
+        """
+        Record a failed attempt and decide on the next one
+        
+        Returns:
+            float: Seconds to wait before retrying
+        
+        Raises:
+            The error itself if it is not transient or no attempt is left before the deadline
+        """
+        if not self.is_retryable(error):
+            # The endpoint answered - it is up, whatever was wrong with the request
+            if getattr(error, "status_code", None) is not None:
+                self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        delay = self._backoff(attempt, error)
+        remaining = self.deadline - (time.monotonic() - started) if self.deadline else float("inf")
+        if attempt >= self.max_retries or delay >= remaining:
+            raise error
+        with self._lock:
+            self.retries += 1
+        self._notify(f"Ponawianie zapytania ({attempt + 1}/{self.max_retries}) za {delay:.1f} s - "
+                     f"{self._describe(error)}")
+        return delay
+    
+    def _remaining(self, started):
+        remaining = self.deadline - (time.monotonic() - started) if self.deadline else float("inf")
+        if remaining <= 0:
+            raise DeadlineExceededError(f"Przekroczono limit czasu zapytania ({self.deadline:g} s)")
+        return remaining
+    
+    def _allow(self):
+        try:
+            return self.breaker.allow()
+        except CircuitOpenError as e:
+            self._notify(str(e))
+            raise
+    
+    def call(self, request):
+        """
+        Send a request from a worker thread
+        
+        Args:
+            request (callable): Called with the seconds left until the deadline (None for no
+                deadline), returns the response
+        
+        Returns:
+            The response of the first successful attempt
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self._remaining(started)
+            probe = self._allow()
+            attempt_started = time.monotonic()
+            try:
+                response = request(remaining if remaining != float("inf") else None)
+            except Exception as e:
+                delay = self._after_failure(attempt, e, started)
+            else:
+                self._record_latency(time.monotonic() - attempt_started)
+                self.breaker.record_success()
+                return response
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            time.sleep(delay)
+            attempt += 1
+    
+    async def acall(self, request):
+        """
+        Send a request on the event loop, hedging it if enabled
+        
+        Args:
+            request (callable): Coroutine function called with the seconds left until the
+                deadline (None for no deadline), returns the response
+        
+        Returns:
+            The response of the first successful attempt
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self._remaining(started)
+            probe = self._allow()
+            attempt_started = time.monotonic()
+            timeout = remaining if remaining != float("inf") else None
+            try:
+                response = await asyncio.wait_for(self._hedged(request, timeout), timeout)
+            except asyncio.TimeoutError:
+                # No answer within the deadline counts against the endpoint
+                self.breaker.record_failure()
+                raise DeadlineExceededError(f"Przekroczono limit czasu zapytania ({self.deadline:g} s)")
+            except Exception as e:
+                delay = self._after_failure(attempt, e, started)
+            else:
+                self._record_latency(time.monotonic() - attempt_started)
+                self.breaker.record_success()
+                return response
+            finally:
+                # A cancelled or inconclusive probe must not keep the circuit closed to everyone
+                if probe:
+                    self.breaker.end_probe()
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def _hedged(self, request, timeout):
+        """Run the request; if it is slower than the recent p95, race a second one against it"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await request(timeout)
+        
+        first = asyncio.ensure_future(request(timeout))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        
+        with self._lock:
+            self.hedged += 1
+        self._notify("Wolna odpowiedź - wysłano równoległe zapytanie")
+        second = asyncio.ensure_future(request(timeout))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    winner = first if first in winners else winners[0]
+                    for task in winners:
+                        if task is not winner:
+                            self._discard(task.result())
+                    if winner is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return winner.result()
+            # Both failed - report the original request's error
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def within_deadline(self, awaitable, started):
+        """
+        Await the rest of a request, e.g. reading its stream, within the deadline acall started
+        
+        Args:
+            awaitable: Coroutine finishing the request
+            started (float): time.monotonic() taken before acall
+        
+        Returns:
+            The result of awaitable
+        
+        Raises:
+            DeadlineExceededError: If the deadline passes first - awaitable is cancelled
+        """
+        if not self.deadline:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, self.deadline - (time.monotonic() - started)))
+        except asyncio.TimeoutError:
+            # A stalled stream counts against the endpoint like a request without an answer
+            self.breaker.record_failure()
+            raise DeadlineExceededError(f"Przekroczono limit czasu zapytania ({self.deadline:g} s)")
+    
+    @staticmethod
+    def _discard(response):
+        """Close the response of a losing hedged request (an open stream holds a connection)"""
+        close = getattr(response, "close", None)
+        if close is None:
+            return
+        result = close()
+        if asyncio.iscoroutine(result):
+            asyncio.ensure_future(result)
+    
+    def stats(self):
+        """
+        Return policy counters
+        
+        Returns:
+            dict: retries, hedged requests, hedges that won, breaker state and rejected requests
+        """
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "circuit": self.breaker.state,
+                "rejected": self.breaker.rejected
+            }
+    
+    def format_summary(self):
+        """One line for the metrics panel"""
+        stats = self.stats()
+        states = {CircuitBreaker.CLOSED: "zamknięty", CircuitBreaker.OPEN: "otwarty",
+                  CircuitBreaker.HALF_OPEN: "próba"}
+        return (f"API: ponowienia {stats['retries']}, zapytania równoległe {stats['hedged']} "
+                f"(wygrane {stats['hedge_wins']}), bezpiecznik {states[stats['circuit']]}, "
+                f"odrzucone {stats['rejected']}")
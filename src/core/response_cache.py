@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Persistent response cache for the GPT-4 Command Application
+Repeated queries are answered from disk instead of the API
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """On-disk LRU cache of API responses with per-entry TTL"""
+    
+    FORMAT_VERSION = 1
+    DEFAULT_MAX_ENTRIES = 500
+    DEFAULT_TTL = 7 * 24 * 3600
+    
+    # A change only marks the cache dirty - the file is rewritten this many seconds later, in a timer thread
+    SAVE_DELAY = 2.0
+    
+    # Minimum seconds between checks of ChatPrompt.json
+    PROMPT_CHECK_INTERVAL = 1.0
+    
+    def __init__(self, cache_path, prompt_path, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        """
+        Initialize the cache and load previously stored entries
+        
+        Args:
+            cache_path (str): JSON file the cache is persisted to
+            prompt_path (str): ChatPrompt.json - any change to it drops all entries
+            max_entries (int): Size cap, least recently used entries are evicted first
+            ttl (float): Seconds after which an entry expires, 0 disables expiry
+        """
+        self.cache_path = cache_path
+        self.prompt_path = prompt_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        self._prompt_fingerprint = self._fingerprint()
+        self._prompt_checked = time.monotonic()
+        self._load()
+    
+    @staticmethod
+    def normalize_query(query):
+        """Normalize a query so trivial differences map to the same entry"""
+        return " ".join(query.lower().split()).rstrip(".!?")
+    
+    @classmethod
+    def make_key(cls, model, system_message, query, history=None):
+        """Build the cache key from model, system message, normalized query and conversation context
+        
+        history is the part of the conversation the answer depends on - without it the key is
+        the same as before conversations existed.
+        """
+        parts = [model, system_message, cls.normalize_query(query)]
+        if history:
+            parts.append(history)
+        payload = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _fingerprint(self):
+        """Return a cheap fingerprint of the prompt file (mtime and size)"""
+        try:
+            stat = os.stat(self.prompt_path)
+            return f"{stat.st_mtime_ns}:{stat.st_size}"
+        except OSError:
+            return ""
+    
+    def _check_prompt_file(self):
+        """Drop all entries if ChatPrompt.json changed - checked every PROMPT_CHECK_INTERVAL, caller holds the lock"""
+        now = time.monotonic()
+        if now - self._prompt_checked < self.PROMPT_CHECK_INTERVAL:
+            return
+        self._prompt_checked = now
+        fingerprint = self._fingerprint()
+        if fingerprint != self._prompt_fingerprint:
+            self._entries.clear()
+            self._prompt_fingerprint = fingerprint
+            self._mark_dirty()
+    
+    def _is_expired(self, entry, now):
+        """Check whether an entry outlived the TTL"""
+        return bool(self.ttl) and now - entry["created"] > self.ttl
+    
+    def get(self, model, system_message, query, history=None):
+        """
+        Look up a cached response
+        
+        Args:
+            history (list, optional): Conversation context the answer depends on
+        
+        Returns:
+            str: Cached response text, or None on a miss
+        """
+        key = self.make_key(model, system_message, query, history)
+        with self._lock:
+            self._check_prompt_file()
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry, time.time()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["response"]
+    
+    def put(self, model, system_message, query, response, history=None):
+        """Store a response - written to disk SAVE_DELAY seconds later together with other changes"""
+        if not response or not response.strip():
+            return
+        key = self.make_key(model, system_message, query, history)
+        with self._lock:
+            self._check_prompt_file()
+            self._entries[key] = {"response": response, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._mark_dirty()
+    
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._mark_dirty()
+    
+    def _mark_dirty(self):
+        """Schedule a save unless one is pending - caller must hold the lock"""
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def flush(self):
+        """
+        Write pending changes now - call at shutdown, the timer thread does not outlive the process
+        
+        Returns:
+            bool: True if the file was written
+        """
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return False
+                self._dirty = False
+                data = {
+                    "version": self.FORMAT_VERSION,
+                    "prompt_fingerprint": self._prompt_fingerprint,
+                    "entries": list(self._entries.items())
+                }
+            # Serialized outside the lock - lookups do not wait for the disk
+            self._save(data)
+            return True
+    
+    def stats(self):
+        """
+        Return cache counters
+        
+        Returns:
+            dict: entries, hits, misses, evictions and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+    
+    def _load(self):
+        """Load entries from disk, ignoring a stale or corrupted file"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if (data.get("version") != self.FORMAT_VERSION or
+                data.get("prompt_fingerprint") != self._prompt_fingerprint):
+            return
+        
+        now = time.time()
+        for key, entry in data.get("entries", []):
+            if not self._is_expired(entry, now):
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _save(self, data):
+        """Write a snapshot of the entries atomically - caller must hold the save lock"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"[WARNING] Failed to save response cache: {str(e)}")
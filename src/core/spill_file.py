@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Spill file for the GPT-4 Command Application
+Keeps command output on disk, up to a size cap, with a line index for random access
+"""
+import os
+import mmap
+import codecs
+import atexit
+import bisect
+import tempfile
+import threading
+from array import array
+
+# Spill files still on disk, removed at interpreter exit
+_open_spill_files = set()
+
+# Name of every spill file - a crashed process leaves such files behind
+FILE_PREFIX = "wizi-output-"
+FILE_SUFFIX = ".log"
+
+
+def remove_stale_files(directory):
+    """
+    Delete spill files no live SpillFile of this process owns, e.g. left behind by a crash
+    
+    Args:
+        directory (str): Directory spill files are created in
+    
+    Returns:
+        int: Number of files removed
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    in_use = {spill.path for spill in list(_open_spill_files)}
+    removed = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        if not (name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)) or path in in_use:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            # Still open in another running instance (Windows)
+            pass
+    return removed
+
+
+class SpillFile:
+    """Append-only temporary file with line offsets, read back through mmap"""
+    
+    COPY_CHUNK_SIZE = 1024 * 1024
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    
+    # Appended once the cap is reached - the output after it is dropped
+    TRUNCATED_MARKER = "\n[... pominięto dalszą część danych wyjściowych - limit {megabytes:g} MB ...]\n"
+    
+    def __init__(self, directory=None, encoding="utf-8", max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Create an empty temporary file
+        
+        Args:
+            directory (str, optional): Where to place the file, created if missing,
+                defaults to the system temp dir
+            encoding (str): Encoding used for the stored text
+            max_bytes (int, optional): Size cap - output beyond it is dropped and counted
+                in dropped, 0 or None for no cap
+        """
+        self.encoding = encoding
+        self.max_bytes = max_bytes or None
+        self.dropped = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=FILE_PREFIX, suffix=FILE_SUFFIX, dir=directory)
+        self._writer = os.fdopen(fd, "wb")
+        self._reader = open(self.path, "rb")
+        self._mmap = None
+        self._mapped_size = 0
+        self._size = 0
+        self._line_offsets = array("Q", [0])
+        self._lock = threading.Lock()
+        self._refs = 1
+        self.closed = False
+        _open_spill_files.add(self)
+    
+    @classmethod
+    def from_text(cls, text, directory=None):
+        """Create a spill file holding the given text"""
+        spill = cls(directory)
+        spill.append(text)
+        return spill
+    
+    @property
+    def truncated(self):
+        """True if any output has been dropped"""
+        return self.dropped > 0
+    
+    @property
+    def size(self):
+        """Number of bytes written"""
+        return self._size
+    
+    @property
+    def line_count(self):
+        """Number of lines, counting a final line without a newline"""
+        with self._lock:
+            return self._line_count_locked()
+    
+    def _line_count_locked(self):
+        if self._size > self._line_offsets[-1]:
+            return len(self._line_offsets)
+        return len(self._line_offsets) - 1
+    
+    def append(self, text):
+        """Append text and index the new line starts - ignored once the file is removed
+        
+        The first byte over max_bytes ends the file with TRUNCATED_MARKER, the rest is only counted.
+        """
+        if not text:
+            return
+        data = text.encode(self.encoding, errors="replace")
+        with self._lock:
+            if self.closed:
+                return
+            if self.dropped:
+                self.dropped += len(data)
+                return
+            if self.max_bytes is not None and self._size + len(data) > self.max_bytes:
+                kept = max(0, self.max_bytes - self._size)
+                self.dropped = len(data) - kept
+                marker = self.TRUNCATED_MARKER.format(megabytes=self.max_bytes / (1024 * 1024))
+                data = data[:kept] + marker.encode(self.encoding, errors="replace")
+            self._writer.write(data)
+            self._writer.flush()
+            
+            offsets = self._line_offsets
+            base = self._size
+            position = data.find(b"\n")
+            while position != -1:
+                offsets.append(base + position + 1)
+                position = data.find(b"\n", position + 1)
+            self._size += len(data)
+    
+    def _view_locked(self):
+        """Return an mmap covering everything written so far - caller must hold the lock"""
+        if self._size == 0:
+            return b""
+        if self._mmap is None or self._mapped_size != self._size:
+            # The previous map may still be used by a search thread, it is
+            # closed when the last reference to it goes away
+            self._mmap = mmap.mmap(self._reader.fileno(), self._size, access=mmap.ACCESS_READ)
+            self._mapped_size = self._size
+        return self._mmap
+    
+    def read_lines(self, start, count):
+        """
+        Read a window of lines
+        
+        Args:
+            start (int): Index of the first line
+            count (int): Maximum number of lines to return
+        
+        Returns:
+            list: Decoded lines without trailing newlines
+        """
+        with self._lock:
+            if self.closed:
+                return []
+            total = self._line_count_locked()
+            start = max(0, min(start, total))
+            end = min(total, start + count)
+            if start >= end:
+                return []
+            view = self._view_locked()
+            begin = self._line_offsets[start]
+            finish = self._line_offsets[end] if end < len(self._line_offsets) else self._size
+            data = view[begin:finish]
+        return data.decode(self.encoding, errors="replace").splitlines()
+    
+    def line_of_offset(self, offset):
+        """Return the index of the line containing a byte offset"""
+        with self._lock:
+            return bisect.bisect_right(self._line_offsets, offset) - 1
+    
+    def search(self, needle, start_line=0, ignore_case=True, cancel_event=None):
+        """
+        Find the first line at or after start_line containing needle
+        
+        Meant to run off the UI thread. The file is scanned through mmap in
+        blocks, so memory use does not depend on the output size.
+        
+        Args:
+            needle (str): Text to look for
+            start_line (int): Line to start from
+            ignore_case (bool): Case-insensitive match (ASCII letters only)
+            cancel_event (threading.Event, optional): Stops the scan when set
+        
+        Returns:
+            int: Line index of the match, or -1 if not found
+        """
+        if not needle:
+            return -1
+        pattern = needle.encode(self.encoding, errors="replace")
+        if ignore_case:
+            pattern = pattern.lower()
+        block_size = self.COPY_CHUNK_SIZE
+        overlap = len(pattern) - 1
+        
+        with self._lock:
+            if self.closed or start_line >= len(self._line_offsets):
+                return -1
+            position = self._line_offsets[start_line]
+            end = self._size
+            view = self._view_locked()
+        
+        while position < end:
+            if cancel_event is not None and cancel_event.is_set():
+                return -1
+            block = view[position:min(end, position + block_size + overlap)]
+            if ignore_case:
+                block = block.lower()
+            found = block.find(pattern)
+            if found != -1:
+                return self.line_of_offset(position + found)
+            position += block_size
+        return -1
+    
+    def iter_chunks(self, chunk_size=COPY_CHUNK_SIZE):
+        """Yield the whole content as decoded text chunks"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        with self._lock:
+            end = self._size
+            view = self._view_locked()
+        for position in range(0, end, chunk_size):
+            yield decoder.decode(view[position:min(end, position + chunk_size)])
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+    
+    def retain(self):
+        """Register another owner of the file"""
+        with self._lock:
+            self._refs += 1
+        return self
+    
+    def release(self):
+        """Drop one owner - the file is removed when the last one lets go"""
+        with self._lock:
+            self._refs -= 1
+            last = self._refs <= 0
+        if last:
+            self.remove()
+    
+    def remove(self):
+        """Close and delete the file"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            # Not closed here - a search or copy in another thread may still be reading the map,
+            # it is closed when the last reference to it goes away
+            self._mmap = None
+            self._writer.close()
+            self._reader.close()
+        _open_spill_files.discard(self)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+@atexit.register
+def _remove_spill_files():
+    """Delete spill files left behind by open windows"""
+    for spill in list(_open_spill_files):
+        spill.remove()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Startup sequencing for the GPT-4 Command Application
+The main window comes up in minimal form first; the remaining widgets are built
+one phase per idle slot of the Tk loop while slow imports run in background
+threads, and every phase lands on a timeline printed by --startup-trace
+"""
+import time
+import threading
+import contextlib
+import collections
+
+
+class StartupTrace:
+    """Timeline of startup phases in milliseconds since the process started"""
+    
+    def __init__(self, origin=None, print_report=False):
+        """
+        Initialize an empty timeline
+        
+        Args:
+            origin (float, optional): time.perf_counter() taken first thing in the process, now if omitted
+            print_report (bool): Print the timeline once startup has finished
+        """
+        self.origin = time.perf_counter() if origin is None else origin
+        self.print_report = print_report
+        self.phases = []
+        self.marks = {}
+        self._lock = threading.Lock()
+    
+    def _ms(self, moment):
+        return 1000 * (moment - self.origin)
+    
+    def record(self, name, started, finished, thread=None):
+        """
+        Add a phase that ran between two time.perf_counter() values
+        
+        Args:
+            name (str): Phase name
+            started (float): Start of the phase
+            finished (float): End of the phase
+            thread (str, optional): Where it ran, the calling thread if omitted
+        """
+        with self._lock:
+            self.phases.append((self._ms(started), self._ms(finished),
+                                thread or threading.current_thread().name, name))
+    
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Record the enclosed block as a phase of the calling thread"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter())
+    
+    def mark(self, name):
+        """Record a point in time - only the first mark of a name counts"""
+        with self._lock:
+            self.marks.setdefault(name, self._ms(time.perf_counter()))
+    
+    def format_report(self):
+        """Timeline table in Polish, phases ordered by start"""
+        with self._lock:
+            # Marks are points in time - no duration and no thread
+            rows = self.phases + [(moment, None, "", f"● {name}") for name, moment in self.marks.items()]
+        rows.sort(key=lambda row: row[0])
+        width = max([len(row[2]) for row in rows] + [5])
+        lines = ["Przebieg uruchamiania (ms od startu procesu):",
+                 f"{'start':>9} {'czas':>9}  {'wątek':<{width}}  etap"]
+        for started, finished, thread, name in rows:
+            duration = f"{finished - started:9.1f}" if finished is not None else " " * 9
+            lines.append(f"{started:9.1f} {duration}  {thread:<{width}}  {name}")
+        return "\n".join(lines)
+    
+    def format_summary(self):
+        """One line for the metrics panel"""
+        with self._lock:
+            first_frame = self.marks.get("first_frame")
+            ready = self.marks.get("ready")
+        if first_frame is None:
+            return "Start: w toku"
+        ready_text = f"{ready:.0f} ms" if ready is not None else "w toku"
+        return f"Start: pierwsza klatka {first_frame:.0f} ms, gotowe {ready_text}"
+
+
+class StartupSequencer:
+    """Runs the startup work that can wait until the main window is on screen"""
+    
+    # Period of the check for background phases that are still running
+    POLL_MS = 50
+    
+    def __init__(self, root, trace=None):
+        """
+        Initialize the sequencer - nothing runs before start()
+        
+        Args:
+            root (tk.Tk): Main window, its event loop runs the deferred phases
+            trace (StartupTrace, optional): Timeline receiving every phase
+        """
+        self.root = root
+        self.trace = trace or StartupTrace()
+        self.finished = False
+        self._deferred = collections.deque()
+        self._background = []
+        self._pending = []
+        self._waiting = False
+        self._lock = threading.Lock()
+    
+    def defer(self, name, fn):
+        """Run fn in the Tk thread after the first frame, one phase per idle slot"""
+        self._deferred.append((name, fn))
+    
+    def background(self, name, fn):
+        """Run fn in its own thread after the first frame"""
+        self._background.append((name, fn))
+    
+    def track(self, name, future):
+        """
+        Record a phase that ends when a concurrent.futures.Future completes
+        
+        Startup is not finished until the future is done - safe to call from any thread.
+        The phase is credited to the thread completing the future, normally the event loop's.
+        """
+        started = time.perf_counter()
+        future.add_done_callback(lambda _: self.trace.record(name, started, time.perf_counter()))
+        with self._lock:
+            self._pending.append(future.done)
+    
+    def start(self):
+        """Schedule the deferred and background phases - call once the minimal window is built"""
+        self.trace.mark("window")
+        # Tk queued the geometry and redraw of the window as idle handlers already -
+        # this one runs after them, once the first frame is on screen
+        self.root.after_idle(self._first_frame)
+    
+    def _first_frame(self):
+        self.trace.mark("first_frame")
+        for name, fn in self._background:
+            thread = threading.Thread(target=self._run_phase, args=(name, fn), name=f"startup-{name}",
+                                      daemon=True)
+            with self._lock:
+                self._pending.append(lambda thread=thread: not thread.is_alive())
+            thread.start()
+        self._background = []
+        self.root.after_idle(self._run_next)
+    
+    def _run_phase(self, name, fn):
+        """Run one phase - a failing phase is reported and skipped so the ones after it still run"""
+        try:
+            with self.trace.phase(name):
+                fn()
+        except Exception as e:
+            print(f"[WARNING] Startup phase {name} failed: {str(e)}")
+    
+    def _run_next(self):
+        """Run one deferred phase, leaving the Tk loop free to handle input before the next"""
+        if self._deferred:
+            self._run_phase(*self._deferred.popleft())
+        if self._deferred:
+            self.root.after_idle(self._run_next)
+        else:
+            self._wait()
+    
+    def flush(self):
+        """Run the remaining deferred phases now - for user actions that need their widgets"""
+        while self._deferred:
+            self._run_phase(*self._deferred.popleft())
+    
+    def _wait(self):
+        """Finish once every background phase is done, checking every POLL_MS"""
+        if self._waiting or self.finished:
+            return
+        with self._lock:
+            self._pending = [done for done in self._pending if not done()]
+            pending = bool(self._pending)
+        if pending:
+            self._waiting = True
+            self.root.after(self.POLL_MS, self._poll)
+            return
+        self.finished = True
+        self.trace.mark("ready")
+        if self.trace.print_report:
+            print(self.trace.format_report())
+    
+    def _poll(self):
+        self._waiting = False
+        self._wait()
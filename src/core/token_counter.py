@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Token counting for the GPT-4 Command Application
+Uses tiktoken when it is installed, a character-based estimate otherwise
+"""
+import functools
+
+# Average characters per token used when tiktoken is not available
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model):
+    """Return the tiktoken encoding for a model, or None without tiktoken"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def is_exact(model="gpt-4o-mini"):
+    """True if counts come from the model's tokenizer rather than an estimate"""
+    return _get_encoding(model) is not None
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    """
+    Count the tokens of a text
+    
+    Args:
+        text (str): Text to measure
+        model (str): Model whose tokenizer should be used
+        
+    Returns:
+        int: Number of tokens (estimated if tiktoken is not installed)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, -(-len(text) // CHARS_PER_TOKEN))
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model="gpt-4o-mini"):
+    """Count tokens of a chat message list, including per-message overhead"""
+    # Every message carries a few tokens of role and separator framing
+    return sum(count_tokens(message.get("content") or "", model) + 4 for message in messages) + 2
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Local index of the tools installed on this computer
+Built from the executables on PATH and their man page summaries, stored as
+gzipped JSON and refreshed incrementally by directory and file mtime
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import shlex
+import shutil
+import platform
+import threading
+import subprocess
+
+
+def host_system():
+    """Return the application's name of the system this process runs on"""
+    return {"Darwin": "MacOS", "Windows": "Windows"}.get(platform.system(), "Linux")
+
+
+class ToolIndex:
+    """Executables on PATH with one-line descriptions"""
+    
+    FORMAT_VERSION = 1
+    SUMMARY_CHARS = 120
+    MAN_TIMEOUT = 20
+    HELP_TIMEOUT = 2
+    
+    # Tools models like to suggest - a query naming one of them gets a hint on whether it exists here,
+    # and the ones without a man page are described by `tool --help` while refreshing
+    HINT_TOOLS = (
+        "git", "curl", "wget", "rsync", "ssh", "tar", "zip", "unzip", "7z", "jq", "yq", "rg", "fd",
+        "fzf", "tree", "htop", "btop", "ncdu", "bat", "eza", "exa", "lsof", "netstat", "ss", "ip",
+        "ifconfig", "nmap", "docker", "podman", "kubectl", "systemctl", "journalctl", "apt", "dnf",
+        "yum", "pacman", "brew", "snap", "flatpak", "python3", "pip3", "node", "npm", "ffmpeg",
+        "convert", "sqlite3", "vim", "nano", "code", "winget", "choco", "pwsh"
+    )
+    
+    # Shell keywords and builtins - never looked up on PATH
+    SHELL_BUILTINS = frozenset((
+        "cd", "echo", "export", "set", "unset", "source", ".", "alias", "unalias", "exit", "return",
+        "if", "then", "else", "elif", "fi", "for", "while", "until", "do", "done", "case", "esac",
+        "function", "read", "printf", "test", "[", "[[", "]]", "true", "false", "pwd", "type",
+        "ulimit", "umask", "wait", "eval", "trap", "shift", "local", "declare", "history", "jobs",
+        "fg", "bg", "kill", "{", "}", "!", "let", "hash", "builtin", "command", "exec", "select",
+        # cmd.exe
+        "dir", "copy", "move", "del", "erase", "ren", "rename", "md", "mkdir", "rd", "rmdir", "cls",
+        "start", "title", "ver", "vol", "path", "pushd", "popd", "call", "goto", "setlocal", "endlocal"
+    ))
+    
+    # Prefixes that run the next word as a command
+    COMMAND_PREFIXES = frozenset(("sudo", "env", "time", "nohup", "nice", "exec", "command", "xargs",
+                                  "timeout", "watch", "doas", "stdbuf", "strace"))
+    
+    # Prefix options followed by a value, e.g. sudo -u root
+    PREFIX_OPTIONS_WITH_VALUE = frozenset(("-u", "-g", "-n", "-s", "-k"))
+    
+    # Local lookups: "man grep", "grep --help", "co robi grep", "czy mam jq"...
+    DESCRIBE_PATTERNS = (
+        re.compile(r"^(?:man|help|pomoc|info|whatis)\s+([\w.+-]+)$", re.IGNORECASE),
+        re.compile(r"^([\w.+-]+)\s+(?:--help|-h)$", re.IGNORECASE),
+        re.compile(r"^(?:co robi|do czego służy|czym jest|co to jest|what does|what is)\s+"
+                   r"(?:komenda|polecenie|program|the command\s+)?\s*[`'\"]?([\w.+-]+)[`'\"]?"
+                   r"(?:\s+(?:do|robi))?\s*\??$", re.IGNORECASE),
+    )
+    WHICH_PATTERNS = (
+        re.compile(r"^(?:czy mam|czy jest zainstalowany|czy jest zainstalowane|gdzie jest|which|"
+                   r"is)\s+[`'\"]?([\w.+-]+)[`'\"]?(?:\s+installed)?\s*\??$", re.IGNORECASE),
+    )
+    
+    def __init__(self, index_path, path_env=None):
+        """
+        Initialize the index without scanning
+        
+        Args:
+            index_path (str): Gzipped JSON file holding the index between runs
+            path_env (str, optional): PATH to index, the process PATH by default
+        """
+        self.index_path = index_path
+        self.path_env = path_env
+        self.version = 0
+        self.ready = threading.Event()
+        self._dirs = {}
+        self._tools = {}
+        self._help_summaries = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+    
+    def _path_dirs(self):
+        """Return the existing PATH directories, in lookup order and without duplicates"""
+        path_env = self.path_env if self.path_env is not None else os.environ.get("PATH", "")
+        dirs = []
+        for directory in path_env.split(os.pathsep):
+            directory = os.path.abspath(os.path.expanduser(directory)) if directory else ""
+            if directory and directory not in dirs and os.path.isdir(directory):
+                dirs.append(directory)
+        return dirs
+    
+    @staticmethod
+    def _tool_name(filename):
+        """Return the command name of an executable file, None if it is not one"""
+        if sys.platform == "win32":
+            name, extension = os.path.splitext(filename)
+            extensions = os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD").lower().split(";")
+            return name.lower() if extension.lower() in extensions else None
+        return filename
+    
+    def load(self):
+        """Read the stored index - a missing or damaged file leaves the index empty"""
+        try:
+            with gzip.open(self.index_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return False
+        if data.get("version") != self.FORMAT_VERSION:
+            return False
+        with self._lock:
+            self._dirs = data.get("dirs", {})
+            self._help_summaries = data.get("help", {})
+            self._rebuild_locked()
+        # The stored index is good enough to answer until the refresh catches up
+        self.ready.set()
+        return True
+    
+    def _save(self):
+        """Write the index atomically"""
+        with self._lock:
+            data = {"version": self.FORMAT_VERSION, "dirs": self._dirs, "help": self._help_summaries}
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"[WARNING] Failed to save tool index: {str(e)}")
+    
+    def _rebuild_locked(self):
+        """Rebuild the name lookup from the PATH directories - caller must hold the lock"""
+        tools = {}
+        for directory in self._path_dirs():
+            entry = self._dirs.get(directory)
+            if entry is None:
+                continue
+            for name, (filename, _, summary) in entry["tools"].items():
+                tools.setdefault(name, (os.path.join(directory, filename), summary))
+        self._tools = tools
+        self.version += 1
+    
+    def refresh(self):
+        """
+        Rescan PATH directories whose mtime changed and describe new or changed executables
+        
+        Runs `tool --help` for the HINT_TOOLS without a man page summary - meant for a
+        background thread, lookups only read what it stored.
+        
+        Returns:
+            dict: Number of tools, rescanned directories and new descriptions
+        """
+        with self._refresh_lock:
+            with self._lock:
+                stored = dict(self._dirs)
+                stored_help = dict(self._help_summaries)
+            
+            dirs = {}
+            rescanned = 0
+            pending = []
+            changed_paths = set()
+            for directory in self._path_dirs():
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                old = stored.get(directory)
+                if old is not None and old["mtime_ns"] == mtime:
+                    dirs[directory] = old
+                    continue
+                
+                rescanned += 1
+                old_tools = old["tools"] if old is not None else {}
+                tools = {}
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError:
+                    continue
+                for entry in entries:
+                    name = self._tool_name(entry.name)
+                    if name is None:
+                        continue
+                    try:
+                        if not entry.is_file() or not os.access(entry.path, os.X_OK):
+                            continue
+                        file_mtime = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    previous = old_tools.get(name)
+                    if previous is not None and previous[1] == file_mtime:
+                        tools[name] = previous
+                    else:
+                        tools[name] = [entry.name, file_mtime, None]
+                        pending.append(tools[name])
+                        changed_paths.add(entry.path)
+                dirs[directory] = {"mtime_ns": mtime, "tools": tools}
+            
+            # One apropos call describes everything new - no process per tool
+            described = 0
+            if pending:
+                summaries = self._man_summaries()
+                for tool in pending:
+                    tool[2] = summaries.get(self._tool_name(tool[0]), "")
+                    described += bool(tool[2])
+            
+            with self._lock:
+                self._dirs = dirs
+                self._rebuild_locked()
+                hint_tools = [self._tools[name] for name in self.HINT_TOOLS if name in self._tools]
+            
+            # Kept only for the hint tools still installed, re-run when the executable changed
+            help_summaries = {}
+            for path, summary in hint_tools:
+                if summary:
+                    continue
+                if path in stored_help and path not in changed_paths:
+                    help_summaries[path] = stored_help[path]
+                else:
+                    help_summaries[path] = self._help_summary(path)
+                    described += bool(help_summaries[path])
+            
+            changed = rescanned or set(dirs) != set(stored) or help_summaries != stored_help
+            with self._lock:
+                self._help_summaries = help_summaries
+                count = len(self._tools)
+            if changed:
+                self._save()
+            self.ready.set()
+            return {"tools": count, "rescanned_dirs": rescanned, "described": described}
+    
+    def refresh_async(self):
+        """Run refresh in a background thread"""
+        thread = threading.Thread(target=self._refresh_quietly, daemon=True)
+        thread.start()
+        return thread
+    
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"[WARNING] Tool index refresh failed: {str(e)}")
+            self.ready.set()
+    
+    def _man_summaries(self):
+        """Return name -> one-line man page description from the whatis database"""
+        apropos = shutil.which("apropos") or shutil.which("man")
+        if apropos is None:
+            return {}
+        args = [apropos, "."] if os.path.basename(apropos) == "apropos" else [apropos, "-k", "."]
+        try:
+            completed = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                       stdin=subprocess.DEVNULL, timeout=self.MAN_TIMEOUT)
+        except (OSError, subprocess.SubprocessError):
+            return {}
+        summaries = {}
+        # "grep (1)             - print lines that match patterns", sections 1 and 8 only
+        pattern = re.compile(r"^([^\s(,]+)[^(]*\(([18])[^)]*\)\s+-+\s+(.*)$")
+        for line in completed.stdout.decode("utf-8", errors="replace").splitlines():
+            match = pattern.match(line)
+            if match:
+                summaries.setdefault(match.group(1), match.group(3).strip()[:self.SUMMARY_CHARS])
+        return summaries
+    
+    def _help_summary(self, path):
+        """Return the first line of `tool --help`, or an empty string"""
+        try:
+            completed = subprocess.run([path, "--help"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       stdin=subprocess.DEVNULL, timeout=self.HELP_TIMEOUT)
+        except (OSError, subprocess.SubprocessError):
+            return ""
+        for line in completed.stdout.decode("utf-8", errors="replace").splitlines():
+            if line.strip():
+                return line.strip()[:self.SUMMARY_CHARS]
+        return ""
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._tools)
+    
+    @staticmethod
+    def _lookup_name(name):
+        """Name as stored in the index - Windows command names are case-insensitive"""
+        return name.lower() if sys.platform == "win32" else name
+    
+    def path_of(self, name):
+        """Return the path of an indexed tool, None if it is not installed"""
+        with self._lock:
+            tool = self._tools.get(self._lookup_name(name))
+        return tool[0] if tool is not None else None
+    
+    def has(self, name):
+        """True if the tool is installed - falls back to shutil.which until the index is ready"""
+        if not self.ready.is_set():
+            return shutil.which(name) is not None
+        return self.path_of(name) is not None
+    
+    def describe(self, name):
+        """
+        Return a one-line description of an installed tool
+        
+        Uses the man page summary, or the `tool --help` line refresh() stored for the hint tools -
+        never starts a process itself.
+        
+        Returns:
+            tuple: (path, description, source) with source "man" or "help", None if not installed
+        """
+        with self._lock:
+            tool = self._tools.get(self._lookup_name(name))
+            if tool is None:
+                return None
+            path, summary = tool
+            if summary:
+                return path, summary, "man"
+            return path, self._help_summaries.get(path, ""), "help"
+    
+    def lookup(self, query, system):
+        """
+        Answer simple tool questions locally
+        
+        Args:
+            query (str): User request
+            system (str): Target system - only questions about this computer are answered
+        
+        Returns:
+            str: Response in the "command ### description" format, None to ask the model
+        """
+        if system != host_system() or not self.ready.is_set():
+            return None
+        query = query.strip()
+        for pattern in self.WHICH_PATTERNS:
+            match = pattern.match(query)
+            if match:
+                name = match.group(1)
+                path = self.path_of(name)
+                check = f"where {name}" if system == "Windows" else f"command -v {name}"
+                if path is None:
+                    return f"{check}\n###\n{name} nie jest zainstalowany na tym komputerze (brak w PATH)."
+                return f"{check}\n###\n{name} jest zainstalowany: {path}"
+        for pattern in self.DESCRIBE_PATTERNS:
+            match = pattern.match(query)
+            if match:
+                described = self.describe(match.group(1))
+                if described is None or not described[1]:
+                    return None
+                name = match.group(1)
+                path, summary, source = described
+                command = f"man {name}" if source == "man" else f"{name} --help"
+                return f"{command}\n###\n{name} ({path}): {summary}"
+        return None
+    
+    def hint(self, system, query):
+        """
+        Return a short note on which of the tools named in the query exist here
+        
+        Only HINT_TOOLS the query mentions are listed, so the note stays short and the same
+        query always gets the same system message - has() answers the same before and after
+        the index is ready.
+        
+        Args:
+            system (str): Target system
+            query (str): User request
+        
+        Returns:
+            str: Hint for the system message, empty for other systems or queries naming none of them
+        """
+        if system != host_system():
+            return ""
+        words = set(re.findall(r"[\w+-]+", query.lower()))
+        mentioned = [name for name in self.HINT_TOOLS if name in words]
+        if not mentioned:
+            return ""
+        available = [name for name in mentioned if self.has(name)]
+        missing = [name for name in mentioned if name not in available]
+        parts = []
+        if available:
+            parts.append(f"Na tym komputerze są dostępne: {', '.join(available)}.")
+        if missing:
+            parts.append(f"Niedostępne (nie proponuj ich): {', '.join(missing)}.")
+        return " ".join(parts)
+    
+    def command_binaries(self, command):
+        """
+        Return the programs a shell command line would run
+        
+        Args:
+            command (str): Command line
+        
+        Returns:
+            list: Program names or paths, builtins excluded
+        """
+        try:
+            lexer = shlex.shlex(command, posix=True, punctuation_chars=";&|()")
+            lexer.whitespace_split = True
+            tokens = list(lexer)
+        except ValueError:
+            return []
+        
+        binaries = []
+        expect_command = True
+        skip_value = False
+        for token in tokens:
+            if token and set(token) <= set(";&|()"):
+                expect_command = True
+                skip_value = False
+                continue
+            if not expect_command:
+                continue
+            if skip_value:
+                skip_value = False
+                continue
+            if re.match(r"^\w+=", token) or token.startswith("-") or token.isdigit():
+                skip_value = token in self.PREFIX_OPTIONS_WITH_VALUE
+                continue
+            if token in self.COMMAND_PREFIXES:
+                continue
+            expect_command = False
+            if token not in self.SHELL_BUILTINS and token not in binaries:
+                binaries.append(token)
+        return binaries
+    
+    def missing_binaries(self, command, system):
+        """
+        Return the programs of a command line that are not installed
+        
+        Returns:
+            list: Missing program names, empty for other systems
+        """
+        if system != host_system():
+            return []
+        missing = []
+        for binary in self.command_binaries(command):
+            path = os.path.expandvars(os.path.expanduser(binary))
+            # A variable this process does not have may still be set by the command itself
+            if "$" in path or "%" in path:
+                continue
+            if os.sep in path or (os.altsep and os.altsep in path):
+                if not os.access(path, os.X_OK):
+                    missing.append(binary)
+            elif not self.has(path):
+                missing.append(binary)
+        return missing
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Translation pipeline for the GPT-4 Command Application
+Turns natural-language requests into terminal commands without any GUI
+"""
+import os
+import json
+import time
+import asyncio
+
+import client_manager
+import command_parser
+import conversation
+import metrics
+import model_router
+import prompt_registry
+import request_policy
+import response_cache
+
+# Constants
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROMPT_PATH = os.path.join(PROJECT_ROOT, "config", "ChatPrompt.json")
+CACHE_DIR = os.path.join(PROJECT_ROOT, "cache")
+
+SYSTEMS = prompt_registry.SYSTEMS
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Packed requests - several queries of one system answered by a single API call
+DEFAULT_BATCH_SIZE = 10
+BATCH_INSTRUCTION = (
+    "Otrzymasz obiekt JSON z listą zapytań \"queries\" (pola \"id\" i \"query\"). "
+    "Odpowiedz na każde zapytanie osobno, dokładnie w takim formacie, jak na pojedyncze zapytanie, "
+    "i zwróć listę \"results\" z polami \"id\" (to samo id) i \"response\" (pełna odpowiedź)."
+)
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "command_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "response": {"type": "string"}
+                        },
+                        "required": ["id", "response"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["results"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+class MissingApiKeyError(Exception):
+    """Raised when no API key is configured"""
+
+
+def extract_command(text):
+    """Return the best command of a response"""
+    return command_parser.parse_response(text).command
+
+
+class Translation:
+    """Result of translating one query"""
+    
+    def __init__(self, query, system, response, from_cache=False, ttft=None, elapsed=0.0, local=False, model=None):
+        self.query = query
+        self.system = system
+        self.response = response
+        self.model = model
+        self.escalated = False
+        parsed = command_parser.parse_response(response)
+        self.command = parsed.command
+        self.commands = parsed.commands
+        self.explanation = parsed.explanation
+        self.from_cache = from_cache
+        self.local = local
+        self.ttft = ttft
+        self.elapsed = elapsed
+    
+    def to_dict(self):
+        """Return the result as a JSON-serializable dict"""
+        return {
+            "query": self.query,
+            "system": self.system,
+            "command": self.command,
+            "commands": self.commands,
+            "response": self.response,
+            "from_cache": self.from_cache,
+            "local": self.local,
+            "model": self.model,
+            "escalated": self.escalated,
+            "ttft": self.ttft,
+            "elapsed": self.elapsed
+        }
+
+
+class Translator:
+    """GUI-free translation pipeline: prompt, cache, API call"""
+    
+    def __init__(self, config, prompt_registry, client_manager=None, response_cache=None, metrics_registry=None,
+                 tool_index=None, policy=None, router=None):
+        """
+        Initialize the pipeline
+        
+        Args:
+            config (dict): Application configuration
+            prompt_registry (PromptRegistry): Compiled system messages
+            client_manager (ClientManager, optional): Shared API client
+            response_cache (ResponseCache, optional): Cache of previous answers
+            metrics_registry (MetricsRegistry, optional): Receives per-stage timings
+            tool_index (ToolIndex, optional): Installed tools - answers simple lookups locally
+                and adds an "available tools" hint to the system message
+            policy (RequestPolicy, optional): Retries, deadline, hedging and circuit breaker
+                of API requests, built from config if not given
+            router (ModelRouter, optional): Chooses the fast or strong model of every query,
+                built from config if not given
+        """
+        self.config = config
+        self.prompt_registry = prompt_registry
+        self.metrics = metrics_registry or metrics.registry
+        self.client_manager = client_manager
+        self.response_cache = response_cache
+        self.tool_index = tool_index
+        self.request_policy = policy or request_policy.RequestPolicy(config)
+        self.model_router = router or model_router.ModelRouter(config)
+    
+    @classmethod
+    def from_config(cls, config, registry=None, prompt_path=PROMPT_PATH, max_connections=None, tool_index=None):
+        """
+        Build a translator with its client manager and cache from configuration
+        
+        Args:
+            config (dict): Application configuration
+            registry (PromptRegistry, optional): Shared registry, created from prompt_path otherwise
+            prompt_path (str): Path to ChatPrompt.json
+            max_connections (int, optional): Size of the HTTP connection pool
+            tool_index (ToolIndex, optional): Index of the tools installed on this computer
+        """
+        if registry is None:
+            registry = prompt_registry.PromptRegistry(prompt_path, config.get("model", DEFAULT_MODEL))
+        
+        manager = client_manager.ClientManager(config, max_connections=max_connections)
+        cache = None
+        if config.get("cache_enabled", True):
+            cache = response_cache.ResponseCache(
+                os.path.join(CACHE_DIR, "responses.json"),
+                prompt_path,
+                max_entries=config.get("cache_max_entries", response_cache.ResponseCache.DEFAULT_MAX_ENTRIES),
+                ttl=config.get("cache_ttl", response_cache.ResponseCache.DEFAULT_TTL)
+            )
+        return cls(config, registry, manager, cache, tool_index=tool_index)
+    
+    def update_config(self, config):
+        """
+        Switch to a changed configuration - queries already sent finish with the previous one
+        
+        Key, model and endpoint changes reach the client manager, the prompt registry follows the
+        model, the request policy and the model router re-read their settings. Cache settings
+        apply on the next start.
+        
+        Args:
+            config (dict): New application configuration
+        """
+        self.config = config
+        if self.client_manager is not None:
+            self.client_manager.update_config(config)
+        self.prompt_registry.update_config(config)
+        self.request_policy.update_config(config)
+        self.model_router.update_config(config)
+    
+    def create_system_message(self, selected_system, query=""):
+        """Return the precompiled system message for the selected operating system
+        
+        For this computer's system it ends with a note on which of the common tools named in
+        the query are installed.
+        """
+        system_message = self.prompt_registry.system_message(selected_system)
+        if self.tool_index is not None and query:
+            hint = self.tool_index.hint(selected_system, query)
+            if hint:
+                system_message = f"{system_message}\n\n{hint}"
+        if self.config.get("structured_output", False):
+            system_message = f"{system_message}\n\n{command_parser.STRUCTURED_INSTRUCTION}"
+        return system_message
+    
+    def send_request(self, client, model, store, system_message, query, stream=False, history=None,
+                     response_format=None, timeout=None):
+        """Send request to OpenAI API, with previous turns of the conversation between system and query"""
+        options = {"response_format": response_format} if response_format is not None else {}
+        if timeout is not None:
+            options["timeout"] = timeout
+        return client.chat.completions.create(
+            model=model,
+            store=store,
+            stream=stream,
+            messages=[
+                {"role": "system", "content": system_message},
+                *(history or ()),
+                {"role": "user", "content": query}
+            ],
+            **options
+        )
+    
+    def translate(self, query, selected_system, stream=False, on_delta=None, cancelled=None, history=None,
+                  tier=None, cache=True):
+        """
+        Translate a natural-language query into a command
+        
+        Args:
+            query (str): User request
+            selected_system (str): Target system (Linux, Windows, MacOS)
+            stream (bool): Stream the answer, calling on_delta for every text delta
+            on_delta (callable, optional): Receives text deltas while streaming
+            cancelled (callable, optional): Returns True when the caller lost interest
+            history (list, optional): Previous turns as chat messages - for a follow-up the newest
+                turn is part of the response cache key, standalone queries share one entry
+            tier (str, optional): Model tier to use instead of the one chosen by the router
+            cache (bool): Store the answer in the response cache - False for speculative
+                requests, whose answer is stored by remember() only if it is used
+        
+        Returns:
+            Translation: The result, or None if cancelled while streaming - a fast answer without
+                a command is replaced by the strong model's one (not streamed, escalated set)
+        
+        Raises:
+            MissingApiKeyError: If no API key is configured
+            ImportError: If the openai package is not installed
+        """
+        started = time.perf_counter()
+        if tier is None:
+            tier = self.model_router.route(query, history)
+        model, store, system_message, cached = self._prepare(query, selected_system, started, history, tier)
+        if cached is not None:
+            return cached
+        
+        # Reuse the pooled client - rebuilt only when api_key or model changed
+        with self.metrics.timer("client_create"):
+            client = self.client_manager.get_client(self.config)
+        
+        ttft = None
+        request_started = time.perf_counter()
+        if stream and not self.config.get("structured_output", False):
+            parts = []
+            response_stream = self.request_policy.call(
+                lambda timeout: self.send_request(client, model, store, system_message, query, stream=True,
+                                                  history=history, timeout=timeout)
+            )
+            for chunk in response_stream:
+                if cancelled is not None and cancelled():
+                    response_stream.close()
+                    return None
+                delta = self._chunk_text(chunk)
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    self.metrics.record("ttft", time.perf_counter() - request_started)
+                parts.append(delta)
+                if on_delta is not None:
+                    on_delta(delta)
+            response = "".join(parts)
+        else:
+            completion = self.request_policy.call(
+                lambda timeout: self.send_request(client, model, store, system_message, query, history=history,
+                                                  response_format=self._response_format(), timeout=timeout)
+            )
+            response = self._completion_text(completion, stream, on_delta)
+        self._record_network(tier, time.perf_counter() - request_started)
+        
+        if self.model_router.needs_escalation(tier, response):
+            result = self.translate(query, selected_system, cancelled=cancelled, history=history,
+                                    tier=model_router.STRONG, cache=cache)
+            if result is not None:
+                result.escalated = True
+            return result
+        return self._finish(query, selected_system, model, system_message, response, started, ttft, history,
+                            cache)
+    
+    async def translate_async(self, query, selected_system, stream=False, on_delta=None, cancelled=None,
+                              history=None, tier=None, cache=True):
+        """
+        Translate a query on the asyncio event loop with the async client
+        
+        Same arguments, result and exceptions as translate. Cancelling the task
+        closes an open stream.
+        """
+        started = time.perf_counter()
+        if tier is None:
+            tier = self.model_router.route(query, history)
+        model, store, system_message, cached = self._prepare(query, selected_system, started, history, tier)
+        if cached is not None:
+            return cached
+        
+        with self.metrics.timer("client_create"):
+            client = self.client_manager.get_async_client(self.config)
+        
+        ttft = None
+        request_started = time.perf_counter()
+        if stream and not self.config.get("structured_output", False):
+            policy_started = time.monotonic()
+            response_stream = await self.request_policy.acall(
+                lambda timeout: self.send_request(client, model, store, system_message, query, stream=True,
+                                                  history=history, timeout=timeout)
+            )
+            
+            async def read_stream():
+                nonlocal ttft
+                parts = []
+                async for chunk in response_stream:
+                    if cancelled is not None and cancelled():
+                        return None
+                    delta = self._chunk_text(chunk)
+                    if not delta:
+                        continue
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                        self.metrics.record("ttft", time.perf_counter() - request_started)
+                    parts.append(delta)
+                    if on_delta is not None:
+                        on_delta(delta)
+                return "".join(parts)
+            
+            try:
+                # The deadline covers reading the stream, not only opening it
+                response = await self.request_policy.within_deadline(read_stream(), policy_started)
+            except (asyncio.CancelledError, request_policy.DeadlineExceededError):
+                await response_stream.close()
+                raise
+            if response is None:
+                await response_stream.close()
+                return None
+        else:
+            completion = await self.request_policy.acall(
+                lambda timeout: self.send_request(client, model, store, system_message, query, history=history,
+                                                  response_format=self._response_format(), timeout=timeout)
+            )
+            response = self._completion_text(completion, stream, on_delta)
+        self._record_network(tier, time.perf_counter() - request_started)
+        
+        if self.model_router.needs_escalation(tier, response):
+            result = await self.translate_async(query, selected_system, cancelled=cancelled, history=history,
+                                                tier=model_router.STRONG, cache=cache)
+            if result is not None:
+                result.escalated = True
+            return result
+        return self._finish(query, selected_system, model, system_message, response, started, ttft, history,
+                            cache)
+    
+    def translate_many(self, queries, selected_system, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Translate several queries for one system, packing up to batch_size of them into one request
+        
+        Local and cached answers never reach the network. The packed request repeats the
+        system message once instead of once per query and asks for a JSON list of answers;
+        answers missing from it or not parseable are retried as single queries. With routing,
+        fast and strong queries are packed separately, and so are queries whose system messages
+        differ (a tool hint) - every answer is cached under its own query's system message.
+        
+        Args:
+            queries (list): User requests
+            selected_system (str): Target system of all queries
+            batch_size (int): Maximum number of queries in one request
+        
+        Returns:
+            list: One item per query, in order - a Translation, or the exception that
+                failed the query, so one bad query does not lose the others
+        """
+        batch_size = max(1, batch_size)
+        results = [None] * len(queries)
+        pending = {}
+        for index, query in enumerate(queries):
+            tier = self.model_router.route(query)
+            try:
+                model, store, system_message, cached = self._prepare(query, selected_system, time.perf_counter(),
+                                                                     tier=tier)
+            except Exception as e:
+                results[index] = e
+                continue
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.setdefault((tier, model, store, system_message), []).append(index)
+        
+        for (tier, model, store, system_message), indices in pending.items():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                answers = {}
+                started = time.perf_counter()
+                if len(chunk) > 1:
+                    try:
+                        answers = self._send_packed(model, store, system_message,
+                                                    [queries[index] for index in chunk])
+                    except Exception as e:
+                        # e.g. a model without structured outputs - every query is retried on its own
+                        print(f"[WARNING] Packed request failed, retrying {len(chunk)} queries one by one: {str(e)}")
+                
+                for position, index in enumerate(chunk):
+                    answer = answers.get(position)
+                    escalate = answer is not None and self.model_router.needs_escalation(tier, answer)
+                    if answer is not None and not escalate:
+                        results[index] = self._finish(queries[index], selected_system, model, system_message,
+                                                      answer, started, None)
+                        continue
+                    try:
+                        results[index] = self.translate(queries[index], selected_system,
+                                                        tier=model_router.STRONG if escalate else tier)
+                        if escalate:
+                            results[index].escalated = True
+                    except Exception as e:
+                        results[index] = e
+        return results
+    
+    def _send_packed(self, model, store, system_message, queries):
+        """
+        Send queries as one request with a structured JSON response
+        
+        Returns:
+            dict: Answer by position in queries - positions without a usable answer are missing
+        """
+        with self.metrics.timer("client_create"):
+            client = self.client_manager.get_client(self.config)
+        
+        payload = json.dumps({"queries": [{"id": position, "query": query} for position, query in enumerate(queries)]},
+                             ensure_ascii=False)
+        with self.metrics.timer("network"):
+            completion = self.request_policy.call(
+                lambda timeout: self.send_request(client, model, store, f"{system_message}\n\n{BATCH_INSTRUCTION}",
+                                                  payload, response_format=BATCH_RESPONSE_FORMAT, timeout=timeout)
+            )
+        return self._parse_packed(completion.choices[0].message.content or "", len(queries))
+    
+    @staticmethod
+    def _parse_packed(content, count):
+        """Pick the usable answers out of a packed response - the first non-empty one per known id"""
+        try:
+            items = json.loads(content)["results"]
+        except (ValueError, KeyError, TypeError):
+            return {}
+        if not isinstance(items, list):
+            return {}
+        
+        answers = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            position = item.get("id")
+            response = item.get("response")
+            if (isinstance(position, int) and 0 <= position < count and position not in answers
+                    and isinstance(response, str) and response.strip()):
+                answers[position] = response
+        return answers
+    
+    def _prepare(self, query, selected_system, started, history=None, tier=None):
+        """
+        Build the system message and look the query up in the cache
+        
+        For a follow-up the turn it refers to is part of the cache key (see conversation.cache_context),
+        tier selects the routed model - the configured model is used for None.
+        
+        Returns:
+            tuple: (model, store, system message, cached or local Translation or None)
+        
+        Raises:
+            MissingApiKeyError: If the query is not cached and no API key is configured
+        """
+        model = self.model_router.model(tier) if tier is not None else self.config.get("model", DEFAULT_MODEL)
+        store = self.config.get("store", True)
+        
+        # Questions about installed tools are answered from the local index
+        if self.tool_index is not None:
+            answer = self.tool_index.lookup(query, selected_system)
+            if answer is not None:
+                elapsed = time.perf_counter() - started
+                self.metrics.record("translate_total", elapsed)
+                return model, store, None, Translation(query, selected_system, answer, elapsed=elapsed, local=True)
+        
+        with self.metrics.timer("prompt_build"):
+            system_message = self.create_system_message(selected_system, query)
+        
+        # Repeated queries are answered from the local cache without touching the network
+        if self.response_cache is not None:
+            with self.metrics.timer("cache_lookup"):
+                cached = self.response_cache.get(model, system_message, query,
+                                                 conversation.cache_context(history, query))
+            if cached is not None:
+                elapsed = time.perf_counter() - started
+                self.metrics.record("translate_total", elapsed)
+                return model, store, system_message, Translation(query, selected_system, cached,
+                                                                 from_cache=True, elapsed=elapsed, model=model)
+        
+        if not self.config.get("api_key", ""):
+            raise MissingApiKeyError("Brak klucza API w pliku konfiguracyjnym.")
+        return model, store, system_message, None
+    
+    def remember(self, result, history=None):
+        """
+        Store an answer translated with cache=False, e.g. a prefetch the user sent
+        
+        Args:
+            result (Translation): Fresh answer - cached and local ones are skipped
+            history (list, optional): History the query was sent with
+        """
+        if self.response_cache is None or result is None or result.from_cache or result.local:
+            return
+        self.response_cache.put(result.model, self.create_system_message(result.system, result.query),
+                                result.query, result.response, conversation.cache_context(history, result.query))
+    
+    def _response_format(self):
+        """JSON schema of the answer in structured output mode, None otherwise"""
+        if self.config.get("structured_output", False):
+            return command_parser.STRUCTURED_RESPONSE_FORMAT
+        return None
+    
+    @staticmethod
+    def _completion_text(completion, stream=False, on_delta=None):
+        """Text of a complete answer - structured answers are not streamed, they arrive as one delta"""
+        response = command_parser.normalize_response(completion.choices[0].message.content or "")
+        if stream and on_delta is not None and response:
+            on_delta(response)
+        return response
+    
+    def _record_network(self, tier, seconds):
+        """Record the request time overall and, with routing, for the tier that answered"""
+        self.metrics.record("network", seconds)
+        if tier is not None:
+            self.metrics.record(f"network_{tier}", seconds)
+            self.model_router.record(tier, seconds)
+    
+    @staticmethod
+    def _chunk_text(chunk):
+        """Return the text delta of a stream chunk, None if it carries none"""
+        if not chunk.choices:
+            return None
+        return chunk.choices[0].delta.content
+    
+    def _finish(self, query, selected_system, model, system_message, response, started, ttft, history=None,
+                cache=True):
+        """Store a fresh answer in the cache (unless cache is False) and wrap it in a Translation"""
+        response = command_parser.normalize_response(response)
+        if cache and self.response_cache is not None:
+            self.response_cache.put(model, system_message, query, response,
+                                    conversation.cache_context(history, query))
+        
+        elapsed = time.perf_counter() - started
+        self.metrics.record("translate_total", elapsed)
+        return Translation(query, selected_system, response,
+                           ttft=ttft if ttft is not None else elapsed, elapsed=elapsed, model=model)
@@ -10,6 +10,25 @@ from tkinter import scrolledtext, messagebox, ttk
 import subprocess
 import threading
 import json
+import sqlite3
+import functools
+
+import conversation
+import event_loop
+import history_store
+import job_manager
+import metrics
+import prefetcher
+import prompt_registry
+import query_scheduler
+import results_window
+import spill_file
+import startup
+import tool_index
+import translator
+
+# Constants
+PROMPT_PATH = translator.PROMPT_PATH
 
 
 class GptAppGUI:
@@ -37,35 +56,212 @@ class GptAppGUI:
     BUTTON_ACTIVE_BG = "#505050"
     ACCENT_COLOR = "#4a9eff"
     
-    def __init__(self, root, config):
-        """Initialize the application GUI"""
+    # Period of the pump that runs callbacks posted by the background event loop -
+    # streamed deltas are flushed into the panes at most once per pump
+    UI_PUMP_MS = 16
+    
+    # Command output - read in chunks, pushed to the output window at most every OUTPUT_FLUSH_MS
+    OUTPUT_CHUNK_SIZE = 64 * 1024
+    OUTPUT_FLUSH_MS = 100
+    
+    # Output longer than this opens in the virtualized large output viewer
+    LARGE_OUTPUT_THRESHOLD = 200_000
+    
+    # Complete command output on disk - files left by a previous run are removed at startup
+    SPILL_DIR = os.path.join(translator.CACHE_DIR, "output")
+    
+    # Jobs window refresh and the labels of command job states
+    JOBS_REFRESH_MS = 1000
+    JOB_STATE_LABELS = {
+        job_manager.CommandJob.QUEUED: "w kolejce",
+        job_manager.CommandJob.RUNNING: "działa",
+        job_manager.CommandJob.DONE: "zakończone",
+        job_manager.CommandJob.FAILED: "błąd",
+        job_manager.CommandJob.TIMEOUT: "przekroczony czas",
+        job_manager.CommandJob.KILLED: "zatrzymane",
+    }
+    
+    # History window - search runs this long after the last keystroke
+    HISTORY_SEARCH_MS = 150
+    HISTORY_PATH = os.path.join(translator.CACHE_DIR, "history.db")
+    
+    # Metrics panel refresh and default JSONL export interval
+    METRICS_REFRESH_MS = 1000
+    METRICS_EXPORT_INTERVAL = 60
+    METRICS_EXPORT_PATH = os.path.join(translator.PROJECT_ROOT, "logs", "metrics.jsonl")
+    
+    # How often config.json is checked for changes
+    CONFIG_CHECK_MS = 1000
+    
+    def __init__(self, root, config, trace=None, config_service=None):
+        """
+        Initialize the application GUI
+        
+        Args:
+            root (tk.Tk): Main window
+            config (dict): Application configuration
+            trace (startup.StartupTrace, optional): Startup timeline, started when the process did
+            config_service (ConfigService, optional): Source of config, followed for changes of config.json
+        """
         self.root = root
         self.config = config
         self.selected_system = tk.StringVar(value=config.get("default_system", "Linux"))
+        self.startup = startup.StartupSequencer(root, trace)
+        
+        # Backend state shared with headless runs
+        with self.startup.trace.phase("backend"):
+            self._init_backend()
         
-        # Load chat prompts
-        self.prompts = self._load_chat_prompts()
+        # Configure the main window and create what the first frame shows
+        with self.startup.trace.phase("main_window"):
+            self._configure_root()
+            self.create_widgets()
         
-        # Configure the main window
-        self._configure_root()
+        # The rest waits for the first frame - widgets in the Tk thread, imports in background threads
+        self.startup.defer("widgets", self._create_deferred_widgets)
+        self._start_background_work()
+        self.startup.start()
         
-        # Create and arrange UI components
-        self.create_widgets()
+        # Changes of config.json apply without a restart
+        self.config_service = config_service
+        if config_service is not None:
+            config_service.subscribe(self.translator.update_config)
+            config_service.subscribe(self._on_config_changed)
+            self.root.after(self.CONFIG_CHECK_MS, self._watch_config)
     
-    def _load_chat_prompts(self):
-        """Load chat prompts from JSON file"""
+    def _init_backend(self):
+        """Create everything that is not a widget - also used to drive the app headlessly"""
+        # Streaming state - the stream currently allowed to write to the panes
+        self._active_stream = None
+        self.last_ttft = None
+        
+        # Answers of the last query for every system, kept when multi_system_enabled is set
+        self.system_results = None
+        
+        # Candidate commands of the shown answer, best first - Ctrl+Space cycles through them
+        self.command_candidates = []
+        self._candidate_index = 0
+        
+        # Per-stage latency histograms
+        self.metrics = metrics.registry
+        self.metrics.enabled = self.config.get("metrics_enabled", True)
+        self.metrics_visible = False
+        self.metrics_frame = None
+        
+        # Compiled prompts and UI strings, reloaded when ChatPrompt.json changes
+        self.prompt_registry = prompt_registry.PromptRegistry(
+            PROMPT_PATH, self.config.get("model", translator.DEFAULT_MODEL)
+        )
+        
+        # Executables on PATH - loaded from disk and rescanned by mtime once the window is up,
+        # lookups fall back to shutil.which until then
+        self.tool_index = None
+        if self.config.get("tool_index_enabled", True):
+            self.tool_index = tool_index.ToolIndex(os.path.join(translator.CACHE_DIR, "tools.json.gz"))
+        
+        # GUI-free translation pipeline with its long-lived API client and response cache
+        self.translator = translator.Translator.from_config(self.config, self.prompt_registry, PROMPT_PATH,
+                                                            tool_index=self.tool_index)
+        self.client_manager = self.translator.client_manager
+        self.response_cache = self.translator.response_cache
+        
+        # Previous turns and executed commands, sent as history within a token budget
+        self.conversation = None
+        if self.config.get("conversation_enabled", True):
+            self.conversation = conversation.Conversation(
+                self.config.get("model", translator.DEFAULT_MODEL),
+                budget_tokens=self.config.get("conversation_budget_tokens",
+                                              conversation.Conversation.DEFAULT_BUDGET_TOKENS),
+                summary_tokens=self.config.get("conversation_summary_tokens",
+                                               conversation.Conversation.DEFAULT_SUMMARY_TOKENS)
+            )
+        
+        # One asyncio loop thread runs every API request and command; results come
+        # back through the UI queue, drained in the Tk thread by a single after() pump
+        self.backend_loop = event_loop.BackgroundLoop().start()
+        self.ui_queue = event_loop.UiQueue(self.root, self.UI_PUMP_MS).start()
+        
+        # Retries, hedged requests and the circuit breaker report themselves in the status bar
+        report_status = functools.partial(self.ui_queue.post_latest, "status", self.update_status)
+        self.translator.request_policy.on_event = report_status
+        self.translator.model_router.on_event = report_status
+        
+        # Bounded number of concurrent queries - newer queries supersede older ones
+        self.query_scheduler = query_scheduler.QueryScheduler(
+            self.config.get("max_concurrent_queries", query_scheduler.QueryScheduler.DEFAULT_MAX_WORKERS),
+            loop=self.backend_loop
+        )
+        
+        # Executed commands - concurrency cap, timeouts, resource limits and process group kill
+        self.job_manager = job_manager.JobManager(
+            self.backend_loop,
+            max_concurrent=self.config.get("job_max_concurrent", job_manager.JobManager.DEFAULT_MAX_CONCURRENT),
+            timeout=self.config.get("job_timeout"),
+            cpu_seconds=self.config.get("job_cpu_seconds"),
+            memory_mb=self.config.get("job_memory_mb")
+        )
+        self.jobs_window = None
+        
+        # Command output goes into tabs of one reusable window, capped in number and size
+        self.results_window = results_window.ResultsWindow(
+            self,
+            max_tabs=self.config.get("results_max_tabs", results_window.ResultsWindow.DEFAULT_MAX_TABS),
+            tab_chars=self.config.get("results_tab_max_chars", results_window.ResultsWindow.DEFAULT_TAB_CHARS)
+        )
+        
+        # Answers and executed commands kept across restarts - writes go through the store's own thread,
+        # the database is opened once the window is up and entries added before that wait in its queue
+        self.history_store = None
+        if self.config.get("history_enabled", True):
+            self.history_store = history_store.HistoryStore(self.config.get("history_path") or self.HISTORY_PATH)
+        self.history_window = None
+        self._history_search_after_id = None
+        self._history_generation = 0
+        
+        # Opt-in speculative translation of the query while it is being typed
+        self.prefetcher = None
+        self._prefetch_after_id = None
+        if self.config.get("prefetch_enabled", False):
+            self.prefetcher = prefetcher.Prefetcher(
+                self.backend_loop, self.translator,
+                budget_per_minute=self.config.get("prefetch_budget_per_minute",
+                                                  prefetcher.Prefetcher.DEFAULT_BUDGET_PER_MINUTE)
+            )
+    
+    def _start_background_work(self):
+        """Queue the slow backend setup to run in background threads once the first frame is shown"""
+        self.startup.background("api_import", self._import_api_stack)
+        if self.tool_index is not None:
+            self.startup.background("tool_index", self._load_tool_index)
+        if self.history_store is not None:
+            self.startup.background("history", self._open_history_store)
+        self.startup.background("spill_cleanup", self._remove_stale_spill_files)
+    
+    def _import_api_stack(self):
+        """Import openai off the Tk thread, then build the async client and connect on the event loop"""
+        if self.client_manager.import_api_stack() and self.config.get("api_key", ""):
+            self.startup.track("api_connect", self.backend_loop.submit(self.client_manager.awarm_up()))
+    
+    def _load_tool_index(self):
+        """Read the stored tool index, then rescan PATH"""
+        self.tool_index.load()
+        self.tool_index.refresh_async()
+    
+    def _open_history_store(self):
+        """Open the history database, dropping history if that fails"""
         try:
-            prompt_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                                     "config", "ChatPrompt.json")
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading chat prompts: {e}")
-            return None
+            self.history_store.open()
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARNING] History disabled, cannot open the database: {str(e)}")
+            self.history_store = None
+    
+    def _remove_stale_spill_files(self):
+        """Delete command output files a crashed run left in SPILL_DIR"""
+        spill_file.remove_stale_files(self.SPILL_DIR)
     
     def _configure_root(self):
         """Configure the main application window"""
-        self.root.title(self.prompts.get("window_titles", {}).get("main", "GPT-4 Aplikacja Komendowa"))
+        self.root.title(self.prompt_registry.window_title("main", "GPT-4 Aplikacja Komendowa"))
         self.root.geometry(f"{self.WINDOW_WIDTH}x{self.WINDOW_HEIGHT}")
         self.root.minsize(self.MIN_WIDTH, self.MIN_HEIGHT)
         self.root.configure(bg=self.BG_COLOR)
@@ -73,22 +269,33 @@ class GptAppGUI:
         # Configure grid weights for responsive layout
         self.root.grid_columnconfigure(0, weight=1)
         self.root.grid_rowconfigure(1, weight=1)
+        
+        # Stop the background loop cleanly when the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.shutdown)
     
     def create_widgets(self):
-        """Create and arrange all UI components"""
+        """Create the UI components of the first frame - the rest is built by _create_deferred_widgets"""
         # Create main container frame with grid
         self.main_frame = tk.Frame(self.root, bg=self.BG_COLOR)
         self.main_frame.grid(row=0, column=0, sticky="nsew", padx=self.PAD_X, pady=self.PAD_Y)
         self.main_frame.grid_columnconfigure(0, weight=1)
         
-        # Create sections
+        # Create sections - the user can start typing while the rest is being built
         self._create_header_section()
         self._create_input_section()
         self._create_system_selection()
+        self._create_status_bar()
+    
+    def _create_deferred_widgets(self):
+        """Create the sections not needed before the first query - the metrics panel waits for its button"""
         self._create_response_section()
         self._create_terminal_section()
         self._create_action_buttons()
-        self._create_status_bar()
+        
+        # Periodic JSONL export of the latency metrics, if configured
+        if self.config.get("metrics_export_path"):
+            self.root.after(self.config.get("metrics_export_interval", self.METRICS_EXPORT_INTERVAL) * 1000,
+                            self._export_metrics_periodically)
     
     def _create_header_section(self):
         """Create header with application title"""
@@ -112,7 +319,7 @@ class GptAppGUI:
         
         instruction_label = tk.Label(
             input_frame, 
-            text=self.prompts.get("ui_labels", {}).get("input_instruction", 
+            text=self.prompt_registry.label("input_instruction", 
                 "Wprowadź polecenie (np. 'otwórz przeglądarkę', 'uruchom terminal'):"),
             font=self.MAIN_FONT,
             bg=self.BG_COLOR,
@@ -135,6 +342,8 @@ class GptAppGUI:
         )
         self.input_text.grid(row=0, column=0, sticky="ew")
         self.input_text.bind("<Return>", self.on_send)
+        if self.prefetcher is not None:
+            self.input_text.bind("<KeyRelease>", self._on_input_changed)
         
         send_button = tk.Button(
             input_container, 
@@ -159,7 +368,7 @@ class GptAppGUI:
         
         system_label = tk.Label(
             system_frame, 
-            text=self.prompts.get("ui_labels", {}).get("system_selection", "System operacyjny:"),
+            text=self.prompt_registry.label("system_selection", "System operacyjny:"),
             font=self.MAIN_FONT,
             bg=self.BG_COLOR,
             fg=self.FG_COLOR
@@ -179,7 +388,8 @@ class GptAppGUI:
                 selectcolor=self.INPUT_BG,
                 activebackground=self.BG_COLOR,
                 activeforeground=self.ACCENT_COLOR,
-                cursor="hand2"
+                cursor="hand2",
+                command=self.on_system_changed
             )
             rb.pack(side=tk.LEFT, padx=(0, 15))
     
@@ -192,7 +402,7 @@ class GptAppGUI:
         
         response_label = tk.Label(
             response_frame, 
-            text=self.prompts.get("ui_labels", {}).get("gpt_response", "Odpowiedź GPT-4:"),
+            text=self.prompt_registry.label("gpt_response", "Odpowiedź GPT-4:"),
             font=self.MAIN_FONT,
             bg=self.BG_COLOR,
             fg=self.FG_COLOR
@@ -221,7 +431,7 @@ class GptAppGUI:
         
         terminal_label = tk.Label(
             terminal_frame, 
-            text=self.prompts.get("ui_labels", {}).get("command_to_execute", "Polecenie do wykonania:"),
+            text=self.prompt_registry.label("command_to_execute", "Polecenie do wykonania:"),
             font=self.MAIN_FONT,
             bg=self.BG_COLOR,
             fg=self.FG_COLOR
@@ -240,6 +450,7 @@ class GptAppGUI:
             relief=tk.FLAT
         )
         self.terminal_text.grid(row=1, column=0, sticky="ew")
+        self.terminal_text.bind("<Control-space>", self.cycle_command_candidate)
     
     def _create_action_buttons(self):
         """Create action buttons"""
@@ -248,7 +459,7 @@ class GptAppGUI:
         
         execute_button = tk.Button(
             button_frame, 
-            text=self.prompts.get("ui_labels", {}).get("execute_button", "▶ Wykonaj polecenie"),
+            text=self.prompt_registry.label("execute_button", "▶ Wykonaj polecenie"),
             command=self.execute_command,
             font=self.MAIN_FONT,
             bg=self.ACCENT_COLOR,
@@ -264,7 +475,7 @@ class GptAppGUI:
         
         clear_button = tk.Button(
             button_frame, 
-            text=self.prompts.get("ui_labels", {}).get("clear_button", "🗑 Wyczyść"),
+            text=self.prompt_registry.label("clear_button", "🗑 Wyczyść"),
             command=self.clear_fields,
             font=self.MAIN_FONT,
             bg=self.BUTTON_BG,
@@ -277,6 +488,90 @@ class GptAppGUI:
             bd=1
         )
         clear_button.pack(side=tk.LEFT)
+        
+        metrics_button = tk.Button(
+            button_frame, 
+            text=self.prompt_registry.label("metrics_button", "📊 Metryki"),
+            command=self.toggle_metrics_panel,
+            font=self.MAIN_FONT,
+            bg=self.BUTTON_BG,
+            fg=self.FG_COLOR,
+            activebackground=self.BUTTON_ACTIVE_BG,
+            activeforeground=self.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            width=15,
+            bd=1
+        )
+        metrics_button.pack(side=tk.RIGHT)
+        
+        jobs_button = tk.Button(
+            button_frame, 
+            text=self.prompt_registry.label("jobs_button", "⚙ Zadania"),
+            command=self.open_jobs_window,
+            font=self.MAIN_FONT,
+            bg=self.BUTTON_BG,
+            fg=self.FG_COLOR,
+            activebackground=self.BUTTON_ACTIVE_BG,
+            activeforeground=self.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            width=15,
+            bd=1
+        )
+        jobs_button.pack(side=tk.RIGHT, padx=(0, 10))
+        
+        history_button = tk.Button(
+            button_frame, 
+            text=self.prompt_registry.label("history_button", "🕘 Historia"),
+            command=self.open_history_window,
+            font=self.MAIN_FONT,
+            bg=self.BUTTON_BG,
+            fg=self.FG_COLOR,
+            activebackground=self.BUTTON_ACTIVE_BG,
+            activeforeground=self.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            width=15,
+            bd=1
+        )
+        history_button.pack(side=tk.RIGHT, padx=(0, 10))
+    
+    def _create_metrics_panel(self):
+        """Create the latency metrics panel - built on its first toggle"""
+        self.metrics_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        self.metrics_frame.grid_columnconfigure(0, weight=1)
+        
+        self.metrics_var = tk.StringVar()
+        metrics_label = tk.Label(
+            self.metrics_frame,
+            textvariable=self.metrics_var,
+            font=self.MONO_FONT,
+            bg=self.INPUT_BG,
+            fg=self.FG_COLOR,
+            justify=tk.LEFT,
+            anchor="nw",
+            padx=10,
+            pady=5
+        )
+        metrics_label.grid(row=0, column=0, sticky="ew")
+        
+        controls = tk.Frame(self.metrics_frame, bg=self.BG_COLOR)
+        controls.grid(row=1, column=0, sticky="e", pady=(5, 0))
+        for text, command in (("💾 Eksportuj JSONL", self.export_metrics), ("↺ Wyzeruj", self.reset_metrics)):
+            tk.Button(
+                controls,
+                text=text,
+                command=command,
+                font=self.STATUS_FONT,
+                bg=self.BUTTON_BG,
+                fg=self.FG_COLOR,
+                activebackground=self.BUTTON_ACTIVE_BG,
+                activeforeground=self.FG_COLOR,
+                relief=tk.FLAT,
+                cursor="hand2",
+                bd=1
+            ).pack(side=tk.LEFT, padx=(10, 0))
     
     def _create_status_bar(self):
         """Create the status bar"""
@@ -294,19 +589,71 @@ class GptAppGUI:
             padx=10
         )
         status_bar.grid(row=1, column=0, sticky="ew")
-        self.status_var.set(self.prompts.get("ui_labels", {}).get("status_ready", "Gotowy"))
+        self.status_var.set(self.prompt_registry.label("status_ready", "Gotowy"))
     
     def on_send(self, event=None):
         """Handle sending a query to GPT-4"""
+        # A query sent before the window is complete needs the response and command panes
+        self.startup.flush()
+        
         query = self.input_text.get().strip()
         if not query:
             messagebox.showinfo("Informacja", 
-                              self.prompts.get("error_messages", {}).get("empty_command", 
+                              self.prompt_registry.error_message("empty_command", 
                                                                        "Wprowadź polecenie do przetworzenia"))
             return
         
-        self.status_var.set(self.prompts.get("ui_labels", {}).get("status_sending", 
+        self.status_var.set(self.prompt_registry.label("status_sending", 
                                                                  "Wysyłanie zapytania do GPT-4..."))
         
-        # Run query in a separate thread to avoid blocking the UI
-        threading.Thread(target=self.process_query, args=(query,), daemon=True).start()
\ No newline at end of file
+        # Run query on the background event loop to avoid blocking the UI.
+        # The system is read here, Tk variables must not be touched from the loop thread.
+        selected_system = self.selected_system.get()
+        key = self._query_key(query, selected_system)
+        
+        # Reuse the answer prefetched while typing, finished or still streaming
+        prefetch = self.prefetcher.take(key) if self.prefetcher is not None else None
+        if self.config.get("multi_system_enabled", False):
+            self.query_scheduler.submit(self._query_key(query, translator.SYSTEMS), self.process_query_all_systems,
+                                        query, selected_system, prefetch)
+        elif prefetch is not None:
+            self.query_scheduler.submit(key, self.adopt_prefetch, prefetch, query, selected_system)
+        else:
+            self.query_scheduler.submit(key, self.process_query, query, selected_system)
+    
+    def on_system_changed(self):
+        """Swap the panes to the kept answer for the newly selected system, if there is one"""
+        if self.system_results is None:
+            return
+        # The stream of the previous system must not write into the swapped panes
+        self._active_stream = None
+        self._show_system_result(self.selected_system.get())
+    
+    def _query_key(self, query, selected_system):
+        """Identity of a query - the same text against the same history gives the same answer"""
+        revision = self.conversation.revision if self.conversation is not None else 0
+        return (self.config.get("model", translator.DEFAULT_MODEL), selected_system,
+                " ".join(query.lower().split()), revision)
+    
+    def _on_input_changed(self, event=None):
+        """Restart the prefetch debounce timer on every edit of the query"""
+        if event is not None and event.keysym in ("Return", "KP_Enter"):
+            return
+        if self._prefetch_after_id is not None:
+            self.root.after_cancel(self._prefetch_after_id)
+        self._prefetch_after_id = self.root.after(
+            self.config.get("prefetch_debounce_ms", prefetcher.Prefetcher.DEFAULT_DEBOUNCE_MS),
+            self._prefetch_current_text
+        )
+    
+    def _prefetch_current_text(self):
+        """Translate the text typed so far in the background, dropping the stale prefetch"""
+        self._prefetch_after_id = None
+        query = self.input_text.get().strip()
+        if len(query) < prefetcher.Prefetcher.MIN_QUERY_CHARS or not self.config.get("api_key", ""):
+            self.prefetcher.discard()
+            return
+        
+        selected_system = self.selected_system.get()
+        history = self.conversation.history_messages() if self.conversation is not None else None
+        self.prefetcher.start(self._query_key(query, selected_system), query, selected_system, history)
\ No newline at end of file
@@ -4,92 +4,335 @@ Contains the command processing and result display functionality
 """
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
-import subprocess
+import asyncio
 import threading
+import time
+import codecs
+import locale
 
+import command_parser
+import history_store
+import job_manager
+import output_buffer
+import output_viewer
+import request_policy
+import spill_file
+import translator
 
-def process_query(self, query):
-    """Process a user query in a separate thread"""
+
+async def process_query(self, query, selected_system=None, job=None):
+    """Process a user query on the background event loop
+    
+    job is the QueryJob from the scheduler - results are only shown while it is current.
+    """
     try:
-        # Dynamically import OpenAI for better error handling
-        from openai import OpenAI
-        
-        # Get configuration values
-        api_key = self.config.get("api_key", "")
-        if not api_key:
-            self._handle_missing_api_key()
+        if not self.config.get("api_key", ""):
+            self.ui_queue.post(self._handle_missing_api_key)
             return
         
-        model = self.config.get("model", "gpt-4o-mini")
-        store = self.config.get("store", True)
-        selected_system = self.selected_system.get()
+        if selected_system is None:
+            selected_system = self.selected_system.get()
         
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
+        # Stream the answer token by token unless disabled in config
+        stream_state = self._begin_stream(job) if self.config.get("stream", True) else None
+        result = await self.translator.translate_async(
+            query,
+            selected_system,
+            stream=stream_state is not None,
+            on_delta=(lambda delta: self._queue_stream_delta(stream_state, delta)) if stream_state else None,
+            cancelled=(lambda: job.cancelled) if job is not None else None,
+            history=self.conversation.history_messages() if self.conversation is not None else None
+        )
+        self._show_translation(result, query, selected_system, stream_state, job)
+    
+    except ImportError:
+        self._handle_openai_import_error()
+    except Exception as e:
+        # Failures of superseded queries are of no interest to the user
+        if job is None or job.is_current():
+            self._handle_query_error(e)
+
+async def adopt_prefetch(self, prefetch, query, selected_system, job=None):
+    """Show a translation prefetched while typing - streamed deltas are replayed, the rest follows live"""
+    stream_state = self._begin_stream(job) if self.config.get("stream", True) else None
+    if stream_state is not None:
+        prefetch.attach(lambda delta: self._queue_stream_delta(stream_state, delta))
+    try:
+        result = await asyncio.wrap_future(prefetch.future)
+    except asyncio.CancelledError:
+        prefetch.future.cancel()
+        raise
+    except Exception:
+        # A failed prefetch is retried as a regular query, which reports its own errors
+        result = None
+    
+    if result is None:
+        await self.process_query(query, selected_system, job)
+        return
+    self.translator.remember(result, prefetch.history)
+    try:
+        self._show_translation(result, query, selected_system, stream_state, job)
+    except Exception as e:
+        if job is None or job.is_current():
+            self._handle_query_error(e)
+
+async def process_query_all_systems(self, query, selected_system=None, prefetch=None, job=None):
+    """Translate a query for every system at once - the selected one streams into the panes,
+    the others are kept so switching the system radio button needs no new request
+    """
+    try:
+        if not self.config.get("api_key", ""):
+            self.ui_queue.post(self._handle_missing_api_key)
+            return
+        
+        if selected_system is None:
+            selected_system = self.selected_system.get()
         
-        # Create system message based on selected operating system
-        system_message = self._create_system_message(selected_system)
+        results = {}
+        self.system_results = {"query": query, "results": results, "job": job}
+        stream_state = self._begin_stream(job) if self.config.get("stream", True) else None
+        on_delta = (lambda delta: self._queue_stream_delta(stream_state, delta)) if stream_state else None
+        history = self.conversation.history_messages() if self.conversation is not None else None
         
-        # Send request to API
-        completion = self._send_api_request(client, model, store, system_message, query)
+        async def translate_for(system):
+            primary = system == selected_system
+            result = None
+            if primary and prefetch is not None:
+                if on_delta is not None:
+                    prefetch.attach(on_delta)
+                try:
+                    result = await asyncio.wrap_future(prefetch.future)
+                except asyncio.CancelledError:
+                    prefetch.future.cancel()
+                    raise
+                except Exception:
+                    result = None
+                self.translator.remember(result, prefetch.history)
+            if result is None:
+                result = await self.translator.translate_async(
+                    query,
+                    system,
+                    stream=primary and on_delta is not None,
+                    on_delta=on_delta if primary else None,
+                    cancelled=(lambda: job.cancelled) if job is not None else None,
+                    history=history
+                )
+            if result is None:
+                return
+            results[system] = result
+            
+            streamed = None
+            if primary:
+                if job is None or job.is_current():
+                    self._remember_answer(query, system, result)
+                self.last_ttft = result.ttft
+                if stream_state is not None and not (result.from_cache or result.local or result.escalated):
+                    streamed = stream_state
+                    self._end_stream(stream_state, result, job)
+            self.ui_queue.post(self._show_system_result, system, job, streamed)
         
-        # Process response
-        response = completion.choices[0].message.content
-        self._update_ui_with_response(response, selected_system)
+        async def guarded(system):
+            try:
+                await translate_for(system)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Errors of the selected system are reported now, the others when selected
+                if system == selected_system:
+                    raise
+                results[system] = e
+                self.ui_queue.post(self._show_system_result, system, job)
         
+        await asyncio.gather(*(guarded(system) for system in translator.SYSTEMS))
+    
     except ImportError:
         self._handle_openai_import_error()
     except Exception as e:
-        self._handle_general_error(str(e))
-
-def _send_api_request(self, client, model, store, system_message, query):
-    """Send request to OpenAI API"""
-    return client.chat.completions.create(
-        model=model,
-        store=store,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": query}
-        ]
-    )
+        if job is None or job.is_current():
+            self._handle_query_error(e)
 
-def _create_system_message(self, selected_system):
-    """Create system message based on selected operating system"""
-    if not self.prompts:
-        # Fallback if prompts couldn't be loaded
-        return self._create_fallback_system_message(selected_system)
+def _show_system_result(self, system, job=None, stream_state=None):
+    """Show the kept answer for system if that system is selected (runs in the Tk thread)
     
-    system_messages = self.prompts.get("system_messages", {})
-    base_message = system_messages.get("base", "").format(system=selected_system)
-    system_specific = system_messages.get(selected_system, "")
-    suffix = system_messages.get("suffix", "")
+    stream_state is the stream that fed the answer - while it still owns the panes it shows the answer itself.
+    """
+    if self.system_results is None or self.selected_system.get() != system:
+        return
+    if job is not None and (job is not self.system_results["job"] or not job.is_current()):
+        return
+    if stream_state is not None and stream_state is self._active_stream:
+        return
+    
+    result = self.system_results["results"].get(system)
+    if result is None:
+        self.update_status(f"Oczekiwanie na odpowiedź dla systemu {system}...")
+    elif isinstance(result, Exception):
+        self._handle_query_error(result)
+    else:
+        status = self._response_status(result.response, system, from_cache=result.from_cache, local=result.local)
+        self._apply_response(result.response, status, job)
+
+def _show_translation(self, result, query, selected_system, stream_state=None, job=None):
+    """Remember a finished translation in the conversation and hand it to the panes"""
+    if result is None:
+        return
+    
+    # Superseded answers never reach the panes, so they do not join the conversation or history either
+    if job is None or job.is_current():
+        self._remember_answer(query, selected_system, result)
+    
+    self.last_ttft = result.ttft
+    # An escalated answer replaces the streamed fast one as a whole
+    if stream_state is None or result.from_cache or result.local or result.escalated:
+        self._update_ui_with_response(result.response, selected_system, from_cache=result.from_cache, job=job,
+                                      local=result.local)
+    else:
+        self._end_stream(stream_state, result, job)
+
+def _remember_answer(self, query, selected_system, result):
+    """Add a shown answer to the conversation and queue it for the history database"""
+    if self.conversation is not None:
+        self.conversation.add_turn(query, selected_system, result.response, result.command)
+    if self.history_store is not None and not result.local:
+        self.history_store.add_answer(query, selected_system, result.response, result.command, result.model)
+
+def _begin_stream(self, job=None):
+    """Create the state of a stream that is about to feed the panes"""
+    state = {
+        "job": job,
+        "started": False,
+        "lock": threading.Lock(),
+        "pending": [],
+        "text": "",
+        "parser": command_parser.StreamingParser(),
+        "flush_scheduled": False,
+        "done": False,
+    }
+    self._active_stream = state
+    return state
+
+def _queue_stream_delta(self, state, delta):
+    """Collect a delta in the loop thread - the UI pump picks batches up once per frame"""
+    with state["lock"]:
+        state["pending"].append(delta)
+        if state["flush_scheduled"]:
+            return
+        state["flush_scheduled"] = True
+    self.ui_queue.post(self._flush_stream, state)
+
+def _end_stream(self, state, result, job=None):
+    """Flush the tail of a finished stream and report its timings"""
+    # Final flush picks up the tail and fills the command line for one-line answers
+    with state["lock"]:
+        state["done"] = True
+    self.ui_queue.post(self._flush_stream, state)
     
-    return f"{base_message} {system_specific} {suffix}"
+    status_message = self.prompt_registry.label("status_ready", "Gotowy")
+    self.ui_queue.post_latest("status", self._update_stream_status, state,
+                              f"{status_message} - Otrzymano odpowiedź dla systemu {result.system} "
+                              f"(pierwszy token: {result.ttft:.2f} s, całość: {result.elapsed:.2f} s)"
+                              f"{self._missing_tools_note(result.command, result.system)}"
+                              f"{self._alternatives_note(result.commands)}", job)
 
-def _create_fallback_system_message(self, selected_system):
-    """Create fallback system message if prompts are not available"""
-    base_message = f"Jesteś asystentem, który pomaga tłumaczyć polecenia użytkownika na komendy terminala systemu {selected_system}. "
+def _update_stream_status(self, state, text, job=None):
+    """Report a finished stream unless the panes were handed to another answer meanwhile"""
+    if state is self._active_stream:
+        self._update_status_for_job(text, job)
+
+def _flush_stream(self, state):
+    """Append all deltas collected since the last frame (runs in the Tk thread)"""
+    with state["lock"]:
+        batch = "".join(state["pending"])
+        state["pending"] = []
+        state["flush_scheduled"] = False
+        done = state["done"]
+    
+    # A newer query took over the panes - drop what is left of this one
+    job = state["job"]
+    if state is not self._active_stream or (job is not None and not job.is_current()):
+        return
     
-    if selected_system == "Linux":
-        base_message += "Odpowiadaj komendami dla systemu Linux, używając bash."
-    elif selected_system == "Windows":
-        base_message += "Odpowiadaj komendami dla systemu Windows, używając CMD lub PowerShell."
-    elif selected_system == "MacOS":
-        base_message += "Odpowiadaj komendami dla systemu MacOS, używając terminala bash/zsh."
+    started = time.perf_counter()
     
-    base_message += " Odpowiadaj tylko komendą, bez żadnych dodatkowych wyjaśnień."
-    return base_message
+    # Clear the panes only when the first batch arrives, so a stale query never wipes them
+    if not state["started"]:
+        state["started"] = True
+        self.update_response("")
+        self.terminal_text.delete(1.0, tk.END)
+    
+    if batch:
+        state["text"] += batch
+        self.response_text.config(state=tk.NORMAL)
+        self.response_text.insert(tk.END, batch)
+        self.response_text.see(tk.END)
+        self.response_text.config(state=tk.DISABLED)
+    
+    # Show the command as soon as the parser trusts it - a longer script may still replace the first line
+    parser = state["parser"]
+    changed = parser.feed(batch) if batch else False
+    if done:
+        changed = parser.finish() or changed
+    if changed:
+        self._show_command_candidates(parser.result)
+    elif done and parser.result is not None:
+        # Same command, but the rest of the answer may have added alternatives
+        self.command_candidates = parser.result.commands
+    self.metrics.record("ui_update", time.perf_counter() - started)
+
+def _create_system_message(self, selected_system):
+    """Create system message based on selected operating system"""
+    return self.translator.create_system_message(selected_system)
 
-def _update_ui_with_response(self, response, selected_system):
+def _update_ui_with_response(self, response, selected_system, from_cache=False, job=None, local=False):
     """Update UI elements with API response"""
-    self.root.after(0, self.update_response, response)
-    self.root.after(0, self.update_terminal, response)
-    status_message = self.prompts.get("ui_labels", {}).get("status_ready", "Gotowy")
-    self.root.after(0, self.update_status, f"{status_message} - Otrzymano odpowiedź dla systemu {selected_system}")
+    status = self._response_status(response, selected_system, from_cache=from_cache, local=local)
+    self.ui_queue.post_latest("response", self._apply_response, response, status, job)
+
+def _response_status(self, response, selected_system, from_cache=False, local=False):
+    """Status bar text for a complete response"""
+    status_message = self.prompt_registry.label("status_ready", "Gotowy")
+    if local:
+        status = f"{status_message} - Odpowiedź z lokalnego indeksu narzędzi"
+    elif from_cache:
+        status = f"{status_message} - Odpowiedź z pamięci podręcznej dla systemu {selected_system}"
+    else:
+        status = f"{status_message} - Otrzymano odpowiedź dla systemu {selected_system}"
+    parsed = command_parser.parse_response(response)
+    return status + self._missing_tools_note(parsed.command, selected_system) + self._alternatives_note(parsed.commands)
+
+def _alternatives_note(self, commands):
+    """Return a status suffix saying how many other candidate commands the answer holds"""
+    if len(commands) < 2:
+        return ""
+    return f" - alternatywne komendy: {len(commands) - 1} (Ctrl+Spacja)"
+
+def _missing_tools_note(self, command, selected_system):
+    """Return a status suffix naming programs of the command that are not installed"""
+    if self.tool_index is None:
+        return ""
+    missing = self.tool_index.missing_binaries(command, selected_system)
+    if not missing:
+        return ""
+    return f" - uwaga: brak programu {', '.join(missing)}"
+
+def _apply_response(self, response, status, job=None):
+    """Show a complete response unless a newer query superseded it (runs in the Tk thread)"""
+    if job is not None and not job.is_current():
+        return
+    with self.metrics.timer("ui_update"):
+        self._active_stream = None
+        self.update_response(response)
+        self.update_terminal(response)
+        self.update_status(status)
+
+def _update_status_for_job(self, text, job=None):
+    """Update status bar unless the job was superseded"""
+    if job is None or job.is_current():
+        self.update_status(text)
 
 def _handle_missing_api_key(self):
     """Handle missing API key error"""
-    self.update_status(self.prompts.get("ui_labels", {}).get("status_error", "Błąd: Brak klucza API"))
+    self.update_status(self.prompt_registry.label("status_error", "Błąd: Brak klucza API"))
     
     error_window = tk.Toplevel(self.root)
     error_window.title("Błąd konfiguracji")
@@ -113,7 +356,7 @@ def _handle_missing_api_key(self):
     # Add error message
     message_label = tk.Label(
         error_window,
-        text=self.prompts.get("error_messages", {}).get("missing_api_key", 
+        text=self.prompt_registry.error_message("missing_api_key", 
             "Brak klucza API w pliku konfiguracyjnym."),
         font=self.MAIN_FONT,
         bg=self.BG_COLOR,
@@ -140,18 +383,30 @@ def _handle_missing_api_key(self):
 
 def _handle_openai_import_error(self):
     """Handle OpenAI import error"""
-    self.root.after(0, self.update_status, "Błąd: Biblioteka OpenAI nie jest zainstalowana")
-    self.root.after(0, lambda: messagebox.showerror(
+    self.ui_queue.post_latest("status", self.update_status, "Błąd: Biblioteka OpenAI nie jest zainstalowana")
+    self.ui_queue.post(lambda: messagebox.showerror(
         "Błąd", 
-        self.prompts.get("error_messages", {}).get("openai_not_installed", 
+        self.prompt_registry.error_message("openai_not_installed", 
             "Biblioteka OpenAI nie jest zainstalowana. Uruchom aplikację ponownie z opcją --setup")
     ))
 
+def _handle_query_error(self, error):
+    """Report a failed query - the API being unavailable goes to the status bar, anything else to an error box"""
+    if isinstance(error, (request_policy.CircuitOpenError, request_policy.DeadlineExceededError)):
+        self.ui_queue.post_latest("status", self.update_status, f"Błąd: {error}")
+    elif request_policy.RequestPolicy.is_retryable(error):
+        status = getattr(error, "status_code", None)
+        reason = f"HTTP {status}" if status is not None else type(error).__name__
+        self.ui_queue.post_latest("status", self.update_status,
+                                  f"Błąd: serwer API nie odpowiada ({reason}) mimo ponowień - spróbuj ponownie za chwilę")
+    else:
+        self._handle_general_error(str(error))
+
 def _handle_general_error(self, error_message):
     """Handle general errors"""
-    status_error = self.prompts.get("ui_labels", {}).get("status_error", "Błąd podczas przetwarzania zapytania")
-    self.root.after(0, self.update_status, status_error)
-    self.root.after(0, lambda: messagebox.showerror("Błąd", f"Wystąpił błąd: {error_message}"))
+    status_error = self.prompt_registry.label("status_error", "Błąd podczas przetwarzania zapytania")
+    self.ui_queue.post_latest("status", self.update_status, status_error)
+    self.ui_queue.post(lambda: messagebox.showerror("Błąd", f"Wystąpił błąd: {error_message}"))
 
 def update_response(self, text):
     """Update response text area"""
@@ -161,10 +416,25 @@ def update_response(self, text):
     self.response_text.config(state=tk.DISABLED)
 
 def update_terminal(self, text):
-    """Update terminal command field"""
+    """Update terminal command field with the best command of an answer"""
+    self._show_command_candidates(command_parser.parse_response(text))
+
+def _show_command_candidates(self, parsed):
+    """Put the best candidate into the command field and keep the others for cycling"""
+    self.command_candidates = parsed.commands
+    self._candidate_index = 0
     self.terminal_text.delete(1.0, tk.END)  # Changed from 0 to 1.0 for ScrolledText
-    command = text.strip().split('\n')[0]
-    self.terminal_text.insert(tk.END, command)
+    self.terminal_text.insert(tk.END, parsed.command)
+
+def cycle_command_candidate(self, event=None):
+    """Replace the command with the next candidate of the answer (Ctrl+Space)"""
+    if len(self.command_candidates) < 2:
+        return "break"
+    self._candidate_index = (self._candidate_index + 1) % len(self.command_candidates)
+    self.terminal_text.delete(1.0, tk.END)
+    self.terminal_text.insert(tk.END, self.command_candidates[self._candidate_index])
+    self.update_status(f"Komenda {self._candidate_index + 1} z {len(self.command_candidates)}")
+    return "break"
 
 def update_status(self, text):
     """Update status bar"""
@@ -176,175 +446,577 @@ def execute_command(self):
     if not command:
         messagebox.showinfo(
             "Informacja", 
-            self.prompts.get("error_messages", {}).get("empty_command", "Wprowadź polecenie do wykonania")
+            self.prompt_registry.error_message("empty_command", "Wprowadź polecenie do wykonania")
         )
         return
     
-    try:
-        status_executing = self.prompts.get("ui_labels", {}).get("status_executing", "Wykonywanie: {command}")
-        self.status_var.set(status_executing.format(command=command))
-        
-        # Execute command in background
-        process = subprocess.Popen(
-            command, 
-            shell=True, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True
+    # A missing program would only fail - ask before running it
+    if self.tool_index is not None:
+        missing = self.tool_index.missing_binaries(command, self.selected_system.get())
+        if missing and not messagebox.askyesno(
+            "Brak programu",
+            f"Nie znaleziono w systemie: {', '.join(missing)}.\nCzy mimo to wykonać polecenie?"
+        ):
+            return
+    
+    status_executing = self.prompt_registry.label("status_executing", "Wykonywanie: {command}")
+    self.status_var.set(status_executing.format(command=command))
+    
+    # Run the command on the background event loop - no thread per command.
+    # The job manager caps concurrent commands, so it may wait for a free slot.
+    job = self.job_manager.create(command)
+    self.backend_loop.submit(self.monitor_command(command, job, self.selected_system.get()))
+
+def _handle_command_start_error(self, error_message):
+    """Report a command that could not be started (runs in the Tk thread)"""
+    status_error = self.prompt_registry.label("status_error", "Błąd podczas wykonywania polecenia")
+    self.status_var.set(status_error)
+    messagebox.showerror("Błąd", f"Nie udało się wykonać polecenia: {error_message}")
+
+async def monitor_command(self, command, job, selected_system=None):
+    """Run a command job on the event loop, streaming its output as it arrives"""
+    # The complete output goes to disk up to output_spill_limit_mb, 0 - no cap
+    spill_limit_mb = self.config.get("output_spill_limit_mb")
+    spill_max_bytes = (int(spill_limit_mb * 1024 * 1024) if spill_limit_mb is not None
+                       else spill_file.SpillFile.DEFAULT_MAX_BYTES)
+    run = {
+        "command": command,
+        "job": job,
+        "buffer": output_buffer.OutputRingBuffer(
+            self.config.get("output_limit_chars", output_buffer.OutputRingBuffer.DEFAULT_LIMIT)
+        ),
+        "spill": spill_file.SpillFile(self.SPILL_DIR, max_bytes=spill_max_bytes),
+        "tab": None,
+        "flush_scheduled": False,
+        "done": False,
+        "finished": False,
+        "exit_code": None,
+    }
+    
+    async def consume(process):
+        # Pipes are binary and decoded while reading
+        await asyncio.gather(
+            self._read_command_pipe(process.stdout, run),
+            self._read_command_pipe(process.stderr, run)
         )
-        
-        # Start thread to monitor command execution
-        threading.Thread(
-            target=self.monitor_command, 
-            args=(process, command), 
-            daemon=True
-        ).start()
-        
+    
+    try:
+        run["exit_code"] = await self.job_manager.run(job, consume)
     except Exception as e:
-        status_error = self.prompts.get("ui_labels", {}).get("status_error", "Błąd podczas wykonywania polecenia")
-        self.status_var.set(status_error)
-        messagebox.showerror("Błąd", f"Nie udało się wykonać polecenia: {str(e)}")
-
-def monitor_command(self, process, command):
-    """Monitor command execution in a separate thread"""
-    stdout, stderr = process.communicate()
-    exit_code = process.returncode
-    
-    # Update UI in main thread
-    if exit_code == 0:
-        self.root.after(0, self.command_success, stdout)
+        run["spill"].release()
+        self.ui_queue.post(self._handle_command_start_error, str(e))
+        return
+    if job.started is None:
+        # Stopped while waiting for a free slot
+        run["spill"].release()
+        self.ui_queue.post_latest("status", self.update_status, f"Anulowano polecenie: {command}")
+        return
+    self.metrics.record("command_run", job.elapsed())
+    if self.conversation is not None:
+        self.conversation.record_execution(command, run["exit_code"], run["buffer"].getvalue())
+    if self.history_store is not None:
+        self.history_store.add_execution(command, selected_system, run["exit_code"], run["buffer"].getvalue())
+    run["done"] = True
+    self.ui_queue.post(self._pump_command_output, run)
+
+async def _read_command_pipe(self, pipe, run):
+    """Read a pipe chunk by chunk until the command closes it
+    
+    The ring buffer keeps the tail for the live window, the spill file keeps
+    everything for the large output viewer.
+    """
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+    while True:
+        chunk = await pipe.read(self.OUTPUT_CHUNK_SIZE)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        run["buffer"].append(text)
+        run["spill"].append(text)
+        self._schedule_command_flush(run)
+    text = decoder.decode(b"", final=True)
+    run["buffer"].append(text)
+    run["spill"].append(text)
+
+def _schedule_command_flush(self, run):
+    """Post the output pump once per OUTPUT_FLUSH_MS while output keeps arriving (loop thread)"""
+    if run["flush_scheduled"]:
+        return
+    run["flush_scheduled"] = True
+    self.backend_loop.call_later(self.OUTPUT_FLUSH_MS / 1000, self.ui_queue.post, self._pump_command_output, run)
+
+def _pump_command_output(self, run):
+    """Move newly produced output into the output window (runs in the Tk thread)"""
+    if run["finished"]:
+        return
+    # Clear the flag before taking output, so output appended meanwhile schedules another pump.
+    # Read done first so output appended before the command ended is not lost.
+    run["flush_scheduled"] = False
+    done = run["done"]
+    text, reset = run["buffer"].take_update()
+    
+    if text or reset:
+        if run["tab"] is None:
+            self._open_command_output_tab(run)
+        self._append_command_output(run, text, reset)
+    
+    if not done:
+        return
+    
+    # The tabs and viewers showing this output keep their own reference to the spill file
+    run["finished"] = True
+    run["spill"].release()
+    # A command stopped or timed out may still exit with 0 - the job state tells what happened
+    if run["job"].state == job_manager.CommandJob.DONE:
+        self.command_success(run)
     else:
-        self.root.after(0, self.command_error, stderr)
+        self.command_error(run)
+
+def _open_command_output_tab(self, run):
+    """Open the live output tab of a running command in the shared results window"""
+    tab = self.results_window.open_tab(f"#{run['job'].id} {run['command']}")
+    run["tab"] = tab
+    
+    # Copy the complete output from the spill file, not just the visible tail
+    spill = run["spill"].retain()
+    tab.copy_button.config(command=lambda: self._copy_file_to_clipboard(spill))
+    tab.on_close(spill.release)
+
+def _open_large_output_viewer(self, title, spill, error=False):
+    """Show output stored in a spill file in the virtualized viewer"""
+    viewer = output_viewer.LargeOutputViewer(self, spill, title, error=error)
+    viewer.window.focus_set()
+    return viewer
 
-def command_success(self, output):
+def _append_command_output(self, run, text, reset):
+    """Append output to the command's tab, keeping it within the buffer and tab limits"""
+    tab = run["tab"]
+    if tab.closed:
+        return
+    output_text = tab.output_text
+    buffer = run["buffer"]
+    limit = min(buffer.limit, self.results_window.tab_chars)
+    output_text.config(state=tk.NORMAL)
+    
+    content_start = "1.0"
+    if reset:
+        output_text.delete(1.0, tk.END)
+        tab.shown_chars = 0
+    if len(text) > limit:
+        text = text[-limit:]
+    output_text.insert(tk.END, text)
+    tab.shown_chars += len(text)
+    
+    # Drop the oldest shown output, then mark on the first line how much is not shown
+    hidden = buffer.total_written - min(tab.shown_chars, limit)
+    if hidden > 0:
+        marker = f"[... obcięto początek danych wyjściowych: {hidden} znaków ...]\n"
+        if output_text.tag_ranges("truncated"):
+            output_text.delete("truncated.first", "truncated.last")
+        output_text.insert(1.0, marker, "truncated")
+        output_text.tag_config("truncated", foreground="#ffaa44")
+        content_start = "2.0"
+    excess = tab.shown_chars - limit
+    if excess > 0:
+        output_text.delete(content_start, f"{content_start} + {excess} chars")
+        tab.shown_chars -= excess
+    
+    # Only the tail fits in the tab - offer the full output from the spill file
+    if hidden > 0 and tab.full_output_button is None:
+        title = self.prompt_registry.window_title("full_output", "Pełne wyjście polecenia")
+        spill = run["spill"]
+        tab.full_output_button = self.results_window.make_button(
+            tab.button_frame, "📄 Pełne wyjście", lambda: self._open_large_output_viewer(title, spill)
+        )
+        tab.full_output_button.pack(side=tk.RIGHT, padx=(0, 10))
+    
+    output_text.see(tk.END)
+    output_text.config(state=tk.DISABLED)
+
+def command_success(self, run):
     """Handle successful command execution"""
-    status_success = self.prompts.get("ui_labels", {}).get("status_success", "Polecenie wykonane pomyślnie")
+    status_success = self.prompt_registry.label("status_success", "Polecenie wykonane pomyślnie")
     self.status_var.set(status_success)
     
-    # Display result in enlarged dialog
-    if output.strip():
-        self._show_result_window(
-            self.prompts.get("window_titles", {}).get("result", "Wynik polecenia"),
-            output
-        )
+    # Output was already streamed into the command's tab
+    tab = run["tab"]
+    if tab is not None and not tab.closed:
+        tab.finish()
+        tab.select()
 
-def command_error(self, error):
+def command_error(self, run):
     """Handle command execution error"""
-    status_error = self.prompts.get("ui_labels", {}).get("status_error", "Błąd podczas wykonywania polecenia")
+    status_error = self.prompt_registry.label("status_error", "Błąd podczas wykonywania polecenia")
     self.status_var.set(status_error)
-    self._show_error_window(
-        self.prompts.get("window_titles", {}).get("error", "Błąd polecenia"),
-        error
-    )
+    title = self.prompt_registry.window_title("error", "Błąd polecenia")
+    footer = f"\n[kod wyjścia: {run['exit_code']}]"
+    job = run["job"]
+    if job.state == job_manager.CommandJob.TIMEOUT:
+        footer += f"\n[przekroczono limit czasu: {job.timeout:g} s]"
+    elif job.state == job_manager.CommandJob.KILLED:
+        footer += "\n[zatrzymano przez użytkownika]"
+    
+    tab = run["tab"]
+    if tab is None or tab.closed:
+        self._show_error_window(f"{title}: {run['command']}", run["buffer"].getvalue() + footer)
+        return
+    
+    tab.output_text.config(state=tk.NORMAL)
+    tab.output_text.insert(tk.END, footer)
+    tab.output_text.see(tk.END)
+    tab.output_text.config(state=tk.DISABLED)
+    tab.finish(error=True)
+    tab.select()
 
 def _show_result_window(self, title, content):
-    """Show a customized result window"""
-    result_window = self._create_output_window(title, content)
-    result_window.focus_set()
+    """Show a result in a new tab of the results window"""
+    self._show_output_tab(title, content)
 
 def _show_error_window(self, title, content):
-    """Show a customized error window"""
-    error_window = self._create_output_window(title, content, error=True)
-    error_window.focus_set()
-
-def _create_output_window(self, title, content, error=False):
-    """Create a customized output window"""
-    output_window = tk.Toplevel(self.root)
-    output_window.title(title)
-    output_window.geometry("800x500")
-    output_window.configure(bg=self.BG_COLOR)
-    output_window.minsize(600, 400)
+    """Show an error in a new tab of the results window"""
+    self._show_output_tab(title, content, error=True)
+
+def _show_output_tab(self, title, content, error=False):
+    """Show finished content in its own tab - huge content goes to the large output viewer"""
+    threshold = self.config.get("large_output_threshold_chars", self.LARGE_OUTPUT_THRESHOLD)
+    if len(content) > min(threshold, self.results_window.tab_chars):
+        spill = spill_file.SpillFile.from_text(content, self.SPILL_DIR)
+        self._open_large_output_viewer(title, spill, error=error)
+        spill.release()
+        return
+    tab = self.results_window.open_tab(title, content)
+    tab.finish(error=error)
+    tab.select()
+
+def _copy_to_clipboard(self, text):
+    """Copy text to clipboard"""
+    self.root.clipboard_clear()
+    self.root.clipboard_append(text)
+    self.root.update()
+
+def _copy_file_to_clipboard(self, spill):
+    """Copy the content of a spill file to the clipboard chunk by chunk"""
+    self.root.clipboard_clear()
+    for chunk in spill.iter_chunks():
+        self.root.clipboard_append(chunk)
+    self.root.update()
+
+def toggle_metrics_panel(self):
+    """Show or hide the latency metrics panel"""
+    self.metrics_visible = not self.metrics_visible
+    if self.metrics_frame is None:
+        self._create_metrics_panel()
+    if self.metrics_visible:
+        self.metrics_frame.grid(row=6, column=0, sticky="ew", pady=(0, self.PAD_Y))
+        self._refresh_metrics_panel()
+    else:
+        self.metrics_frame.grid_remove()
+
+def _refresh_metrics_panel(self):
+    """Redraw the metrics table while the panel is visible"""
+    if not self.metrics_visible:
+        return
+    self.metrics_var.set(self._metrics_text())
+    self.root.after(self.METRICS_REFRESH_MS, self._refresh_metrics_panel)
+
+def _metrics_text(self):
+    """Stage histograms followed by the retry, circuit breaker, model routing and startup counters"""
+    text = f"{self.metrics.format_table()}\n{self.translator.request_policy.format_summary()}"
+    routing = self.translator.model_router.format_summary()
+    if routing:
+        text = f"{text}\n{routing}"
+    return f"{text}\n{self.startup.trace.format_summary()}"
+
+def export_metrics(self):
+    """Append the current metrics to the JSONL file"""
+    path = self.config.get("metrics_export_path") or self.METRICS_EXPORT_PATH
+    try:
+        count = self.metrics.export_jsonl(path)
+        self.update_status(f"Zapisano metryki ({count} etapów) do {path}")
+    except OSError as e:
+        self.update_status(f"Nie udało się zapisać metryk: {str(e)}")
+
+def _export_metrics_periodically(self):
+    """Export metrics to the configured file and schedule the next export"""
+    try:
+        self.metrics.export_jsonl(self.config["metrics_export_path"])
+    except OSError as e:
+        print(f"[WARNING] Failed to export metrics: {str(e)}")
+    self.root.after(self.config.get("metrics_export_interval", self.METRICS_EXPORT_INTERVAL) * 1000,
+                    self._export_metrics_periodically)
+
+def _watch_config(self):
+    """Check config.json for changes, subscribers are notified in this thread"""
+    self.config_service.maybe_reload()
+    self.root.after(self.CONFIG_CHECK_MS, self._watch_config)
+
+def _on_config_changed(self, config):
+    """Use a changed config.json - settings read per query apply from the next one"""
+    self.config = config
+    self.metrics.enabled = config.get("metrics_enabled", True)
+    if self.conversation is not None:
+        self.conversation.model = config.get("model", translator.DEFAULT_MODEL)
+    self.update_status(f"Wczytano zmienioną konfigurację: {', '.join(self.config_service.last_changed)}")
+
+def reset_metrics(self):
+    """Drop all collected samples"""
+    self.metrics.reset()
+    self.metrics_var.set(self._metrics_text())
+
+def open_jobs_window(self):
+    """Show the window listing running and finished commands"""
+    if self.jobs_window is not None and self.jobs_window.winfo_exists():
+        self.jobs_window.lift()
+        return
     
-    # Configure grid
-    output_window.grid_columnconfigure(0, weight=1)
-    output_window.grid_rowconfigure(1, weight=1)
-    
-    # Add title label
-    title_label = tk.Label(
-        output_window,
-        text=title,
-        font=self.HEADER_FONT,
-        bg=self.BG_COLOR,
-        fg=self.ACCENT_COLOR
-    )
-    title_label.grid(row=0, column=0, sticky="w", padx=self.PAD_X, pady=(self.PAD_Y, self.PAD_Y//2))
-    
-    # Create container frame for content
-    content_frame = tk.Frame(output_window, bg=self.BG_COLOR)
-    content_frame.grid(row=1, column=0, sticky="nsew", padx=self.PAD_X, pady=(0, self.PAD_Y))
-    content_frame.grid_columnconfigure(0, weight=1)
-    content_frame.grid_rowconfigure(0, weight=1)
-    
-    # Add text area with scrollbar
-    bg_color = "#3c2c2c" if error else self.INPUT_BG
-    output_text = scrolledtext.ScrolledText(
-        content_frame,
-        wrap=tk.WORD,
+    window = tk.Toplevel(self.root)
+    window.title(self.prompt_registry.window_title("jobs", "Zadania"))
+    window.geometry("760x320")
+    window.configure(bg=self.BG_COLOR)
+    window.grid_columnconfigure(0, weight=1)
+    window.grid_rowconfigure(0, weight=1)
+    
+    window.job_list = tk.Listbox(
+        window,
         font=self.MONO_FONT,
-        bg=bg_color,
-        fg=self.FG_COLOR,
-        insertbackground=self.FG_COLOR,
-        bd=1,
-        relief=tk.FLAT
+        bg=self.INPUT_BG,
+        fg=self.INPUT_FG,
+        selectbackground=self.ACCENT_COLOR,
+        activestyle="none",
+        relief=tk.FLAT,
+        bd=1
     )
-    output_text.grid(row=0, column=0, sticky="nsew")
+    window.job_list.grid(row=0, column=0, sticky="nsew", padx=10, pady=(10, 5))
+    window.job_ids = []
     
-    # Add content
-    output_text.insert(tk.END, content)
-    output_text.config(state=tk.DISABLED)
+    controls = tk.Frame(window, bg=self.BG_COLOR)
+    controls.grid(row=1, column=0, sticky="e", padx=10, pady=(0, 10))
+    for text, force in (("⏹ Zatrzymaj", False), ("✖ Zabij", True)):
+        tk.Button(
+            controls,
+            text=text,
+            command=lambda force=force: self.stop_selected_job(force),
+            font=self.STATUS_FONT,
+            bg=self.BUTTON_BG,
+            fg=self.FG_COLOR,
+            activebackground=self.BUTTON_ACTIVE_BG,
+            activeforeground=self.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            bd=1
+        ).pack(side=tk.LEFT, padx=(10, 0))
+    
+    self.jobs_window = window
+    self._refresh_jobs_window()
+
+def _refresh_jobs_window(self):
+    """Redraw the job list while the window is open, keeping the selected job selected"""
+    window = self.jobs_window
+    if window is None or not window.winfo_exists():
+        self.jobs_window = None
+        return
     
-    # Add button frame
-    button_frame = tk.Frame(output_window, bg=self.BG_COLOR)
-    button_frame.grid(row=2, column=0, sticky="ew", padx=self.PAD_X, pady=(0, self.PAD_Y))
+    selection = window.job_list.curselection()
+    selected_id = window.job_ids[selection[0]] if selection else None
     
-    # Add close button
-    close_button = tk.Button(
-        button_frame,
-        text=self.prompts.get("ui_labels", {}).get("close_button", "✖ Zamknij"),
-        command=output_window.destroy,
+    jobs = self.job_manager.jobs()
+    window.job_list.delete(0, tk.END)
+    window.job_ids = [job.id for job in jobs]
+    for job in jobs:
+        pid = job.pid if job.pid is not None else "-"
+        state = self.JOB_STATE_LABELS.get(job.state, job.state)
+        if job.exit_code is not None and not job.active:
+            state += f" ({job.exit_code})"
+        window.job_list.insert(tk.END, f"#{job.id:<4} {state:<22} PID {pid:<8} {job.elapsed():8.1f} s  {job.command}")
+    if selected_id in window.job_ids:
+        window.job_list.selection_set(window.job_ids.index(selected_id))
+    
+    self.root.after(self.JOBS_REFRESH_MS, self._refresh_jobs_window)
+
+def stop_selected_job(self, force=False):
+    """Stop the job selected in the jobs window - SIGTERM, or SIGKILL if force"""
+    window = self.jobs_window
+    if window is None or not window.winfo_exists():
+        return
+    selection = window.job_list.curselection()
+    if not selection:
+        return
+    job_id = window.job_ids[selection[0]]
+    if self.job_manager.stop(job_id, force):
+        self.update_status(f"{'Zabijanie' if force else 'Zatrzymywanie'} zadania #{job_id}")
+
+def open_history_window(self):
+    """Show the searchable history of answers and executed commands"""
+    if self.history_store is None:
+        self.update_status("Historia jest wyłączona")
+        return
+    if self.history_window is not None and self.history_window.winfo_exists():
+        self.history_window.lift()
+        return
+    
+    window = tk.Toplevel(self.root)
+    window.title(self.prompt_registry.window_title("history", "Historia"))
+    window.geometry("820x420")
+    window.configure(bg=self.BG_COLOR)
+    window.grid_columnconfigure(0, weight=1)
+    window.grid_rowconfigure(1, weight=1)
+    
+    window.search_entry = tk.Entry(
+        window,
         font=self.MAIN_FONT,
-        bg=self.BUTTON_BG,
-        fg=self.FG_COLOR,
-        activebackground=self.BUTTON_ACTIVE_BG,
-        activeforeground=self.FG_COLOR,
+        bg=self.INPUT_BG,
+        fg=self.INPUT_FG,
+        insertbackground=self.INPUT_FG,
         relief=tk.FLAT,
-        cursor="hand2",
-        width=15,
         bd=1
     )
-    close_button.pack(side=tk.RIGHT)
+    window.search_entry.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 5))
+    window.search_entry.bind("<KeyRelease>", self._on_history_search_changed)
     
-    # Add copy button
-    copy_button = tk.Button(
-        button_frame,
-        text="📋 Kopiuj",
-        command=lambda: self._copy_to_clipboard(output_text.get(1.0, tk.END)),
-        font=self.MAIN_FONT,
-        bg=self.ACCENT_COLOR,
-        fg=self.FG_COLOR,
-        activebackground=self.BUTTON_ACTIVE_BG,
-        activeforeground=self.FG_COLOR,
+    window.entry_list = tk.Listbox(
+        window,
+        font=self.MONO_FONT,
+        bg=self.INPUT_BG,
+        fg=self.INPUT_FG,
+        selectbackground=self.ACCENT_COLOR,
+        activestyle="none",
         relief=tk.FLAT,
-        cursor="hand2",
-        width=15,
         bd=1
     )
-    copy_button.pack(side=tk.RIGHT, padx=(0, 10))
+    window.entry_list.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
+    window.entry_list.bind("<Double-Button-1>", lambda event: self.restore_history_entry())
+    window.entry_list.bind("<Return>", lambda event: self.restore_history_entry())
+    window.entry_ids = []
     
-    return output_window
+    controls = tk.Frame(window, bg=self.BG_COLOR)
+    controls.grid(row=2, column=0, sticky="e", padx=10, pady=(0, 10))
+    for text, run in (("↩ Wstaw", False), ("▶ Wykonaj ponownie", True)):
+        tk.Button(
+            controls,
+            text=text,
+            command=lambda run=run: self.restore_history_entry(run=run),
+            font=self.STATUS_FONT,
+            bg=self.BUTTON_BG,
+            fg=self.FG_COLOR,
+            activebackground=self.BUTTON_ACTIVE_BG,
+            activeforeground=self.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            bd=1
+        ).pack(side=tk.LEFT, padx=(10, 0))
+    
+    self.history_window = window
+    window.search_entry.focus_set()
+    self.search_history("")
 
-def _copy_to_clipboard(self, text):
-    """Copy text to clipboard"""
-    self.root.clipboard_clear()
-    self.root.clipboard_append(text)
-    self.root.update()
+def _on_history_search_changed(self, event=None):
+    """Search again once typing pauses"""
+    if self._history_search_after_id is not None:
+        self.root.after_cancel(self._history_search_after_id)
+    self._history_search_after_id = self.root.after(
+        self.HISTORY_SEARCH_MS, lambda: self.search_history(self.history_window.search_entry.get())
+    )
+
+def search_history(self, text):
+    """Run a history search off the Tk thread - only the newest search is shown"""
+    self._history_search_after_id = None
+    self._history_generation += 1
+    self.backend_loop.submit(self._search_history(text, self._history_generation))
+
+async def _search_history(self, text, generation):
+    try:
+        entries = await asyncio.to_thread(self.history_store.search, text)
+    except Exception as e:
+        self.ui_queue.post_latest("status", self.update_status, f"Błąd wyszukiwania w historii: {str(e)}")
+        return
+    self.ui_queue.post_latest("history", self._show_history_results, entries, generation)
+
+def _show_history_results(self, entries, generation):
+    """Fill the history list (runs in the Tk thread)"""
+    window = self.history_window
+    if generation != self._history_generation or window is None or not window.winfo_exists():
+        return
+    window.entry_list.delete(0, tk.END)
+    window.entry_ids = [entry.id for entry in entries]
+    for entry in entries:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.created))
+        if entry.kind == history_store.HistoryEntry.EXECUTION:
+            text = f"▶ [{entry.exit_code if entry.exit_code is not None else '-'}] {entry.command}"
+        else:
+            text = f"? {entry.query}  →  {entry.command}"
+        window.entry_list.insert(tk.END, f"{when}  {entry.system or '-':<8} {' '.join(text.split())}")
+
+def restore_history_entry(self, entry_id=None, run=False):
+    """Put a history entry back into the panes without contacting the API, and optionally run its command
+    
+    Args:
+        entry_id (int, optional): Entry to restore, the one selected in the history window if not given
+        run (bool): Execute the command right away
+    """
+    if entry_id is None:
+        window = self.history_window
+        if window is None or not window.winfo_exists():
+            return
+        selection = window.entry_list.curselection()
+        if not selection:
+            return
+        entry_id = window.entry_ids[selection[0]]
+    
+    entry = self.history_store.get(entry_id)
+    if entry is None:
+        return
+    
+    # A restored entry replaces whatever answer the panes were showing
+    self.query_scheduler.cancel_all()
+    self._active_stream = None
+    self.system_results = None
+    if entry.system in translator.SYSTEMS:
+        self.selected_system.set(entry.system)
+    if entry.kind == history_store.HistoryEntry.ANSWER:
+        self.input_text.delete(0, tk.END)
+        self.input_text.insert(0, entry.query)
+        self.update_response(entry.response or "")
+        self.update_terminal(entry.response or entry.command)
+    else:
+        self._show_command_candidates(command_parser.ParsedResponse([entry.command]))
+    self.update_status(f"Przywrócono z historii: {entry.command}")
+    
+    if run:
+        self.execute_command()
+
+def shutdown(self):
+    """Stop the background loop and close pooled connections, then close the window"""
+    self.ui_queue.stop()
+    self.query_scheduler.shutdown()
+    if self.prefetcher is not None:
+        self.prefetcher.discard()
+    if self.history_store is not None:
+        self.history_store.close()
+    if self.response_cache is not None:
+        self.response_cache.flush()
+    if self.backend_loop.running:
+        try:
+            self.backend_loop.run(self.client_manager.aclose(), timeout=2)
+        except Exception:
+            pass
+        self.backend_loop.stop()
+    self.client_manager.close()
+    self.root.destroy()
 
 def clear_fields(self):
     """Clear all text fields"""
+    self.query_scheduler.cancel_all()
+    if self.prefetcher is not None:
+        self.prefetcher.discard()
+    self._active_stream = None
+    self.system_results = None
+    self.command_candidates = []
+    if self.conversation is not None:
+        self.conversation.clear()
     self.input_text.delete(0, tk.END)
     self.terminal_text.delete(1.0, tk.END)  # Changed from 0 to 1.0 for ScrolledText
     self.response_text.config(state=tk.NORMAL)
     self.response_text.delete(1.0, tk.END)
     self.response_text.config(state=tk.DISABLED)
-    status_ready = self.prompts.get("ui_labels", {}).get("status_ready", "Gotowy")
+    status_ready = self.prompt_registry.label("status_ready", "Gotowy")
     self.status_var.set(status_ready)
\ No newline at end of file
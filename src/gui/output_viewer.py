@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+GUI module for the GPT-4 Command Application - large output viewer
+Shows command output of any size by rendering only the visible lines
+"""
+import threading
+import tkinter as tk
+from tkinter import font as tkfont
+
+
+class LargeOutputViewer:
+    """Virtualized viewer backed by a SpillFile - the Text widget only ever holds one screen"""
+    
+    POLL_MS = 500
+    WHEEL_LINES = 3
+    HIGHLIGHT_BG = "#665c00"
+    
+    def __init__(self, app, spill, title, error=False):
+        """
+        Create the viewer window
+        
+        Args:
+            app (GptAppGUI): Application, used for root, colors and clipboard
+            spill (SpillFile): Output to display, may still be growing
+            title (str): Window title
+            error (bool): Use the error background
+        """
+        self.app = app
+        self.spill = spill.retain()
+        self.top = 0
+        self.highlight_line = None
+        self._last_total = 0
+        self._last_needle = ""
+        self._search_cancel = threading.Event()
+        self._closed = False
+        
+        self.window = tk.Toplevel(app.root)
+        self.window.title(title)
+        self.window.geometry("900x600")
+        self.window.configure(bg=app.BG_COLOR)
+        self.window.minsize(600, 400)
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(2, weight=1)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self._line_height = tkfont.Font(root=app.root, font=app.MONO_FONT).metrics("linespace")
+        
+        self._create_header(title)
+        self._create_toolbar()
+        self._create_content(error)
+        self._create_buttons()
+        
+        self.window.after(self.POLL_MS, self._poll)
+    
+    def _create_header(self, title):
+        """Create the title label"""
+        title_label = tk.Label(
+            self.window,
+            text=title,
+            font=self.app.HEADER_FONT,
+            bg=self.app.BG_COLOR,
+            fg=self.app.ACCENT_COLOR
+        )
+        title_label.grid(row=0, column=0, sticky="w", padx=self.app.PAD_X, pady=(self.app.PAD_Y, self.app.PAD_Y // 2))
+    
+    def _create_toolbar(self):
+        """Create jump-to-line and search controls"""
+        toolbar = tk.Frame(self.window, bg=self.app.BG_COLOR)
+        toolbar.grid(row=1, column=0, sticky="ew", padx=self.app.PAD_X, pady=(0, self.app.PAD_Y // 2))
+        
+        self.line_entry = self._add_entry(toolbar, "Linia:", 8, self.jump_to_line)
+        self._add_button(toolbar, "Przejdź", self.jump_to_line, 8)
+        self.search_entry = self._add_entry(toolbar, "Szukaj:", 24, self.search)
+        self._add_button(toolbar, "🔍 Znajdź", self.search, 10)
+        
+        self.info_var = tk.StringVar()
+        info_label = tk.Label(
+            toolbar,
+            textvariable=self.info_var,
+            font=self.app.STATUS_FONT,
+            bg=self.app.BG_COLOR,
+            fg=self.app.FG_COLOR
+        )
+        info_label.pack(side=tk.RIGHT)
+    
+    def _add_entry(self, parent, label, width, on_return):
+        """Add a labelled entry to the toolbar"""
+        tk.Label(
+            parent,
+            text=label,
+            font=self.app.MAIN_FONT,
+            bg=self.app.BG_COLOR,
+            fg=self.app.FG_COLOR
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        entry = tk.Entry(
+            parent,
+            width=width,
+            font=self.app.MAIN_FONT,
+            bg=self.app.INPUT_BG,
+            fg=self.app.INPUT_FG,
+            insertbackground=self.app.FG_COLOR,
+            relief=tk.FLAT
+        )
+        entry.pack(side=tk.LEFT, padx=(0, 5))
+        entry.bind("<Return>", lambda event: on_return())
+        return entry
+    
+    def _add_button(self, parent, text, command, width, side=tk.LEFT, bg=None):
+        """Add a button styled like the rest of the application"""
+        button = tk.Button(
+            parent,
+            text=text,
+            command=command,
+            font=self.app.MAIN_FONT,
+            bg=bg or self.app.BUTTON_BG,
+            fg=self.app.FG_COLOR,
+            activebackground=self.app.BUTTON_ACTIVE_BG,
+            activeforeground=self.app.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            width=width,
+            bd=1
+        )
+        button.pack(side=side, padx=(0, 10))
+        return button
+    
+    def _create_content(self, error):
+        """Create the text widget with a virtual scrollbar"""
+        content_frame = tk.Frame(self.window, bg=self.app.BG_COLOR)
+        content_frame.grid(row=2, column=0, sticky="nsew", padx=self.app.PAD_X, pady=(0, self.app.PAD_Y))
+        content_frame.grid_columnconfigure(0, weight=1)
+        content_frame.grid_rowconfigure(0, weight=1)
+        
+        self.text = tk.Text(
+            content_frame,
+            wrap=tk.NONE,
+            font=self.app.MONO_FONT,
+            bg="#3c2c2c" if error else self.app.INPUT_BG,
+            fg=self.app.FG_COLOR,
+            insertbackground=self.app.FG_COLOR,
+            bd=1,
+            relief=tk.FLAT
+        )
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.text.tag_config("highlight", background=self.HIGHLIGHT_BG)
+        
+        # The scrollbar tracks the position in the file, not in the widget
+        self.scrollbar = tk.Scrollbar(content_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        x_scrollbar = tk.Scrollbar(content_frame, orient=tk.HORIZONTAL, command=self.text.xview)
+        x_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.text.config(xscrollcommand=x_scrollbar.set)
+        
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_lines(-self.WHEEL_LINES))
+        self.text.bind("<Button-5>", lambda event: self.scroll_lines(self.WHEEL_LINES))
+        self.text.bind("<Prior>", lambda event: self.scroll_lines(-self._visible_rows()))
+        self.text.bind("<Next>", lambda event: self.scroll_lines(self._visible_rows()))
+        self.text.bind("<Up>", lambda event: self.scroll_lines(-1))
+        self.text.bind("<Down>", lambda event: self.scroll_lines(1))
+        self.text.bind("<Control-Home>", lambda event: self.scroll_to(0))
+        self.text.bind("<Control-End>", lambda event: self.scroll_to(self.spill.line_count))
+    
+    def _create_buttons(self):
+        """Create copy and close buttons"""
+        button_frame = tk.Frame(self.window, bg=self.app.BG_COLOR)
+        button_frame.grid(row=3, column=0, sticky="ew", padx=self.app.PAD_X, pady=(0, self.app.PAD_Y))
+        
+        self._add_button(
+            button_frame,
+            self.app.prompt_registry.label("close_button", "✖ Zamknij"),
+            self.close,
+            15,
+            side=tk.RIGHT
+        )
+        self._add_button(
+            button_frame,
+            "📋 Kopiuj",
+            lambda: self.app._copy_file_to_clipboard(self.spill),
+            15,
+            side=tk.RIGHT,
+            bg=self.app.ACCENT_COLOR
+        )
+    
+    def _visible_rows(self):
+        """Number of lines that fit in the text widget"""
+        return max(1, self.text.winfo_height() // max(1, self._line_height))
+    
+    def render(self):
+        """Read the visible window of lines from the file and show it"""
+        rows = self._visible_rows()
+        total = self.spill.line_count
+        self.top = max(0, min(self.top, total - rows))
+        lines = self.spill.read_lines(self.top, rows)
+        
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, "\n".join(lines))
+        if self.highlight_line is not None and self.top <= self.highlight_line < self.top + len(lines):
+            row = self.highlight_line - self.top + 1
+            self.text.tag_add("highlight", f"{row}.0", f"{row}.end")
+        self.text.config(state=tk.DISABLED)
+        
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + rows) / total))
+            self.info_var.set(f"Linie {self.top + 1}-{self.top + len(lines)} z {total}")
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            self.info_var.set("Brak danych")
+        self._last_total = total
+    
+    def scroll_lines(self, delta):
+        """Move the window by a number of lines"""
+        self.scroll_to(self.top + delta)
+        return "break"
+    
+    def scroll_to(self, line):
+        """Make line the first visible line"""
+        self.top = max(0, line)
+        self.render()
+        return "break"
+    
+    def _on_scrollbar(self, action, value, unit=None):
+        """Translate scrollbar commands into line positions"""
+        if action == "moveto":
+            self.scroll_to(int(float(value) * self.spill.line_count))
+        elif action == "scroll":
+            step = self._visible_rows() if unit == "pages" else 1
+            self.scroll_lines(int(value) * step)
+    
+    def _on_mousewheel(self, event):
+        """Handle the mouse wheel on Windows and MacOS"""
+        direction = -1 if event.delta > 0 else 1
+        return self.scroll_lines(direction * self.WHEEL_LINES)
+    
+    def _poll(self):
+        """Follow a growing file - keeps the view at the bottom if it was there"""
+        if self._closed or self.spill.closed:
+            return
+        total = self.spill.line_count
+        if total != self._last_total:
+            at_bottom = self.top + self._visible_rows() >= self._last_total
+            if at_bottom:
+                self.top = total
+            self.render()
+        self.window.after(self.POLL_MS, self._poll)
+    
+    def jump_to_line(self):
+        """Center the view on the line number typed in the toolbar"""
+        try:
+            line = int(self.line_entry.get().strip()) - 1
+        except ValueError:
+            self.info_var.set("Nieprawidłowy numer linii")
+            return
+        self.show_line(max(0, min(line, self.spill.line_count - 1)))
+    
+    def show_line(self, line):
+        """Highlight a line and scroll it into the middle of the view"""
+        self.highlight_line = line
+        self.scroll_to(line - self._visible_rows() // 2)
+    
+    def search(self):
+        """Search for the next match in a background thread"""
+        needle = self.search_entry.get()
+        if not needle:
+            return
+        
+        # Continue after the current match when searching for the same text again
+        start = 0
+        if needle == self._last_needle and self.highlight_line is not None:
+            start = self.highlight_line + 1
+        self._last_needle = needle
+        
+        self._search_cancel.set()
+        self._search_cancel = threading.Event()
+        cancel_event = self._search_cancel
+        self.info_var.set("Wyszukiwanie...")
+        threading.Thread(target=self._search_worker, args=(needle, start, cancel_event), daemon=True).start()
+    
+    def _search_worker(self, needle, start, cancel_event):
+        """Scan the file off the UI thread, wrapping around once"""
+        try:
+            line = self.spill.search(needle, start, cancel_event=cancel_event)
+            if line == -1 and start > 0:
+                line = self.spill.search(needle, 0, cancel_event=cancel_event)
+        except ValueError:
+            # The file was closed while scanning
+            return
+        if not cancel_event.is_set():
+            self.app.ui_queue.post(self._show_search_result, line, needle)
+    
+    def _show_search_result(self, line, needle):
+        """Show the match found by the search thread"""
+        if self._closed:
+            return
+        if line == -1:
+            self.info_var.set(f"Nie znaleziono: {needle}")
+            return
+        self.show_line(line)
+    
+    def close(self):
+        """Close the window and release the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._search_cancel.set()
+        self.window.destroy()
+        self.spill.release()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+GUI module for the GPT-4 Command Application - results window
+One reusable window with a tab per executed command; the number of tabs and
+the text each tab holds are capped, so old results do not pile up
+"""
+import tkinter as tk
+from tkinter import scrolledtext, ttk
+
+
+class ResultTab:
+    """Output of one command inside the results window"""
+    
+    RUNNING = "⏳"
+    SUCCESS = "✔"
+    ERROR = "✖"
+    
+    def __init__(self, results, title):
+        self.results = results
+        self.title = title
+        self.marker = self.RUNNING
+        self.finished = False
+        self.closed = False
+        self.shown_chars = 0
+        self.full_output_button = None
+        self._on_close = []
+        
+        app = results.app
+        self.frame = tk.Frame(results.notebook, bg=app.BG_COLOR)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+        
+        self.output_text = scrolledtext.ScrolledText(
+            self.frame,
+            wrap=tk.WORD,
+            font=app.MONO_FONT,
+            bg=app.INPUT_BG,
+            fg=app.FG_COLOR,
+            insertbackground=app.FG_COLOR,
+            bd=1,
+            relief=tk.FLAT
+        )
+        self.output_text.grid(row=0, column=0, sticky="nsew", pady=(app.PAD_Y // 2, 0))
+        self.output_text.config(state=tk.DISABLED)
+        
+        self.button_frame = tk.Frame(self.frame, bg=app.BG_COLOR)
+        self.button_frame.grid(row=1, column=0, sticky="ew", pady=(app.PAD_Y // 2, 0))
+        
+        close_label = app.prompt_registry.label("close_tab_button", "✖ Zamknij kartę")
+        close_button = results.make_button(self.button_frame, close_label, self.close)
+        close_button.pack(side=tk.RIGHT)
+        
+        self.copy_button = results.make_button(self.button_frame, "📋 Kopiuj",
+                                               lambda: app._copy_to_clipboard(self.output_text.get(1.0, tk.END)),
+                                               bg=app.ACCENT_COLOR)
+        self.copy_button.pack(side=tk.RIGHT, padx=(0, 10))
+    
+    @property
+    def label(self):
+        """Text of the notebook tab"""
+        return f"{self.marker} {self.title}"
+    
+    def on_close(self, callback):
+        """Call callback once the tab is closed, e.g. to release the command's spill file"""
+        self._on_close.append(callback)
+    
+    def release(self):
+        """Run the close callbacks - called once by the results window"""
+        callbacks, self._on_close = self._on_close, []
+        for callback in callbacks:
+            callback()
+    
+    def set_text(self, text):
+        """Replace the whole content"""
+        self.output_text.config(state=tk.NORMAL)
+        self.output_text.delete(1.0, tk.END)
+        self.output_text.insert(tk.END, text)
+        self.output_text.config(state=tk.DISABLED)
+        self.shown_chars = len(text)
+    
+    def finish(self, error=False):
+        """Mark the command as finished - finished tabs are the ones closed when the cap is reached"""
+        self.finished = True
+        self.marker = self.ERROR if error else self.SUCCESS
+        if error:
+            self.output_text.config(bg="#3c2c2c")
+        self.results.update_label(self)
+    
+    def select(self):
+        """Bring the tab and its window to the front"""
+        self.results.select(self)
+    
+    def close(self):
+        """Remove the tab and release what it holds"""
+        self.results.close_tab(self)
+
+
+class ResultsWindow:
+    """Reusable tabbed window for command output, created on first use and after being closed"""
+    
+    DEFAULT_MAX_TABS = 10
+    DEFAULT_TAB_CHARS = 200_000
+    TITLE_CHARS = 24
+    
+    def __init__(self, app, max_tabs=DEFAULT_MAX_TABS, tab_chars=DEFAULT_TAB_CHARS):
+        """
+        Initialize the window manager - no widget is created until a tab is opened
+        
+        Args:
+            app (GptAppGUI): Application, used for root, colors and labels
+            max_tabs (int): Finished tabs beyond this number are closed, oldest first
+            tab_chars (int): Maximum characters of output shown in one tab
+        """
+        self.app = app
+        self.max_tabs = max(1, max_tabs)
+        self.tab_chars = max(1, tab_chars)
+        self.window = None
+        self.notebook = None
+        self.tabs = []
+        self.evicted = 0
+    
+    def make_button(self, parent, text, command, bg=None):
+        """Button in the application style"""
+        app = self.app
+        return tk.Button(
+            parent,
+            text=text,
+            command=command,
+            font=app.MAIN_FONT,
+            bg=bg or app.BUTTON_BG,
+            fg=app.FG_COLOR,
+            activebackground=app.BUTTON_ACTIVE_BG,
+            activeforeground=app.FG_COLOR,
+            relief=tk.FLAT,
+            cursor="hand2",
+            width=15,
+            bd=1
+        )
+    
+    def _ensure_window(self):
+        """Create the window and its notebook unless they exist"""
+        if self.window is not None and self.window.winfo_exists():
+            return
+        app = self.app
+        self.tabs = []
+        self.window = tk.Toplevel(app.root)
+        self.window.title(app.prompt_registry.window_title("result", "Wynik polecenia"))
+        self.window.geometry("800x500")
+        self.window.configure(bg=app.BG_COLOR)
+        self.window.minsize(600, 400)
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(0, weight=1)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.notebook = ttk.Notebook(self.window)
+        self.notebook.grid(row=0, column=0, sticky="nsew", padx=app.PAD_X, pady=app.PAD_Y)
+    
+    def open_tab(self, title, text=""):
+        """
+        Add a tab in front, closing the oldest finished tabs beyond the cap
+        
+        Args:
+            title (str): Tab title, shortened to TITLE_CHARS
+            text (str): Initial content
+        
+        Returns:
+            ResultTab: The new tab
+        """
+        self._ensure_window()
+        title = " ".join(title.split())
+        if len(title) > self.TITLE_CHARS:
+            title = title[:self.TITLE_CHARS - 1] + "…"
+        tab = ResultTab(self, title)
+        self.tabs.append(tab)
+        self.notebook.add(tab.frame, text=tab.label)
+        if text:
+            tab.set_text(text)
+        self._evict()
+        self.select(tab)
+        return tab
+    
+    def _evict(self):
+        """Close the oldest finished tabs while there are more than max_tabs - running ones stay"""
+        finished = [tab for tab in self.tabs if tab.finished]
+        excess = len(self.tabs) - self.max_tabs
+        for tab in finished[:max(0, excess)]:
+            self.close_tab(tab)
+            self.evicted += 1
+    
+    def update_label(self, tab):
+        """Refresh the notebook text of a tab after its state changed"""
+        if not tab.closed and self.notebook is not None:
+            self.notebook.tab(tab.frame, text=tab.label)
+        if tab.finished:
+            self._evict()
+    
+    def select(self, tab):
+        """Show a tab and raise the window"""
+        if tab.closed:
+            return
+        self.notebook.select(tab.frame)
+        self.window.deiconify()
+        self.window.lift()
+        tab.output_text.focus_set()
+    
+    def close_tab(self, tab):
+        """Remove one tab, the window goes with the last one"""
+        if tab.closed:
+            return
+        tab.closed = True
+        if tab in self.tabs:
+            self.tabs.remove(tab)
+        tab.release()
+        if self.notebook is not None and self.window is not None and self.window.winfo_exists():
+            self.notebook.forget(tab.frame)
+            tab.frame.destroy()
+            if not self.tabs:
+                self.close()
+    
+    def close(self):
+        """Close the window with all its tabs"""
+        for tab in list(self.tabs):
+            tab.closed = True
+            tab.release()
+        self.tabs = []
+        if self.window is not None and self.window.winfo_exists():
+            self.window.destroy()
+        self.window = None
+        self.notebook = None
+    
+    def stats(self):
+        """
+        Return tab counters
+        
+        Returns:
+            dict: open tabs, running tabs, characters shown and tabs closed by the cap
+        """
+        return {
+            "tabs": len(self.tabs),
+            "running": sum(1 for tab in self.tabs if not tab.finished),
+            "chars": sum(tab.shown_chars for tab in self.tabs),
+            "evicted": self.evicted
+        }
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Behavior tests of the request policy - retries, Retry-After, deadline and circuit breaker probes
+Requests are fake callables, nothing touches the network
+"""
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "core"))
+
+from request_policy import CircuitBreaker, CircuitOpenError, DeadlineExceededError, RequestPolicy
+
+
+class FakeResponse:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+class FakeStatusError(Exception):
+    """Error of an HTTP response, like openai.APIStatusError"""
+    
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(headers)
+
+
+def make_policy(**config):
+    settings = {"api_max_retries": 3, "api_backoff_base": 0.001, "api_backoff_max": 0.01, "api_deadline": 5.0,
+                "api_circuit_threshold": 5, "api_circuit_reset": 30.0}
+    settings.update(config)
+    return RequestPolicy(settings)
+
+
+def failing(errors, result="ok"):
+    """Request raising the given errors one per attempt, then returning result"""
+    calls = []
+    
+    def request(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return request, calls
+
+
+def open_breaker(policy):
+    """Trip the breaker and let its reset timeout pass, so the next request is the half-open probe"""
+    policy.breaker.failure_threshold = 1
+    policy.breaker.reset_timeout = 0.01
+    policy.breaker.record_failure()
+    time.sleep(0.02)
+
+
+class RetryTest(unittest.TestCase):
+    
+    def test_transient_errors_are_retried(self):
+        policy = make_policy()
+        request, calls = failing([ConnectionError(), FakeStatusError(503)])
+        self.assertEqual(policy.call(request), "ok")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(policy.retries, 2)
+    
+    def test_client_error_is_not_retried(self):
+        policy = make_policy()
+        request, calls = failing([FakeStatusError(400)])
+        with self.assertRaises(FakeStatusError):
+            policy.call(request)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.breaker.failures, 0)
+    
+    def test_gives_up_after_max_retries(self):
+        policy = make_policy(api_max_retries=2)
+        request, calls = failing([ConnectionError()] * 5)
+        with self.assertRaises(ConnectionError):
+            policy.call(request)
+        self.assertEqual(len(calls), 3)
+    
+    def test_retry_after_header(self):
+        policy = make_policy(api_backoff_max=10.0)
+        self.assertEqual(policy._backoff(0, FakeStatusError(429, {"retry-after": "2"})), 2.0)
+        self.assertEqual(policy._backoff(0, FakeStatusError(429, {"retry-after-ms": "250"})), 0.25)
+    
+    def test_retry_after_is_capped(self):
+        policy = make_policy(api_backoff_max=1.0)
+        self.assertEqual(policy._backoff(0, FakeStatusError(429, {"retry-after": "120"})), 1.0)
+    
+    def test_retry_after_beyond_deadline_is_not_waited_for(self):
+        policy = make_policy(api_backoff_max=10.0, api_deadline=0.5)
+        request, calls = failing([FakeStatusError(429, {"retry-after": "5"})])
+        with self.assertRaises(FakeStatusError):
+            policy.call(request)
+        self.assertEqual(len(calls), 1)
+
+
+class DeadlineTest(unittest.TestCase):
+    
+    def test_deadline_is_not_a_transient_timeout(self):
+        error = DeadlineExceededError("late")
+        self.assertNotIsInstance(error, TimeoutError)
+        self.assertFalse(RequestPolicy.is_retryable(error))
+        self.assertTrue(RequestPolicy.is_retryable(TimeoutError()))
+    
+    def test_request_gets_remaining_time(self):
+        policy = make_policy(api_deadline=5.0)
+        request, calls = failing([])
+        policy.call(request)
+        self.assertTrue(0 < calls[0] <= 5.0)
+    
+    def test_no_deadline_passes_none(self):
+        policy = make_policy(api_deadline=0)
+        request, calls = failing([])
+        policy.call(request)
+        self.assertIsNone(calls[0])
+    
+    def test_async_deadline(self):
+        policy = make_policy(api_deadline=0.05)
+        received = []
+        
+        async def slow(timeout):
+            received.append(timeout)
+            await asyncio.sleep(1)
+        
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(policy.acall(slow))
+        self.assertTrue(0 < received[0] <= 0.05)
+        self.assertEqual(policy.breaker.failures, 1)
+    
+    def test_within_deadline_bounds_the_rest_of_the_request(self):
+        policy = make_policy(api_deadline=0.05)
+        
+        async def stalled_stream():
+            await asyncio.sleep(1)
+        
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(policy.within_deadline(stalled_stream(), time.monotonic()))
+        self.assertEqual(policy.breaker.failures, 1)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    
+    def test_opens_after_threshold_and_rejects(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        self.assertEqual(breaker.rejected, 1)
+    
+    def test_only_one_probe_while_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow())
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+    
+    def test_successful_probe_closes(self):
+        policy = make_policy()
+        open_breaker(policy)
+        self.assertEqual(policy.call(lambda timeout: "ok"), "ok")
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+    
+    def test_probe_failing_without_status_is_released(self):
+        policy = make_policy()
+        open_breaker(policy)
+        request, _ = failing([ValueError("bad answer")])
+        with self.assertRaises(ValueError):
+            policy.call(request)
+        self.assertEqual(policy.call(lambda timeout: "ok"), "ok")
+    
+    def test_async_probe_failing_without_status_is_released(self):
+        policy = make_policy()
+        open_breaker(policy)
+        
+        async def bad(timeout):
+            raise ValueError("bad answer")
+        
+        async def ok(timeout):
+            return "ok"
+        
+        with self.assertRaises(ValueError):
+            asyncio.run(policy.acall(bad))
+        self.assertEqual(asyncio.run(policy.acall(ok)), "ok")
+    
+    def test_cancelled_probe_is_released(self):
+        policy = make_policy()
+        open_breaker(policy)
+        
+        async def scenario():
+            task = asyncio.ensure_future(policy.acall(lambda timeout: asyncio.sleep(1)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            
+            async def ok(timeout):
+                return "ok"
+            return await policy.acall(ok)
+        
+        self.assertEqual(asyncio.run(scenario()), "ok")
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+    
+    def test_probe_past_deadline_reopens(self):
+        policy = make_policy(api_deadline=0.02)
+        open_breaker(policy)
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(policy.acall(lambda timeout: asyncio.sleep(1)))
+        self.assertEqual(policy.breaker.state, CircuitBreaker.OPEN)
+        time.sleep(0.02)
+        self.assertTrue(policy.breaker.allow())
+    
+    def test_disabled_breaker_never_rejects(self):
+        breaker = CircuitBreaker(failure_threshold=0)
+        for _ in range(10):
+            breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()